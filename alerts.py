@@ -0,0 +1,528 @@
+import argparse
+import itertools
+import json
+import logging
+import os
+import queue
+import random
+import threading
+import time
+from collections import defaultdict, deque, namedtuple
+from datetime import datetime, timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from operator import attrgetter
+
+import requests
+from sortedcontainers import SortedKeyList
+
+from signals import generate_signal
+
+# Sin ALERT_RULES_PATH (fichero JSON con una lista de reglas) las alertas están desactivadas
+ALERT_RULES_PATH = os.environ.get('ALERT_RULES_PATH', '')
+ALERT_WEBHOOK_URL = os.environ.get('ALERT_WEBHOOK_URL', '')
+ALERT_WEBHOOK_TIMEOUT = float(os.environ.get('ALERT_WEBHOOK_TIMEOUT', 5))
+ALERT_QUEUE_SIZE = int(os.environ.get('ALERT_QUEUE_SIZE', 1000))
+
+RULE_TYPES = ('cross', 'move', 'flip')
+
+AlertRule = namedtuple('AlertRule', ['id', 'type', 'coin', 'threshold', 'direction', 'window'])
+AlertRule.__doc__ = """
+Regla de alerta.
+
+- 'cross': el precio de `coin` cruza `threshold` al alza ('above'), a la baja ('below') o en
+  ambos sentidos ('both').
+- 'move': el precio de `coin` ('*' para cualquiera) varía al menos `threshold` % (negativo
+  para caídas) respecto al de hace `window` segundos.
+- 'flip': la señal de `signals.generate_signal` de `coin` ('*' para cualquiera) cambia a 'B',
+  a 'S' o a cualquiera de las dos (`direction` 'B', 'S' o 'both').
+"""
+
+
+class LevelIndex:
+    """
+    Umbrales de una serie ordenados, para encontrar en O(log n + k) los que cruza un cambio de valor.
+
+    Un umbral 'above' se cruza cuando la serie pasa de estar por debajo a igualarlo o superarlo;
+    uno 'below', cuando pasa de estar por encima a igualarlo o quedar por debajo.
+    """
+
+    def __init__(self):
+        self._above = SortedKeyList(key=attrgetter('threshold'))
+        self._below = SortedKeyList(key=attrgetter('threshold'))
+
+    def __len__(self):
+        return len(self._above) + len(self._below)
+
+    def _sides(self, rule):
+        if rule.direction in ('above', 'both'):
+            yield self._above
+        if rule.direction in ('below', 'both'):
+            yield self._below
+
+    def add(self, rule):
+        for side in self._sides(rule):
+            side.add(rule)
+
+    def remove(self, rule):
+        for side in self._sides(rule):
+            side.remove(rule)
+
+    def crossed(self, previous, current):
+        """
+        Args:
+            previous (float): Valor anterior de la serie.
+            current (float): Valor nuevo.
+
+        Returns:
+            list[AlertRule]: Reglas cuyo umbral está entre ambos valores en el sentido del cambio.
+        """
+        if current > previous:
+            return list(self._above.irange_key(previous, current, inclusive=(False, True)))
+        if current < previous:
+            return list(self._below.irange_key(current, previous, inclusive=(True, False)))
+        return []
+
+
+class AlertEngine:
+    """
+    Evalúa reglas de alerta de forma incremental con cada lote de precios extraídos.
+
+    El motor guarda por moneda solo el último precio, la última señal y, para las reglas de
+    variación, los precios de la ventana más corta que necesita; nunca consulta el histórico.
+    Los umbrales de precio se indexan por moneda y los de variación por (moneda, ventana) en
+    listas ordenadas (`LevelIndex`), de modo que cada precio nuevo solo recorre las reglas que
+    realmente cruza aunque haya decenas de miles.
+
+    Las alertas de cada lote se entregan juntas a los `sinks`: funciones que reciben una lista
+    de alertas (`log_sink`, `WebhookSink` o cualquier callable).
+
+    Args:
+        sinks (list[callable], opcional): Destinos de las alertas.
+        history (int, opcional): Alertas recientes que se conservan en `recent`. Por defecto 100.
+    """
+
+    def __init__(self, sinks=None, history=100):
+        self.sinks = list(sinks or [])
+        self.recent = deque(maxlen=history)
+        self._rules = {}
+        self._ids = itertools.count(1)
+        self._price_levels = defaultdict(LevelIndex)  # moneda -> umbrales de precio
+        self._move_levels = defaultdict(LevelIndex)  # (moneda | '*', ventana) -> umbrales de variación
+        self._move_windows = defaultdict(set)  # moneda | '*' -> ventanas con reglas
+        self._flip_rules = defaultdict(list)  # moneda | '*' -> reglas de cambio de señal
+        self._last_price = {}
+        self._last_signal = {}
+        self._window_prices = {}  # (moneda, ventana) -> deque[(timestamp, precio)]
+        self._last_change = {}  # (moneda, ventana) -> variación en %
+        self._lock = threading.Lock()
+        self._stats = {'rows': 0, 'batches': 0, 'fired': 0, 'seconds': 0.0}
+
+    def __len__(self):
+        return len(self._rules)
+
+    def add_rule(self, type, coin, threshold=None, direction='both', window=None, id=None):
+        """
+        Añade una regla.
+
+        Args:
+            type (str): 'cross', 'move' o 'flip'.
+            coin (str): Nombre de la criptomoneda, o '*' en las reglas 'move' y 'flip'.
+            threshold (float, opcional): Precio ('cross') o variación en % ('move').
+            direction (str, opcional): 'above', 'below' o 'both' ('cross'); 'B', 'S' o 'both' ('flip').
+            window (float, opcional): Segundos de la ventana ('move').
+            id (int | str, opcional): Identificador. Por defecto uno correlativo.
+
+        Returns:
+            AlertRule: La regla añadida.
+
+        Raises:
+            ValueError: Si la regla no es válida o el identificador ya existe.
+        """
+        if type not in RULE_TYPES:
+            raise ValueError(f"Tipo de regla desconocido: {type}")
+        if type == 'cross':
+            if threshold is None or direction not in ('above', 'below', 'both') or coin == '*':
+                raise ValueError("Una regla 'cross' necesita moneda, 'threshold' y 'direction' above/below/both")
+        elif type == 'move':
+            if not threshold or not window or window <= 0:
+                raise ValueError("Una regla 'move' necesita 'threshold' (%) distinto de cero y 'window' (segundos)")
+            direction = 'above' if threshold > 0 else 'below'
+        elif direction not in ('B', 'S', 'both'):
+            raise ValueError("Una regla 'flip' necesita 'direction' B, S o both")
+
+        with self._lock:
+            id = id if id is not None else next(self._ids)
+            if id in self._rules:
+                raise ValueError(f"Ya existe una regla con id {id}")
+            rule = AlertRule(id, type, coin, float(threshold) if threshold is not None else None, direction,
+                             float(window) if window is not None else None)
+            self._rules[id] = rule
+            if type == 'cross':
+                self._price_levels[coin].add(rule)
+            elif type == 'move':
+                self._move_levels[(coin, rule.window)].add(rule)
+                self._move_windows[coin].add(rule.window)
+            else:
+                self._flip_rules[coin].append(rule)
+        return rule
+
+    def remove_rule(self, id):
+        """
+        Elimina una regla.
+
+        Args:
+            id (int | str): Identificador de la regla.
+
+        Returns:
+            AlertRule | None: La regla eliminada, o None si no existía.
+        """
+        with self._lock:
+            rule = self._rules.pop(id, None)
+            if rule is None:
+                return None
+            if rule.type == 'cross':
+                self._price_levels[rule.coin].remove(rule)
+            elif rule.type == 'move':
+                key = (rule.coin, rule.window)
+                self._move_levels[key].remove(rule)
+                if not self._move_levels[key]:
+                    del self._move_levels[key]
+                    self._move_windows[rule.coin].discard(rule.window)
+            else:
+                self._flip_rules[rule.coin].remove(rule)
+        return rule
+
+    def load_rules(self, path):
+        """
+        Añade las reglas de un fichero JSON con una lista de objetos con los argumentos de `add_rule`.
+
+        Ejemplo:
+            [{"type": "cross", "coin": "Bitcoin", "threshold": 100000, "direction": "above"},
+             {"type": "move", "coin": "*", "threshold": -5, "window": 3600},
+             {"type": "flip", "coin": "Ethereum", "direction": "S"}]
+
+        Args:
+            path (str): Ruta del fichero.
+
+        Returns:
+            int: Número de reglas añadidas.
+        """
+        with open(path) as f:
+            specs = json.load(f)
+        for spec in specs:
+            self.add_rule(**spec)
+        return len(specs)
+
+    def _windows_for(self, name):
+        windows = self._move_windows.get(name)
+        shared = self._move_windows.get('*')
+        if windows and shared:
+            return windows | shared
+        return windows or shared or ()
+
+    def _moves(self, name, price, timestamp):
+        fired = []
+        for window in self._windows_for(name):
+            key = (name, window)
+            prices = self._window_prices.get(key)
+            if prices is None:
+                prices = self._window_prices[key] = deque()
+            prices.append((timestamp, price))
+            while (timestamp - prices[0][0]).total_seconds() > window:
+                prices.popleft()
+            reference = prices[0][1]
+            change = (price - reference) / reference * 100 if reference else 0.0
+            previous = self._last_change.get(key, 0.0)
+            self._last_change[key] = change
+            for levels in (self._move_levels.get(key), self._move_levels.get(('*', window))):
+                if levels:
+                    fired.extend((rule, change) for rule in levels.crossed(previous, change))
+        return fired
+
+    def evaluate(self, rows):
+        """
+        Evalúa las reglas con un lote de filas recién extraídas y entrega las alertas a los sinks.
+
+        Args:
+            rows (list[dict]): Filas con 'name', 'actual_price' y 'timestamp', en el formato
+                devuelto por `transform_data`.
+
+        Returns:
+            list[dict]: Alertas disparadas, con 'rule_id', 'type', 'coin', 'price', 'previous_price',
+                'timestamp', 'message' y, en las reglas 'move', 'change' (%).
+        """
+        start = time.perf_counter()
+        alerts = []
+        with self._lock:
+            for row in rows:
+                if row['actual_price'] is None:
+                    continue
+                name = row['name']
+                price = float(row['actual_price'])
+                timestamp = row['timestamp']
+                previous = self._last_price.get(name)
+                self._last_price[name] = price
+
+                if self._move_windows:
+                    for rule, change in self._moves(name, price, timestamp):
+                        alerts.append(self._alert(rule, name, price, previous, timestamp, change=change))
+                if previous is None:
+                    continue
+
+                levels = self._price_levels.get(name)
+                if levels:
+                    alerts.extend(self._alert(rule, name, price, previous, timestamp)
+                                  for rule in levels.crossed(previous, price))
+
+                signal = generate_signal([{'price': price}, {'price': previous}])
+                if signal is None:
+                    continue
+                last_signal = self._last_signal.get(name)
+                self._last_signal[name] = signal
+                if last_signal is None or last_signal == signal:
+                    continue
+                for rules in (self._flip_rules.get(name), self._flip_rules.get('*')):
+                    for rule in rules or ():
+                        if rule.direction in ('both', signal):
+                            alerts.append(self._alert(rule, name, price, previous, timestamp, signal=signal))
+
+            self._stats['rows'] += len(rows)
+            self._stats['batches'] += 1
+            self._stats['fired'] += len(alerts)
+            self._stats['seconds'] += time.perf_counter() - start
+            self.recent.extend(alerts)
+
+        if alerts:
+            for sink in self.sinks:
+                try:
+                    sink(alerts)
+                except Exception as e:
+                    logging.error("Error al entregar %s alertas: %s", len(alerts), e)
+        return alerts
+
+    @staticmethod
+    def _alert(rule, name, price, previous, timestamp, change=None, signal=None):
+        if rule.type == 'cross':
+            sense = 'al alza' if price > previous else 'a la baja'
+            message = f"{name} cruza {sense} {rule.threshold:g} ({previous:g} → {price:g})"
+        elif rule.type == 'move':
+            message = f"{name} varía {change:+.2f} % en {rule.window:g}s (umbral {rule.threshold:+g} %)"
+        else:
+            message = f"{name} cambia a señal {'de compra' if signal == 'B' else 'de venta'} ({previous:g} → {price:g})"
+        alert = {
+            'rule_id': rule.id,
+            'type': rule.type,
+            'coin': name,
+            'price': price,
+            'previous_price': previous,
+            'timestamp': timestamp.isoformat(),
+            'message': message,
+        }
+        if change is not None:
+            alert['change'] = round(change, 4)
+        return alert
+
+    def stats(self):
+        """
+        Returns:
+            dict: Reglas activas, filas y lotes evaluados, alertas disparadas y 'avg_batch_ms'.
+        """
+        with self._lock:
+            stats = dict(self._stats, rules=len(self._rules))
+        stats['avg_batch_ms'] = stats.pop('seconds') / stats['batches'] * 1000 if stats['batches'] else None
+        return stats
+
+
+def log_sink(alerts):
+    """Sink que escribe cada alerta en el log."""
+    for alert in alerts:
+        logging.warning("Alerta %s: %s", alert['rule_id'], alert['message'])
+
+
+class WebhookSink:
+    """
+    Sink que envía cada lote de alertas como JSON (`{'alerts': [...]}`) por POST a una URL.
+
+    El envío se hace en un hilo propio con una cola acotada, para que un webhook lento no
+    retrase la ingesta; si la cola está llena, el lote se descarta y se registra en el log.
+
+    Args:
+        url (str): URL del webhook.
+        timeout (float, opcional): Segundos máximos por petición. Por defecto `ALERT_WEBHOOK_TIMEOUT`.
+        queue_size (int, opcional): Lotes pendientes como máximo. Por defecto `ALERT_QUEUE_SIZE`.
+    """
+
+    def __init__(self, url, timeout=ALERT_WEBHOOK_TIMEOUT, queue_size=ALERT_QUEUE_SIZE):
+        self.url = url
+        self.timeout = timeout
+        self.sent = 0
+        self.failed = 0
+        self.dropped = 0
+        self._queue = queue.Queue(maxsize=queue_size)
+        self._thread = None
+        self._thread_lock = threading.Lock()
+
+    def __call__(self, alerts):
+        with self._thread_lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name='alert-webhook', daemon=True)
+                self._thread.start()
+        try:
+            self._queue.put_nowait(alerts)
+        except queue.Full:
+            self.dropped += 1
+            logging.warning("Cola del webhook llena: se descartan %s alertas", len(alerts))
+
+    def _run(self):
+        session = requests.Session()
+        while True:
+            alerts = self._queue.get()
+            try:
+                response = session.post(self.url, json={'alerts': alerts}, timeout=self.timeout)
+                response.raise_for_status()
+                self.sent += 1
+            except requests.RequestException as e:
+                self.failed += 1
+                logging.error("Error al enviar alertas al webhook %s: %s", self.url, e)
+            finally:
+                self._queue.task_done()
+
+    def flush(self):
+        """Espera a que se envíen los lotes pendientes."""
+        self._queue.join()
+
+
+def create_alert_engine(rules_path=ALERT_RULES_PATH, webhook_url=ALERT_WEBHOOK_URL):
+    """
+    Crea un motor con las reglas de `rules_path`, que entrega las alertas al log y, si hay URL, al webhook.
+
+    Returns:
+        AlertEngine: El motor configurado.
+    """
+    sinks = [log_sink]
+    if webhook_url:
+        sinks.append(WebhookSink(webhook_url))
+    engine = AlertEngine(sinks)
+    count = engine.load_rules(rules_path)
+    logging.info("Cargadas %s reglas de alerta desde %s", count, rules_path)
+    return engine
+
+
+alert_engine = create_alert_engine() if ALERT_RULES_PATH else None
+
+
+class _WebhookStubHandler(BaseHTTPRequestHandler):
+    def do_POST(self):
+        body = self.rfile.read(int(self.headers.get('Content-Length', 0)))
+        try:
+            alerts = json.loads(body).get('alerts', [])
+        except ValueError:
+            self.send_response(400)
+            self.end_headers()
+            return
+        self.server.received += len(alerts)
+        for alert in alerts:
+            print(f"[{alert.get('timestamp')}] regla {alert.get('rule_id')}: {alert.get('message')}", flush=True)
+        self.send_response(204)
+        self.end_headers()
+
+    def log_message(self, format, *args):
+        pass
+
+
+def run_webhook_stub(host='127.0.0.1', port=8765):
+    """
+    Servidor local que recibe los POST de `WebhookSink` e imprime cada alerta, para pruebas.
+
+    Ejemplo:
+        python alerts.py stub --port 8765
+        ALERT_RULES_PATH=alerts.json ALERT_WEBHOOK_URL=http://127.0.0.1:8765/ python app.py
+
+    Returns:
+        ThreadingHTTPServer: El servidor (se detiene con `shutdown()`), ya escuchando.
+    """
+    server = ThreadingHTTPServer((host, port), _WebhookStubHandler)
+    server.received = 0
+    return server
+
+
+def run_benchmark(rules=50_000, coins=500, batches=200, seed=0):
+    """
+    Mide el coste de evaluar lotes de precios con muchas reglas.
+
+    Args:
+        rules (int, opcional): Número de reglas, repartidas entre 'cross' (80 %), 'move' y 'flip'.
+        coins (int, opcional): Monedas por lote. Por defecto 500.
+        batches (int, opcional): Lotes evaluados. Por defecto 200.
+        seed (int, opcional): Semilla de los datos sintéticos.
+
+    Returns:
+        dict: Reglas, filas, alertas, 'batch_ms' (media y p99) y 'row_us' (media por fila).
+    """
+    rng = random.Random(seed)
+    names = [f'coin{i}' for i in range(coins)]
+    prices = {name: rng.uniform(1, 1000) for name in names}
+    engine = AlertEngine()
+    for _ in range(rules):
+        name = rng.choice(names)
+        kind = rng.random()
+        if kind < 0.8:
+            engine.add_rule('cross', name, prices[name] * rng.uniform(0.5, 1.5), rng.choice(('above', 'below', 'both')))
+        elif kind < 0.95:
+            engine.add_rule('move', rng.choice(names + ['*']), rng.choice((-10, -5, 5, 10)) * rng.uniform(0.5, 1.5),
+                            window=rng.choice((300, 3600)))
+        else:
+            engine.add_rule('flip', name, direction=rng.choice(('B', 'S', 'both')))
+
+    now = datetime(2025, 1, 1)
+    timings = []
+    fired = 0
+    for _ in range(batches):
+        now += timedelta(minutes=1)
+        rows = []
+        for name in names:
+            prices[name] *= 1 + rng.gauss(0, 0.005)
+            rows.append({'name': name, 'actual_price': prices[name], 'timestamp': now})
+        start = time.perf_counter()
+        fired += len(engine.evaluate(rows))
+        timings.append(time.perf_counter() - start)
+    timings.sort()
+    return {
+        'rules': len(engine),
+        'rows': coins * batches,
+        'alerts': fired,
+        'batch_ms': {
+            'mean': sum(timings) / len(timings) * 1000,
+            'p99': timings[int(len(timings) * 0.99) - 1] * 1000,
+        },
+        'row_us': sum(timings) / (coins * batches) * 1e6,
+    }
+
+
+if __name__ == '__main__':
+    """
+    Punto de entrada de las alertas.
+
+        python alerts.py stub --port 8765        # webhook local que imprime las alertas
+        python alerts.py bench --rules 50000     # coste de evaluación
+    """
+    parser = argparse.ArgumentParser(description="Motor de alertas de precios")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+    stub_parser = subparsers.add_parser('stub', help="Webhook local para pruebas")
+    stub_parser.add_argument('--host', default='127.0.0.1')
+    stub_parser.add_argument('--port', type=int, default=8765)
+    bench_parser = subparsers.add_parser('bench', help="Mide la evaluación con reglas sintéticas")
+    bench_parser.add_argument('--rules', type=int, default=50_000)
+    bench_parser.add_argument('--coins', type=int, default=500)
+    bench_parser.add_argument('--batches', type=int, default=200)
+    args = parser.parse_args()
+
+    if args.command == 'stub':
+        server = run_webhook_stub(args.host, args.port)
+        print(f"Webhook de prueba en http://{args.host}:{args.port}/", flush=True)
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            server.shutdown()
+    else:
+        print(json.dumps(run_benchmark(args.rules, args.coins, args.batches), indent=2))
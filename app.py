@@ -1,46 +1,306 @@
-from flask import Flask, render_template, jsonify
+from flask import Flask, Response, render_template, jsonify, request
 
-from database import init_db, insert_crypto_data, get_all_crypto_data, insert_historical_price, get_historical_prices
-from extractor import extract_crypto_data
-from signals import generate_signal, calculate_metrics
-from transformer import transform_data
+from alerts import alert_engine
+from database import (init_db, maintain_db, get_crypto_data_with_history, get_historical_range, get_window_history,
+                      insert_scrape_batch)
+from extractor import iter_crypto_rows
+from indicators import SIGNAL_RULES, compute_signals
+from ingest import ChangeFilter, WriteBuffer, reconstruct_steps, INGEST_DEDUP, INGEST_EPSILON, INGEST_HEARTBEAT
+from instrumentation import (INGEST_CYCLE_SECONDS, INGEST_ROWS, SIGNAL_SECONDS, instrument_flask, profiler,
+                             registry)
+from pipeline import run_pipeline
+from price_cache import price_cache
+from response_cache import response_cache
+from rolling import rolling_metrics
+from rollups import RESOLUTIONS, choose_resolution, get_rollup_series
+from scheduler import IngestionScheduler, LeaderElection, INGESTION_INTERVAL
+from shared_snapshot import shared_snapshot, SHARED_SNAPSHOT_POLL
+from stream import StreamFullError, broadcaster
+from tickstore import tick_store
+import logging
+import os
+import threading
 import time
-from datetime import datetime
+from datetime import datetime, timedelta
 app = Flask(__name__)
+instrument_flask(app)
+
+# 'thread': la ingesta se ejecuta en un hilo de este proceso; 'process': la ejecuta `python scheduler.py`;
+# 'leader': varios procesos sirven la API (`server.py`) y solo el elegido por `leader_election` ingesta
+INGESTION_MODE = os.environ.get('INGESTION_MODE', 'thread')
+
+# Con WRITE_BUFFER_MAX_AGE > 0 las extracciones se agrupan en micro-lotes antes de escribirse
+WRITE_BUFFER_MAX_AGE = float(os.environ.get('WRITE_BUFFER_MAX_AGE', 0))
+WRITE_BUFFER_MAX_ROWS = int(os.environ.get('WRITE_BUFFER_MAX_ROWS', 500))
+write_buffer = WriteBuffer(insert_scrape_batch, max_rows=WRITE_BUFFER_MAX_ROWS, max_age=WRITE_BUFFER_MAX_AGE) \
+    if WRITE_BUFFER_MAX_AGE > 0 else None
+
+# Con INGEST_DEDUP=1 solo se escriben los precios que aportan información (ver `ingest.ChangeFilter`)
+change_filter = ChangeFilter(epsilon=INGEST_EPSILON, heartbeat=INGEST_HEARTBEAT) if INGEST_DEDUP else None
+
+
+def store_batch(transformed_data):
+    """
+    Persiste un lote de filas transformadas y actualiza la caché y las métricas en memoria.
+
+    Con `INGEST_DEDUP` solo se persisten las filas que deja pasar `change_filter`; la caché,
+    las métricas en memoria y las reglas de `alert_engine` reciben siempre todas las filas, y
+    `tick_store` recibe la serie reconstruida con `reconstruct_steps`. Si la escritura falla,
+    el filtro se deshace para que esas filas vuelvan a pasar en la siguiente extracción.
+
+    Args:
+        transformed_data (list[dict]): Filas en el formato devuelto por `transform_data`.
+    """
+    rows = change_filter.filter(transformed_data) if change_filter is not None else transformed_data
+    if rows:
+        if write_buffer is not None:
+            # Un vaciado fallido deja las filas en el buffer para el siguiente: no hay que deshacer el filtro
+            write_buffer.add(rows)
+        else:
+            try:
+                insert_scrape_batch(rows)
+            except Exception:
+                if change_filter is not None:
+                    change_filter.rollback(rows)
+                raise
+        if tick_store is not None:
+            tick_store.append_rows(rows, interval=INGESTION_INTERVAL if INGEST_DEDUP else None,
+                                   heartbeat=INGEST_HEARTBEAT)
+    price_cache.record(transformed_data)
+    rolling_metrics.update_many(transformed_data)
+    if alert_engine is not None:
+        alert_engine.evaluate(transformed_data)
 
 
 def fetch_and_store_data():
-    max_retries = 3
-    retry_delay = 5  # segundos
+    """
+    Ejecuta un ciclo completo de extracción, transformación y carga.
 
-    for attempt in range(max_retries):
-        try:
-            raw_data = extract_crypto_data()
-            if raw_data is None:
-                raise Exception("No se pudieron obtener datos")
-
-            transformed_data = transform_data(raw_data)
-            insert_crypto_data(transformed_data)
-            for data in transformed_data:
-                insert_historical_price(data['name'], data['actual_price'], data['timestamp'])
+    Las filas fluyen por el pipeline de generadores de `pipeline.run_pipeline` y se escriben
+    por lotes a medida que se extraen, con una única marca de tiempo para toda la extracción.
+    Los reintentos con backoff los gestiona `IngestionScheduler`, de modo que esta función
+    nunca bloquea esperando y puede ejecutarse en un hilo o proceso aparte.
+
+    Returns:
+        dict: Filas y segundos por etapa del pipeline.
+
+    Raises:
+        Exception: Si no se pudieron obtener datos o falla la escritura.
+    """
+    start = time.perf_counter()
+    try:
+        stats = run_pipeline(iter_crypto_rows(), sink=store_batch)
+        if not stats.get('load', {}).get('rows'):
+            raise Exception("No se pudieron obtener datos")
+    except Exception:
+        INGEST_CYCLE_SECONDS.observe(time.perf_counter() - start, outcome='failure')
+        raise
+    INGEST_CYCLE_SECONDS.observe(time.perf_counter() - start, outcome='success')
+    INGEST_ROWS.observe(stats['load']['rows'])
+    logging.info("Pipeline de ingesta: %s", stats)
+    try:
+        maintain_db()
+    except Exception as e:
+        logging.error("Error en el mantenimiento de la base de datos: %s", e)
+    response_cache.invalidate()
+    if shared_snapshot is not None:
+        shared_snapshot.publish(price_cache.snapshot(limit=price_cache.capacity))
+    publish_snapshot()
+    return stats
+
+
+def publish_snapshot():
+    """
+    Envía a los clientes del stream las monedas que han cambiado en el último ciclo.
+
+    El estado se calcula y serializa una sola vez por ciclo, independientemente del número
+    de clientes conectados.
+    """
+    last_tick = price_cache.last_updated()
+    timestamp = last_tick.strftime('%H:%M:%S') if last_tick else None
+    changed = broadcaster.publish_changes(build_crypto_snapshot(), timestamp)
+    logging.debug("Stream: %s monedas cambiadas, %s clientes", changed, broadcaster.subscribers)
+
+
+ingestion_scheduler = IngestionScheduler(fetch_and_store_data)
+leader_election = LeaderElection(on_elected=ingestion_scheduler.start) if INGESTION_MODE == 'leader' else None
+
+
+def follows_ingestion():
+    """
+    Returns:
+        bool: True si la ingesta corre en otro proceso y la caché de este debe seguirla.
+    """
+    if leader_election is not None:
+        return not leader_election.is_leader
+    return INGESTION_MODE == 'process'
+
+
+def warm_price_cache():
+    """
+    Carga la caché de precios desde la base de datos si aún no se ha cargado.
+
+    Con la ingesta en este mismo proceso, tras la carga inicial la caché se mantiene al día
+    desde `fetch_and_store_data` y las lecturas de la API no vuelven a consultar la base de datos.
+    Si la ingesta corre en otro proceso, la caché se recarga desde `shared_snapshot` cada vez que
+    el proceso que ingesta lo publica o, sin él, desde la base de datos una vez por intervalo.
+    """
+    follower = follows_ingestion()
+    refresh = follower and time.monotonic() - _cache_loaded_at > INGESTION_INTERVAL
+    if follower and shared_snapshot is not None:
+        crypto_data = shared_snapshot.load_if_changed()
+        if crypto_data is not None:
+            load_price_cache(crypto_data)
+            publish_snapshot()
             return
-        except Exception as e:
-            if attempt < max_retries - 1:
-                time.sleep(retry_delay)
-            else:
-                raise
+        refresh = False
+    if not price_cache.is_warm or refresh:
+        crypto_data = get_crypto_data_with_history(limit=price_cache.capacity)
+        if INGEST_DEDUP:
+            now = datetime.now()
+            for data in crypto_data:
+                data['history'] = expand_history(data['history'], until=now, limit=price_cache.capacity)
+        load_price_cache(crypto_data)
+        if refresh:
+            # Con la ingesta en otro proceso, el stream se actualiza al recargar la caché
+            publish_snapshot()
+
+
+def load_price_cache(crypto_data):
+    """
+    Reemplaza el contenido de la caché de precios y de las métricas incrementales.
+
+    Args:
+        crypto_data (list[dict]): Datos en el formato de `get_crypto_data_with_history`.
+    """
+    global _cache_loaded_at
+    price_cache.warm(crypto_data)
+    if rolling_metrics.is_warm:
+        # La caché solo guarda `capacity` precios por moneda: se añaden los nuevos sin reiniciar las ventanas
+        rolling_metrics.merge(price_cache.snapshot(limit=price_cache.capacity))
+    else:
+        rolling_metrics.warm(read_window_history(rolling_metrics.span) or
+                             price_cache.snapshot(limit=price_cache.capacity))
+    _cache_loaded_at = time.monotonic()
+    response_cache.invalidate()
+
+
+_cache_loaded_at = 0.0
+_cache_follower = None
+
+
+def start_cache_follower(interval=SHARED_SNAPSHOT_POLL):
+    """
+    Arranca un hilo que mantiene la caché al día mientras la ingesta corre en otro proceso.
+
+    Sin él, un proceso que no ingesta solo recargaría la caché al recibir una petición, y los
+    clientes del stream conectados a él se quedarían con el primer estado. El hilo llama a
+    `warm_price_cache` cada `interval` segundos, que a su vez difunde los cambios al stream;
+    si este proceso pasa a ser el que ingesta, las llamadas no hacen nada.
+
+    Args:
+        interval (float, opcional): Segundos entre comprobaciones. Por defecto `SHARED_SNAPSHOT_POLL`.
+    """
+    global _cache_follower
+    if _cache_follower is not None and _cache_follower.is_alive():
+        return
+
+    def follow():
+        while True:
+            time.sleep(interval)
+            if not follows_ingestion():
+                continue
+            try:
+                warm_price_cache()
+            except Exception as e:
+                logging.error("Error al recargar la caché de precios: %s", e)
+
+    _cache_follower = threading.Thread(target=follow, name='cache-follower', daemon=True)
+    _cache_follower.start()
+
+
+def read_window_history(span, until=None):
+    """
+    Lee de la base de datos los precios de los últimos `span` segundos de todas las criptomonedas.
+
+    Con `INGEST_DEDUP` el histórico se reconstruye con `expand_history` a partir del precio
+    vigente al inicio del rango.
+
+    Args:
+        span (float): Segundos hacia atrás desde `until`.
+        until (datetime, opcional): Fin del rango. Por defecto la hora actual.
+
+    Returns:
+        list[dict]: Lista con 'name' y 'history' (del más reciente al más antiguo).
+    """
+    until = until or datetime.now()
+    crypto_data = get_window_history(until - timedelta(seconds=span))
+    if INGEST_DEDUP:
+        for data in crypto_data:
+            data['history'] = expand_history(data['history'], until=until)
+    return crypto_data
+
+
+def expand_history(history, until=None, limit=None):
+    """
+    Reconstruye la serie escalonada de un histórico escrito con `INGEST_DEDUP`.
+
+    Args:
+        history (list[dict]): Precios del más reciente al más antiguo.
+        until (datetime, opcional): Fin de la serie. Por defecto la hora actual.
+        limit (int, opcional): Número máximo de puntos.
+
+    Returns:
+        list[dict]: Precios a intervalos de `INGESTION_INTERVAL`, del más reciente al más antiguo.
+    """
+    return reconstruct_steps(history, INGESTION_INTERVAL, INGEST_HEARTBEAT, until=until, limit=limit)
+
+
+def expand_rollups(buckets, resolution, until=None):
+    """
+    Rellena los intervalos sin filas de una serie de agregados escrita con `INGEST_DEDUP`.
+
+    Los agregados se calculan con los precios escritos, así que un intervalo en el que el
+    precio no cambió no tiene fila. Cada intervalo vacío a menos de `INGEST_HEARTBEAT` segundos
+    del anterior repite su cierre con 'count' 0, igual que `expand_history` con los precios.
+
+    Args:
+        buckets (list[dict]): Agregados de `get_rollup_series`, del más reciente al más antiguo.
+        resolution (str): Nombre de la resolución de `RESOLUTIONS`.
+        until (datetime, opcional): Fin de la serie. Por defecto la hora actual.
+
+    Returns:
+        list[dict]: Agregados con el mismo formato, del más reciente al más antiguo.
+    """
+    by_start = {bucket['bucket_start']: bucket for bucket in buckets}
+    history = [{'price': bucket['close'], 'timestamp': bucket['bucket_start']} for bucket in buckets]
+    return [by_start.get(point['timestamp']) or {
+        'bucket_start': point['timestamp'],
+        'open': point['price'],
+        'high': point['price'],
+        'low': point['price'],
+        'close': point['price'],
+        'count': 0,
+    } for point in reconstruct_steps(history, RESOLUTIONS[resolution], INGEST_HEARTBEAT, until=until)]
 
 
 @app.route('/api/crypto', methods=['GET'])
+@response_cache.cached(refresh=warm_price_cache)
 def get_crypto_data():
     """
     Controlador de la API para obtener datos de criptomonedas.
 
     Obtiene la información actual de las criptomonedas, incluyendo señales de compra/venta y métricas estadísticas.
     Los pasos incluyen:
-        - Actualización de los datos almacenados en la base de datos.
-        - Lectura de los datos de criptomonedas desde la base de datos.
-        - Cálculo de señales (compra/venta) y métricas (máximo, mínimo, promedio de precio en la última hora).
+        - Lectura de los datos de criptomonedas y su histórico reciente desde la caché en memoria.
+        - Cálculo de señales (compra/venta) y lectura de las métricas incrementales
+          (máximo, mínimo, promedio de precio en la última hora).
+    La respuesta se sirve desde `response_cache` (con ETag y compresión) hasta la siguiente extracción.
+
+    Query params:
+        signal (str, opcional): Regla de señal de `indicators.SIGNAL_RULES` ('last', 'sma_cross',
+            'ema_cross', 'rsi', 'macd', 'bollinger', 'sma'). Por defecto 'last', que compara
+            los dos últimos precios como `signals.generate_signal`.
 
     Returns:
         JSON: Una lista de datos de criptomonedas con las siguientes claves:
@@ -51,13 +311,30 @@ def get_crypto_data():
             - 'avg_price': Precio promedio en la última hora.
             - 'signal': Señal de compra ('B'), venta ('S') o None.
     """
-    # fetch_and_store_data()
-    crypto_data = get_all_crypto_data()
+    rule = request.args.get('signal', 'last')
+    if rule not in SIGNAL_RULES:
+        return jsonify({'error': f"Regla de señal desconocida: {rule}", 'rules': sorted(SIGNAL_RULES)}), 400
+
+    return jsonify(build_crypto_snapshot(rule))
+
+
+def build_crypto_snapshot(rule='last'):
+    """
+    Construye el estado actual de todas las criptomonedas desde la caché en memoria.
+
+    Args:
+        rule (str, opcional): Regla de señal de `indicators.SIGNAL_RULES`. Por defecto 'last'.
+
+    Returns:
+        list[dict]: Una entrada por moneda con las claves descritas en `get_crypto_data`.
+    """
+    crypto_data = price_cache.snapshot(limit=2 if rule == 'last' else price_cache.capacity)
+    with SIGNAL_SECONDS.time(rule=rule):
+        signals = compute_signals([data['history'] for data in crypto_data], rule)
+    now = datetime.now()
     signals_data = []
-    for data in crypto_data:
-        historical_prices = get_historical_prices(data['name'])
-        signal = generate_signal(historical_prices)
-        metrics = calculate_metrics(historical_prices)
+    for data, signal in zip(crypto_data, signals):
+        metrics = rolling_metrics.as_calculate_metrics(data['name'], now)
         signals_data.append({
             'name': data['name'],
             'actual_price': data['actual_price'],
@@ -66,20 +343,70 @@ def get_crypto_data():
             'avg_price': metrics['avg_price'],
             'signal': signal
         })
-    return jsonify(signals_data)
+    return signals_data
+
+
+@app.route('/api/crypto/stream', methods=['GET'])
+def stream_crypto_data():
+    """
+    Stream de Server-Sent Events con los precios y señales en vivo.
+
+    Al conectarse, el cliente recibe un evento 'snapshot' con el estado completo; después,
+    tras cada ciclo de ingesta, un evento 'update' solo con las monedas que han cambiado.
+    Ambos tienen la forma `{'timestamp': 'HH:MM:SS', 'prices': [...]}` con las entradas de
+    `/api/crypto`.
+
+    Returns:
+        Response: Respuesta `text/event-stream` que permanece abierta, o 503 si el proceso ya
+            tiene `STREAM_MAX_CLIENTS` clientes.
+    """
+    warm_price_cache()
+    if broadcaster.subscribers == 0:
+        # Sin clientes no se ha ido refrescando el estado difundido: se recalcula antes de conectar
+        publish_snapshot()
+    try:
+        client = broadcaster.subscribe()
+    except StreamFullError as e:
+        # El cliente vuelve a consultar `/api/crypto` periódicamente y reintenta el stream más tarde
+        return jsonify({'error': str(e)}), 503, {'Retry-After': str(int(INGESTION_INTERVAL))}
+    return Response(broadcaster.events(client), mimetype='text/event-stream', headers={
+        'Cache-Control': 'no-cache',
+        'X-Accel-Buffering': 'no',
+    })
+
 
 @app.route('/api/crypto/historical/<crypto_name>', methods=['GET'])
+@response_cache.cached(refresh=warm_price_cache)
 def get_crypto_historical_data(crypto_name):
     """
     Obtiene los datos históricos de una criptomoneda específica.
 
+    Sin rango devuelve los últimos precios de la última hora desde la caché en memoria.
+    Con `from` y `to` elige la resolución de `price_rollups` más gruesa que aún da `points`
+    puntos (o los precios sin agregar si el rango es demasiado corto).
+
     Args:
         crypto_name (str): Nombre de la criptomoneda.
 
+    Query params:
+        from (str, opcional): Inicio del rango en formato ISO.
+        to (str, opcional): Fin del rango en formato ISO. Por defecto la hora actual.
+        points (int, opcional): Número de puntos deseado. Por defecto 100.
+
     Returns:
-        JSON: Lista de precios históricos con timestamps.
+        JSON: Lista de precios históricos con timestamps, del más reciente al más antiguo.
+            Los agregados incluyen además 'open', 'high', 'low', 'count' y 'resolution'.
     """
-    historical_data = get_historical_prices(crypto_name, limit=30)
+    if 'from' in request.args:
+        try:
+            start = datetime.fromisoformat(request.args['from'])
+            end = datetime.fromisoformat(request.args['to']) if 'to' in request.args else datetime.now()
+            points = int(request.args.get('points', 100))
+        except ValueError as e:
+            return jsonify({'error': f"Parámetros no válidos: {e}"}), 400
+        return jsonify(get_historical_range_data(crypto_name, start, end, points))
+
+    historical_data = price_cache.get_history(crypto_name, limit=30)
     historical_data = list(filter(lambda x: (datetime.now() - x['timestamp']).total_seconds() <= 3600, historical_data))
 
     response_data = [{
@@ -89,6 +416,125 @@ def get_crypto_historical_data(crypto_name):
     return jsonify(response_data)
 
 
+def read_raw_range(crypto_name, start, end):
+    """
+    Lee los precios sin agregar de un rango, desde `tick_store` si está activo y cubre el rango.
+
+    El almacén local solo tiene los precios desde que se activó (o desde la última exportación),
+    así que los rangos que empiezan antes de su primer precio se leen de la base de datos.
+
+    Returns:
+        list[dict]: Precios del rango, del más reciente al más antiguo.
+    """
+    if tick_store is not None:
+        first = tick_store.first_timestamp(crypto_name)
+        if first is not None and first <= start:
+            return tick_store.get_historical_range(crypto_name, start, end)
+    return get_historical_range(crypto_name, start, end)
+
+
+def get_historical_range_data(crypto_name, start, end, points):
+    """
+    Lee el histórico de un rango con la resolución más adecuada.
+
+    Args:
+        crypto_name (str): Nombre de la criptomoneda.
+        start (datetime): Inicio del rango.
+        end (datetime): Fin del rango.
+        points (int): Número de puntos deseado.
+
+    Returns:
+        list[dict]: Puntos del rango, del más reciente al más antiguo.
+    """
+    resolution = choose_resolution(start, end, points)
+    if resolution is None:
+        history = read_raw_range(crypto_name, start, end)
+        if INGEST_DEDUP:
+            history = expand_history(history, until=min(end, datetime.now()))
+        return [{
+            'price': float(price['price']),
+            'timestamp': price['timestamp'].strftime('%Y-%m-%d %H:%M:%S'),
+            'resolution': 'raw'
+        } for price in history]
+
+    buckets = get_rollup_series(crypto_name, resolution, start, end)
+    if INGEST_DEDUP:
+        buckets = expand_rollups(buckets, resolution, until=min(end, datetime.now()))
+    return [{
+        'price': float(bucket['close']),
+        'open': float(bucket['open']),
+        'high': float(bucket['high']),
+        'low': float(bucket['low']),
+        'count': bucket['count'],
+        'timestamp': bucket['bucket_start'].strftime('%Y-%m-%d %H:%M:%S'),
+        'resolution': resolution
+    } for bucket in buckets]
+
+
+@app.route('/api/ingestion/status', methods=['GET'])
+def get_ingestion_status():
+    """
+    Devuelve el estado de la ingesta programada.
+
+    Returns:
+        JSON: Modo de ingesta, contadores y latencia de la última ejecución, 'staleness'
+            (segundos desde la última extracción correcta) y 'data_age' (segundos desde el
+            precio más reciente en caché). Con `INGEST_DEDUP`, 'dedup' con la reducción de escrituras.
+            Con INGESTION_MODE=leader, 'pid', 'leader' (si este proceso ingesta) y 'leader_pid'.
+            Con `ALERT_RULES_PATH`, 'alerts' con las reglas activas y las alertas disparadas.
+    """
+    ingesting = not follows_ingestion()
+    status = ingestion_scheduler.status() if ingesting else {}
+    last_tick = price_cache.last_updated()
+    status.update(
+        mode=INGESTION_MODE,
+        data_age=(datetime.now() - last_tick).total_seconds() if last_tick else None,
+    )
+    if leader_election is not None:
+        status.update(pid=os.getpid(), leader=leader_election.is_leader, leader_pid=leader_election.leader_pid())
+    if shared_snapshot is not None:
+        status['snapshot_generation'] = shared_snapshot.generation
+    if change_filter is not None and ingesting:
+        status['dedup'] = change_filter.stats()
+    if alert_engine is not None and ingesting:
+        status['alerts'] = alert_engine.stats()
+    for key, value in status.items():
+        if isinstance(value, datetime):
+            status[key] = value.isoformat()
+    return jsonify(status)
+
+
+@app.route('/metrics', methods=['GET'])
+def get_metrics():
+    """
+    Expone las métricas de `instrumentation.registry` en el formato de texto de Prometheus.
+
+    Returns:
+        Response: Contadores e histogramas de scraping, base de datos, ingesta, señales y rutas.
+    """
+    return Response(registry.render(), content_type='text/plain; version=0.0.4; charset=utf-8')
+
+
+@app.route('/debug/profile', methods=['GET'])
+def get_profile():
+    """
+    Devuelve las pilas colapsadas del perfilador por muestreo (solo con `PROFILER_INTERVAL` > 0).
+
+    Query params:
+        limit (int, opcional): Número máximo de pilas. Por defecto todas.
+        reset (str, opcional): Con '1' se descartan las muestras tras devolverlas.
+
+    Returns:
+        Response: Texto 'marco;marco;... recuento' por pila, o 404 si el perfilador está desactivado.
+    """
+    if profiler is None:
+        return jsonify({'error': "Perfilador desactivado (PROFILER_INTERVAL=0)"}), 404
+    limit = request.args.get('limit', type=int)
+    body = profiler.collapsed(limit)
+    if request.args.get('reset') == '1':
+        profiler.reset()
+    return Response(body, content_type='text/plain; charset=utf-8')
+
 
 @app.route('/')
 def index():
@@ -103,7 +549,19 @@ def index():
 if __name__ == '__main__':
     """
     Punto de entrada del script.
-    Inicializa la base de datos y ejecuta la aplicación Flask en un servidor local.
+    Inicializa la base de datos, arranca la ingesta en segundo plano (salvo con
+    INGESTION_MODE=process) y ejecuta la aplicación Flask en un servidor local.
+    Para producción con varios procesos, usar `server.py`.
     """
+    logging.basicConfig(level=os.environ.get('LOG_LEVEL', 'INFO'))
+    if profiler is not None:
+        profiler.start()
     init_db()
+    warm_price_cache()
+    if INGESTION_MODE == 'thread':
+        ingestion_scheduler.start()
+    else:
+        start_cache_follower()
+    if leader_election is not None:
+        leader_election.start()
     app.run()
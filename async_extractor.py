@@ -0,0 +1,259 @@
+import asyncio
+import logging
+import os
+import time
+from urllib.parse import urlsplit
+
+from html_parsing import parse_crypto_rows
+from transformer import ROW_FIELDS
+
+LISTING_URL_TEMPLATE = os.environ.get('LISTING_URL_TEMPLATE', 'https://es.investing.com/crypto/currencies?page={page}')
+SCRAPE_CONCURRENCY = int(os.environ.get('SCRAPE_CONCURRENCY', 8))
+SCRAPE_RATE_PER_HOST = float(os.environ.get('SCRAPE_RATE_PER_HOST', 4))
+SCRAPE_RETRIES = int(os.environ.get('SCRAPE_RETRIES', 2))
+SCRAPE_RETRY_BUDGET = int(os.environ.get('SCRAPE_RETRY_BUDGET', 20))
+
+
+class RateLimiter:
+    """
+    Limitador de peticiones por token bucket para un host.
+
+    Args:
+        rate (float): Peticiones por segundo sostenidas.
+        burst (int, opcional): Peticiones que pueden lanzarse seguidas. Por defecto `rate` redondeado.
+    """
+
+    def __init__(self, rate, burst=None):
+        self.rate = rate
+        self.capacity = burst or max(1, int(rate))
+        self._tokens = float(self.capacity)
+        self._updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    async def acquire(self):
+        """Espera hasta que haya un token disponible y lo consume."""
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                await asyncio.sleep((1 - self._tokens) / self.rate)
+
+
+class RetryBudget:
+    """
+    Número total de reintentos disponibles para toda una extracción.
+
+    Evita que un host caído multiplique las peticiones: cuando se agota el presupuesto,
+    los fallos se dan por definitivos.
+
+    Args:
+        budget (int): Reintentos permitidos.
+    """
+
+    def __init__(self, budget):
+        self.remaining = budget
+
+    def try_spend(self):
+        """
+        Returns:
+            bool: True si quedaba presupuesto y se ha consumido un reintento.
+        """
+        if self.remaining <= 0:
+            return False
+        self.remaining -= 1
+        return True
+
+
+class AsyncExtractor:
+    """
+    Motor de extracción concurrente de varias páginas con asyncio.
+
+    Descarga las páginas del listado y, opcionalmente, una página de detalle por moneda,
+    con un semáforo que acota las peticiones simultáneas, un limitador por host y un
+    presupuesto global de reintentos. Las descargas se ejecutan en hilos (`asyncio.to_thread`)
+    sobre una sesión HTTP compartida, de modo que se reutilizan las conexiones keep-alive.
+
+    Args:
+        session: Objeto con método `get(url, timeout=...)` al estilo de `requests.Session`.
+            Por defecto la sesión compartida de `extractor.get_http_session()`.
+        concurrency (int, opcional): Peticiones simultáneas. Por defecto `SCRAPE_CONCURRENCY`.
+        rate_per_host (float, opcional): Peticiones por segundo por host. Por defecto `SCRAPE_RATE_PER_HOST`.
+        retries (int, opcional): Reintentos máximos por URL. Por defecto `SCRAPE_RETRIES`.
+        retry_budget (int, opcional): Reintentos máximos por extracción. Por defecto `SCRAPE_RETRY_BUDGET`.
+        backoff (float, opcional): Espera base en segundos entre reintentos. Por defecto 0.5.
+    """
+
+    def __init__(self, session=None, concurrency=SCRAPE_CONCURRENCY, rate_per_host=SCRAPE_RATE_PER_HOST,
+                 retries=SCRAPE_RETRIES, retry_budget=SCRAPE_RETRY_BUDGET, backoff=0.5):
+        self.session = session
+        self.concurrency = concurrency
+        self.rate_per_host = rate_per_host
+        self.retries = retries
+        self.retry_budget = retry_budget
+        self.backoff = backoff
+        self.stats = {'requests': 0, 'failures': 0, 'retries': 0, 'seconds': 0.0}
+
+    def _get_session(self):
+        if self.session is None:
+            from extractor import get_http_session
+            self.session = get_http_session()
+        return self.session
+
+    def _fetch_sync(self, url):
+        response = self._get_session().get(url, timeout=30)
+        response.raise_for_status()
+        return response.text
+
+    async def _fetch(self, url, semaphore, limiters, budget):
+        host = urlsplit(url).netloc
+        limiter = limiters.setdefault(host, RateLimiter(self.rate_per_host))
+        attempt = 0
+        while True:
+            async with semaphore:
+                await limiter.acquire()
+                self.stats['requests'] += 1
+                try:
+                    return await asyncio.to_thread(self._fetch_sync, url)
+                except Exception as e:
+                    error = e
+            if attempt >= self.retries or not budget.try_spend():
+                self.stats['failures'] += 1
+                logging.warning("No se pudo descargar %s: %s", url, error)
+                return None
+            attempt += 1
+            self.stats['retries'] += 1
+            await asyncio.sleep(self.backoff * 2 ** (attempt - 1))
+
+    async def fetch_all(self, urls):
+        """
+        Descarga varias URLs de forma concurrente.
+
+        Args:
+            urls (list[str]): URLs a descargar.
+
+        Returns:
+            list[str | None]: HTML de cada URL en el mismo orden; None si falló definitivamente.
+        """
+        semaphore = asyncio.Semaphore(self.concurrency)
+        limiters = {}
+        budget = RetryBudget(self.retry_budget)
+        return await asyncio.gather(*(self._fetch(url, semaphore, limiters, budget) for url in urls))
+
+    async def stream(self, pages=1, url_template=LISTING_URL_TEMPLATE):
+        """
+        Genera las filas de cada página del listado en cuanto se descarga.
+
+        Args:
+            pages (int, opcional): Número de páginas del listado. Por defecto 1.
+            url_template (str, opcional): Plantilla de URL con `{page}`. Por defecto `LISTING_URL_TEMPLATE`.
+
+        Yields:
+            list[str]: Filas sin duplicados (por nombre) en el formato de `transform_data`.
+        """
+        semaphore = asyncio.Semaphore(self.concurrency)
+        limiters = {}
+        budget = RetryBudget(self.retry_budget)
+        seen = set()
+        tasks = [
+            asyncio.ensure_future(self._fetch(url_template.format(page=page), semaphore, limiters, budget))
+            for page in range(1, pages + 1)
+        ]
+        try:
+            for next_page in asyncio.as_completed(tasks):
+                html = await next_page
+                if html is None:
+                    continue
+                for row in parse_crypto_rows(html):
+                    name = row[ROW_FIELDS['name']]
+                    if name and name not in seen:
+                        seen.add(name)
+                        yield row
+        finally:
+            for task in tasks:
+                task.cancel()
+
+    async def extract(self, pages=1, url_template=LISTING_URL_TEMPLATE, detail_url=None, detail_parser=None):
+        """
+        Extrae las filas de varias páginas del listado y, opcionalmente, de las páginas de detalle.
+
+        Args:
+            pages (int, opcional): Número de páginas del listado. Por defecto 1.
+            url_template (str, opcional): Plantilla de URL con `{page}`. Por defecto `LISTING_URL_TEMPLATE`.
+            detail_url (callable, opcional): Recibe una fila y devuelve la URL de su página de
+                detalle, o None si no hay que descargarla.
+            detail_parser (callable, opcional): Recibe el HTML de detalle y la fila, y completa la fila.
+
+        Returns:
+            list[list[str]]: Filas sin duplicados (por nombre) en el formato de `transform_data`.
+        """
+        start = time.perf_counter()
+        urls = [url_template.format(page=page) for page in range(1, pages + 1)]
+        rows = []
+        seen = set()
+        for html in await self.fetch_all(urls):
+            if html is None:
+                continue
+            for row in parse_crypto_rows(html):
+                name = row[ROW_FIELDS['name']]
+                if name and name not in seen:
+                    seen.add(name)
+                    rows.append(row)
+
+        if detail_url is not None and detail_parser is not None:
+            targets = [(row, detail_url(row)) for row in rows]
+            targets = [(row, url) for row, url in targets if url]
+            pages_html = await self.fetch_all([url for _, url in targets])
+            for (row, _), html in zip(targets, pages_html):
+                if html is not None:
+                    detail_parser(html, row)
+
+        self.stats['seconds'] += time.perf_counter() - start
+        return rows
+
+
+def iter_listing_rows(pages, url_template=LISTING_URL_TEMPLATE, maxsize=None, extractor=None):
+    """
+    Genera las filas de varias páginas del listado a medida que se descargan.
+
+    Las páginas se procesan en orden de llegada en un hilo con su propio bucle de asyncio;
+    las filas pasan al consumidor por una cola acotada (`pipeline.threaded_source`), así que
+    la extracción se frena cuando el consumidor va más lento.
+
+    Args:
+        pages (int): Número de páginas del listado.
+        url_template (str, opcional): Plantilla de URL con `{page}`. Por defecto `LISTING_URL_TEMPLATE`.
+        maxsize (int, opcional): Capacidad de la cola. Por defecto `pipeline.PIPELINE_QUEUE_SIZE`.
+        extractor (AsyncExtractor, opcional): Motor a usar. Por defecto uno nuevo.
+
+    Yields:
+        list[str]: Filas sin duplicados (por nombre) en el formato de `transform_data`.
+    """
+    from pipeline import PIPELINE_QUEUE_SIZE, threaded_source
+
+    extractor = extractor or AsyncExtractor()
+
+    def produce(emit):
+        async def consume():
+            async for row in extractor.stream(pages, url_template):
+                emit(row)
+        asyncio.run(consume())
+
+    return threaded_source(produce, maxsize or PIPELINE_QUEUE_SIZE)
+
+
+def scrape_listing_pages(pages, **kwargs):
+    """
+    Versión síncrona de `AsyncExtractor.extract`, para usarse como nivel de `extract_crypto_data`.
+
+    Args:
+        pages (int): Número de páginas del listado.
+        **kwargs: Argumentos adicionales de `AsyncExtractor.extract`.
+
+    Returns:
+        list[list[str]]: Filas extraídas.
+    """
+    return asyncio.run(AsyncExtractor().extract(pages=pages, **kwargs))
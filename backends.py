@@ -0,0 +1,466 @@
+import logging
+import os
+import sqlite3
+import threading
+from datetime import datetime
+
+from rollups import UPSERT_SQL
+
+script_dir = os.path.dirname(os.path.abspath(__file__))
+
+# 'mysql' (servidor en localhost) o 'sqlite' (fichero local, sin servidor)
+DB_BACKEND = os.environ.get('DB_BACKEND', 'mysql')
+SQLITE_PATH = os.environ.get('SQLITE_PATH', os.path.join(script_dir, 'scraping_cripto.db'))
+
+# SQLite guarda los DATETIME como texto ISO; se convierten de vuelta a `datetime` al leerlos
+sqlite3.register_adapter(datetime, lambda value: value.isoformat(' '))
+sqlite3.register_converter('DATETIME', lambda value: datetime.fromisoformat(value.decode()))
+
+
+class StorageBackend:
+    """
+    Interfaz de almacenamiento usada por `database.py`.
+
+    Cada backend aporta la conexión, el esquema y el SQL de las cuatro operaciones del
+    ciclo de ingesta y lectura: upsert del precio actual, inserción masiva del histórico,
+    lectura por rango y último precio (con histórico reciente) por moneda. Las consultas se
+    escriben con marcadores `%s`; `prepare` las adapta al estilo del driver.
+    """
+
+    name = None
+    schema_file = None
+
+    UPSERT_LATEST_SQL = None
+    INSERT_HISTORY_SQL = '''
+        INSERT INTO historical_prices
+            (name, price, timestamp)
+        VALUES
+            (%s, %s, %s)
+    '''
+    UPSERT_ROLLUP_SQL = None
+    HISTORY_SQL = '''
+        SELECT
+            CAST(price AS DECIMAL(20,8)) as price,
+            timestamp
+        FROM historical_prices
+        WHERE name = %s
+            AND price IS NOT NULL
+        ORDER BY timestamp DESC
+        LIMIT %s
+    '''
+    RANGE_SQL = '''
+        SELECT
+            CAST(price AS DECIMAL(20,8)) as price,
+            timestamp
+        FROM historical_prices
+        WHERE name = %s
+            AND timestamp >= %s
+            AND timestamp < %s
+            AND price IS NOT NULL
+        ORDER BY timestamp DESC
+        LIMIT %s
+    '''
+    LATEST_SQL = '''
+        SELECT
+            name,
+            CAST(actual_price AS DECIMAL(20,8)) as actual_price
+        FROM crypto_prices
+        WHERE actual_price IS NOT NULL
+        ORDER BY name
+    '''
+    # LATERAL (MySQL 8.0.14+): una lectura del índice (name, timestamp) por moneda, que no
+    # depende del histórico acumulado
+    LATEST_WITH_HISTORY_SQL = '''
+        SELECT
+            c.name,
+            CAST(c.actual_price AS DECIMAL(20,8)) as actual_price,
+            h.price,
+            h.timestamp
+        FROM crypto_prices c
+        LEFT JOIN LATERAL (
+            SELECT
+                CAST(price AS DECIMAL(20,8)) as price,
+                timestamp
+            FROM historical_prices
+            WHERE name = c.name
+                AND price IS NOT NULL
+            ORDER BY timestamp DESC
+            LIMIT %s
+        ) h ON TRUE
+        WHERE c.actual_price IS NOT NULL
+        ORDER BY c.name, h.timestamp DESC
+    '''
+    # Precios desde `since` de cada moneda, más el último anterior (el que sigue vigente en `since`)
+    WINDOW_HISTORY_SQL = '''
+        SELECT
+            c.name,
+            CAST(h.price AS DECIMAL(20,8)) as price,
+            h.timestamp
+        FROM crypto_prices c
+        JOIN historical_prices h
+            ON h.name = c.name
+            AND h.price IS NOT NULL
+            AND h.timestamp >= COALESCE((
+                SELECT MAX(timestamp)
+                FROM historical_prices
+                WHERE name = c.name
+                    AND price IS NOT NULL
+                    AND timestamp < %s
+            ), %s)
+        WHERE c.actual_price IS NOT NULL
+        ORDER BY c.name, h.timestamp DESC
+    '''
+
+    @property
+    def schema_path(self):
+        """str: Ruta del script de esquema del backend."""
+        return os.path.join(script_dir, self.schema_file)
+
+    def connect(self):
+        """Abre una conexión nueva."""
+        raise NotImplementedError
+
+    def cursor(self, conn, dictionary=False):
+        """
+        Args:
+            conn: Conexión abierta con `connect`.
+            dictionary (bool, opcional): Si es True, las filas se devuelven como diccionarios.
+
+        Returns:
+            Cursor del driver.
+        """
+        raise NotImplementedError
+
+    def prepare(self, query):
+        """
+        Adapta una consulta escrita con marcadores `%s` al driver.
+
+        Args:
+            query (str): Consulta SQL.
+
+        Returns:
+            str: Consulta lista para `cursor.execute`.
+        """
+        return query
+
+    def upsert_latest(self, cursor, rows):
+        """
+        Inserta o actualiza el precio actual de cada moneda en `crypto_prices`.
+
+        Args:
+            cursor: Cursor de la transacción del llamador.
+            rows (list[tuple]): Tuplas (name, price, timestamp).
+        """
+        cursor.executemany(self.prepare(self.UPSERT_LATEST_SQL), rows)
+
+    def insert_history(self, cursor, rows):
+        """
+        Añade precios a `historical_prices`.
+
+        Args:
+            cursor: Cursor de la transacción del llamador.
+            rows (list[tuple]): Tuplas (name, price, timestamp).
+        """
+        cursor.executemany(self.prepare(self.INSERT_HISTORY_SQL), rows)
+
+    def after_init(self):
+        """Migraciones propias del backend tras ejecutar el script de esquema."""
+
+    def maintain(self):
+        """Mantenimiento periódico del backend; se ejecuta aunque el esquema ya esté al día."""
+
+
+class MySQLBackend(StorageBackend):
+    """
+    Backend MySQL: `historical_prices` particionada por fecha y upserts con `ON DUPLICATE KEY`.
+
+    `mysql.connector` reescribe los `executemany` de INSERT como un único INSERT de varias filas.
+    """
+
+    name = 'mysql'
+    schema_file = 'schema.sql'
+
+    UPSERT_LATEST_SQL = '''
+        INSERT INTO crypto_prices (name, actual_price, last_updated)
+        VALUES (%s, %s, %s) ON DUPLICATE KEY
+        UPDATE
+            actual_price = VALUES(actual_price),
+            last_updated = VALUES(last_updated)
+    '''
+    UPSERT_ROLLUP_SQL = UPSERT_SQL
+
+    def connect(self):
+        import mysql.connector
+
+        return mysql.connector.connect(
+            host="localhost",  # Servidor MySQL
+            user="operador",  # Usuario de MySQL
+            password="",  # Contraseña
+            database="scraping_cripto",  # Nombre de la base de datos
+            auth_plugin='mysql_native_password'
+        )
+
+    def cursor(self, conn, dictionary=False):
+        return conn.cursor(dictionary=dictionary)
+
+    def after_init(self):
+        # Bases de datos creadas con el esquema anterior: índice (name, timestamp) y particionado
+        from partitions import migrate_historical_prices
+        migrate_historical_prices()
+
+    def maintain(self):
+        # Particiones de los próximos periodos y, con HISTORY_RETENTION_DAYS, borrado de las caducadas
+        from partitions import HISTORY_RETENTION_DAYS, run_retention
+        result = run_retention(int(HISTORY_RETENTION_DAYS) if HISTORY_RETENTION_DAYS else None)
+        if result['created'] or result['dropped']:
+            logging.info("Particiones creadas: %s, eliminadas: %s", result['created'], result['dropped'])
+
+
+def _dict_factory(cursor, row):
+    return {column[0]: value for column, value in zip(cursor.description, row)}
+
+
+class SQLiteBackend(StorageBackend):
+    """
+    Backend SQLite embebido, para despliegues de un solo nodo y pruebas sin servidor.
+
+    Usa el modo WAL (las lecturas no bloquean a la escritura), `synchronous=NORMAL`, la caché
+    de sentencias preparadas del driver y un índice (name, timestamp, price) que cubre las
+    lecturas del histórico sin acceder a la tabla. Los precios se guardan como REAL.
+
+    Args:
+        path (str, opcional): Fichero de la base de datos o ':memory:'. Por defecto `SQLITE_PATH`.
+    """
+
+    name = 'sqlite'
+    schema_file = 'schema_sqlite.sql'
+
+    UPSERT_LATEST_SQL = '''
+        INSERT INTO crypto_prices (name, actual_price, last_updated)
+        VALUES (%s, %s, %s)
+        ON CONFLICT(name) DO UPDATE SET
+            actual_price = excluded.actual_price,
+            last_updated = excluded.last_updated
+    '''
+    UPSERT_ROLLUP_SQL = '''
+        INSERT INTO price_rollups
+            (name, resolution, bucket_start, open, high, low, close, count)
+        VALUES
+            (%s, %s, %s, %s, %s, %s, %s, %s)
+        ON CONFLICT(name, resolution, bucket_start) DO UPDATE SET
+            high = MAX(high, excluded.high),
+            low = MIN(low, excluded.low),
+            close = excluded.close,
+            count = count + excluded.count
+    '''
+    # Sin CAST: en SQLite convertiría los precios enteros en `int`
+    HISTORY_SQL = '''
+        SELECT price, timestamp
+        FROM historical_prices
+        WHERE name = %s
+            AND price IS NOT NULL
+        ORDER BY timestamp DESC
+        LIMIT %s
+    '''
+    RANGE_SQL = '''
+        SELECT price, timestamp
+        FROM historical_prices
+        WHERE name = %s
+            AND timestamp >= %s
+            AND timestamp < %s
+            AND price IS NOT NULL
+        ORDER BY timestamp DESC
+        LIMIT %s
+    '''
+    LATEST_SQL = '''
+        SELECT name, actual_price
+        FROM crypto_prices
+        WHERE actual_price IS NOT NULL
+        ORDER BY name
+    '''
+    # Sin LATERAL: cada moneda acota su histórico por el timestamp de su precio número `limit`,
+    # que se obtiene del índice (name, timestamp, price); con empates pueden sobrar filas
+    LATEST_WITH_HISTORY_SQL = '''
+        SELECT
+            c.name,
+            c.actual_price,
+            h.price,
+            h.timestamp
+        FROM crypto_prices c
+        LEFT JOIN historical_prices h
+            ON h.name = c.name
+            AND h.price IS NOT NULL
+            AND h.timestamp >= COALESCE((
+                SELECT timestamp
+                FROM historical_prices
+                WHERE name = c.name
+                    AND price IS NOT NULL
+                ORDER BY timestamp DESC
+                LIMIT 1 OFFSET %s - 1
+            ), '')
+        WHERE c.actual_price IS NOT NULL
+        ORDER BY c.name, h.timestamp DESC
+    '''
+    WINDOW_HISTORY_SQL = '''
+        SELECT c.name, h.price, h.timestamp
+        FROM crypto_prices c
+        JOIN historical_prices h
+            ON h.name = c.name
+            AND h.price IS NOT NULL
+            AND h.timestamp >= COALESCE((
+                SELECT MAX(timestamp)
+                FROM historical_prices
+                WHERE name = c.name
+                    AND price IS NOT NULL
+                    AND timestamp < %s
+            ), %s)
+        WHERE c.actual_price IS NOT NULL
+        ORDER BY c.name, h.timestamp DESC
+    '''
+
+    def __init__(self, path=SQLITE_PATH):
+        self.path = path
+        self._prepared = {}
+        self._sentinel = None
+        self._sentinel_lock = threading.Lock()
+
+    def _open(self, target, uri):
+        # El pool garantiza que cada conexión la usa un solo hilo a la vez
+        conn = sqlite3.connect(target, timeout=30, detect_types=sqlite3.PARSE_DECLTYPES,
+                               check_same_thread=False, cached_statements=256, uri=uri)
+        conn.execute('PRAGMA journal_mode=WAL')
+        conn.execute('PRAGMA synchronous=NORMAL')
+        return conn
+
+    def connect(self):
+        if self.path != ':memory:':
+            return self._open(self.path, False)
+        # Todas las conexiones del pool comparten la misma base de datos en memoria, que SQLite
+        # borra al cerrarse la última: el backend guarda una conexión propia mientras exista
+        target = f"file:cripto_{id(self)}?mode=memory&cache=shared"
+        with self._sentinel_lock:
+            if self._sentinel is None:
+                self._sentinel = self._open(target, True)
+        return self._open(target, True)
+
+    def cursor(self, conn, dictionary=False):
+        cursor = conn.cursor()
+        if dictionary:
+            cursor.row_factory = _dict_factory
+        return cursor
+
+    def prepare(self, query):
+        prepared = self._prepared.get(query)
+        if prepared is None:
+            prepared = self._prepared[query] = query.replace('%s', '?')
+        return prepared
+
+
+BACKENDS = {
+    'mysql': MySQLBackend,
+    'sqlite': SQLiteBackend,
+}
+
+
+def create_backend(name=DB_BACKEND, **kwargs):
+    """
+    Crea un backend de almacenamiento por nombre.
+
+    Args:
+        name (str, opcional): Clave de `BACKENDS`. Por defecto `DB_BACKEND`.
+        **kwargs: Argumentos del constructor del backend (p. ej. `path` para SQLite).
+
+    Returns:
+        StorageBackend: Backend creado.
+
+    Raises:
+        ValueError: Si el backend no existe.
+    """
+    try:
+        return BACKENDS[name](**kwargs)
+    except KeyError:
+        raise ValueError(f"Backend de almacenamiento desconocido: {name!r} (disponibles: {sorted(BACKENDS)})") from None
+
+
+def run_benchmark(name, coins=500, cycles=20, **kwargs):
+    """
+    Mide el ciclo de ingesta y las lecturas principales sobre un backend.
+
+    Configura `database.py` con el backend indicado, crea el esquema y escribe `cycles`
+    extracciones sintéticas de `coins` monedas antes de medir las lecturas.
+
+    Args:
+        name (str): Clave de `BACKENDS`.
+        coins (int, opcional): Monedas por extracción. Por defecto 500.
+        cycles (int, opcional): Extracciones a escribir. Por defecto 20.
+        **kwargs: Argumentos del constructor del backend.
+
+    Returns:
+        dict: Segundos por extracción escrita, por lectura del último precio con histórico
+            y por lectura de rango de una moneda.
+    """
+    import time
+    from datetime import timedelta
+
+    from database import (configure_backend, get_crypto_data_with_history, get_historical_range,
+                          init_db, insert_scrape_batch)
+
+    configure_backend(name, **kwargs)
+    init_db()
+    origin = datetime(2024, 1, 1)
+
+    start = time.perf_counter()
+    for cycle in range(cycles):
+        timestamp = origin + timedelta(minutes=cycle)
+        insert_scrape_batch([
+            {'name': f"Coin{i}", 'actual_price': 100.0 + i + cycle * 0.01, 'timestamp': timestamp}
+            for i in range(coins)
+        ])
+    write_seconds = (time.perf_counter() - start) / cycles
+
+    start = time.perf_counter()
+    latest = get_crypto_data_with_history(limit=100)
+    latest_seconds = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for i in range(coins):
+        get_historical_range(f"Coin{i}", origin, origin + timedelta(minutes=cycles))
+    range_seconds = (time.perf_counter() - start) / coins
+
+    return {
+        'backend': name,
+        'coins': len(latest),
+        'cycles': cycles,
+        'write_seconds_per_cycle': round(write_seconds, 6),
+        'latest_with_history_seconds': round(latest_seconds, 6),
+        'range_read_seconds': round(range_seconds, 6),
+    }
+
+
+if __name__ == '__main__':
+    """
+    Compara los backends con la misma carga sintética:
+
+        python backends.py --backends sqlite mysql --coins 500 --cycles 20
+    """
+    import argparse
+    import json
+    import tempfile
+
+    parser = argparse.ArgumentParser(description="Compara los backends de almacenamiento")
+    parser.add_argument('--backends', nargs='+', default=['sqlite'], choices=sorted(BACKENDS))
+    parser.add_argument('--coins', type=int, default=500)
+    parser.add_argument('--cycles', type=int, default=20)
+    args = parser.parse_args()
+
+    results = []
+    for backend_name in args.backends:
+        kwargs = {}
+        if backend_name == 'sqlite':
+            # Fichero temporal: la comparación incluye el coste real de WAL y fsync
+            kwargs['path'] = os.path.join(tempfile.mkdtemp(), 'benchmark.db')
+        try:
+            results.append(run_benchmark(backend_name, args.coins, args.cycles, **kwargs))
+        except Exception as e:
+            results.append({'backend': backend_name, 'error': str(e)})
+    print(json.dumps(results, indent=2))
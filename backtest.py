@@ -0,0 +1,448 @@
+import argparse
+import itertools
+import json
+import os
+import time
+from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timedelta
+
+import numpy as np
+
+from indicators import BUY, NEUTRAL, SELL, bollinger, ema, macd, rsi, sma
+from ingest import INGEST_DEDUP, INGEST_HEARTBEAT, reconstruct_steps
+from scheduler import INGESTION_INTERVAL
+from signals import generate_signal
+from tickstore import TickStore, to_micros
+
+BACKTEST_CHUNK = timedelta(days=float(os.environ.get('BACKTEST_CHUNK_DAYS', 7)))
+# Coste de cada cambio de posición, como fracción del capital (0.001 = 0,1 %)
+BACKTEST_FEE = float(os.environ.get('BACKTEST_FEE', 0.001))
+BACKTEST_WORKERS = int(os.environ.get('BACKTEST_WORKERS', os.cpu_count() or 1))
+# Con INGEST_DEDUP el histórico solo tiene los cambios de precio: se reconstruye a intervalos de la ingesta
+BACKTEST_STEP = INGESTION_INTERVAL if INGEST_DEDUP else None
+
+# Límite de filas por tramo; el tramo se elige para no alcanzarlo
+_NO_LIMIT = 2 ** 31 - 1
+
+STRATEGIES = {}
+
+
+def register_strategy(name, **grid):
+    """
+    Decorador que registra una estrategia en `STRATEGIES` con su rejilla de parámetros.
+
+    Una estrategia recibe los precios de una moneda (array float64 en orden cronológico) y los
+    parámetros, y devuelve un array con `BUY`, `SELL` o `NEUTRAL` por tick usando solo los
+    precios hasta ese tick. Puede devolver None si la combinación de parámetros no tiene sentido.
+
+    Args:
+        name (str): Nombre con el que se selecciona la estrategia.
+        **grid: Lista de valores de cada parámetro que recorre la búsqueda.
+    """
+    def decorator(fn):
+        STRATEGIES[name] = (fn, grid)
+        return fn
+    return decorator
+
+
+def _sign(values):
+    return np.nan_to_num(np.sign(values)).astype(np.int8)
+
+
+@register_strategy('generate_signal')
+def generate_signal_strategy(prices):
+    """Referencia: reproduce `signals.generate_signal` tick a tick, sin vectorizar."""
+    codes = {'B': BUY, 'S': SELL}
+    out = np.zeros(len(prices), dtype=np.int8)
+    values = prices.tolist()
+    for i in range(1, len(values)):
+        out[i] = codes.get(generate_signal([{'price': values[i]}, {'price': values[i - 1]}]), NEUTRAL)
+    return out
+
+
+@register_strategy('last')
+def last_change_strategy(prices):
+    """Equivalente vectorizado de `generate_signal`: compra si el precio sube y vende si baja."""
+    return _sign(np.diff(prices, prepend=prices[:1]))
+
+
+@register_strategy('sma_cross', fast=(5, 10, 20), slow=(50, 100, 200))
+def sma_cross_strategy(prices, fast, slow):
+    """Compra mientras la SMA rápida está por encima de la lenta y vende en el caso contrario."""
+    if fast >= slow:
+        return None
+    return _sign(sma(prices, fast) - sma(prices, slow))
+
+
+@register_strategy('ema_cross', fast=(5, 12), slow=(26, 50, 100))
+def ema_cross_strategy(prices, fast, slow):
+    """Compra mientras la EMA rápida está por encima de la lenta y vende en el caso contrario."""
+    if fast >= slow:
+        return None
+    return _sign(ema(prices, fast) - ema(prices, slow))
+
+
+@register_strategy('rsi', period=(7, 14, 21), oversold=(20, 30), overbought=(70, 80))
+def rsi_strategy(prices, period, oversold, overbought):
+    """Compra en sobreventa y vende en sobrecompra."""
+    values = rsi(prices, period)
+    return np.where(values < oversold, BUY, np.where(values > overbought, SELL, NEUTRAL)).astype(np.int8)
+
+
+@register_strategy('macd', fast=(12,), slow=(26,), signal=(9,))
+def macd_strategy(prices, fast, slow, signal):
+    """Compra mientras la línea MACD está por encima de su señal y vende en el caso contrario."""
+    line, signal_line, _ = macd(prices, fast, slow, signal)
+    return _sign(line - signal_line)
+
+
+@register_strategy('bollinger', window=(20, 50), k=(2.0, 2.5))
+def bollinger_strategy(prices, window, k):
+    """Compra por debajo de la banda inferior y vende por encima de la superior."""
+    lower, _, upper = bollinger(prices, window, k)
+    return np.where(prices < lower, BUY, np.where(prices > upper, SELL, NEUTRAL)).astype(np.int8)
+
+
+def param_grid(grid):
+    """
+    Args:
+        grid (dict): Lista de valores por parámetro.
+
+    Returns:
+        list[dict]: Todas las combinaciones de parámetros.
+    """
+    names = sorted(grid)
+    return [dict(zip(names, values)) for values in itertools.product(*(grid[name] for name in names))]
+
+
+def iter_db_chunks(name, start=None, end=None, chunk=BACKTEST_CHUNK, interval=BACKTEST_STEP,
+                   heartbeat=INGEST_HEARTBEAT):
+    """
+    Lee el histórico de una moneda desde la base de datos por tramos de tiempo.
+
+    Con `interval` el histórico es el que escribió `ingest.ChangeFilter` y cada tramo se
+    reconstruye con `reconstruct_steps`, arrastrando el último precio del tramo anterior (o el
+    último anterior a `start`) para rellenar el comienzo del tramo.
+
+    Args:
+        name (str): Nombre de la criptomoneda.
+        start (datetime, opcional): Inicio del rango. Por defecto el primer precio de la moneda.
+        end (datetime, opcional): Fin del rango (excluido). Por defecto justo después del último.
+        chunk (timedelta, opcional): Tamaño de cada tramo. Por defecto `BACKTEST_CHUNK`.
+        interval (float, opcional): Segundos entre extracciones. Por defecto `BACKTEST_STEP`.
+        heartbeat (float, opcional): Heartbeat del filtro. Por defecto `INGEST_HEARTBEAT`.
+
+    Yields:
+        tuple[np.ndarray, np.ndarray]: Timestamps (int64, microsegundos) y precios (float64)
+            de cada tramo, en orden cronológico.
+    """
+    from database import get_historical_range, get_history_bounds, query_db
+
+    carry = None
+    if interval is not None and start is not None:
+        carry = query_db('''
+            SELECT price, timestamp
+            FROM historical_prices
+            WHERE name = %s
+                AND timestamp < %s
+                AND price IS NOT NULL
+            ORDER BY timestamp DESC
+            LIMIT 1
+        ''', (name, start), one=True)
+
+    if start is None or end is None:
+        bounds = get_history_bounds(name)
+        if bounds is None:
+            return
+        start = start or bounds[0]
+        end = end or bounds[1] + timedelta(seconds=1)
+
+    lo = start
+    while lo < end:
+        hi = min(lo + chunk, end)
+        rows = get_historical_range(name, lo, hi, limit=_NO_LIMIT)
+        if interval is not None:
+            history = rows + ([carry] if carry is not None else [])
+            carry = rows[0] if rows else carry
+            rows = [point for point in reconstruct_steps(history, interval, heartbeat, until=hi)
+                    if point['timestamp'] >= lo]
+        if rows:
+            rows.reverse()
+            yield (np.fromiter((to_micros(row['timestamp']) for row in rows), np.int64, len(rows)),
+                   np.fromiter((float(row['price']) for row in rows), np.float64, len(rows)))
+        lo = hi
+
+
+def iter_tickstore_chunks(store, name, start=None, end=None, chunk=1_000_000):
+    """
+    Lee el histórico de una moneda desde un `TickStore` exportado, por tramos de `chunk` ticks.
+
+    Args:
+        store (TickStore): Almacén local de precios.
+        name (str): Nombre de la criptomoneda.
+        start (datetime, opcional): Inicio del rango.
+        end (datetime, opcional): Fin del rango (excluido).
+        chunk (int, opcional): Ticks por tramo. Por defecto 1.000.000.
+
+    Yields:
+        tuple[np.ndarray, np.ndarray]: Timestamps y precios de cada tramo (vistas del fichero).
+    """
+    ticks = store.read(name, start, end)
+    for i in range(0, len(ticks.prices), chunk):
+        yield ticks.timestamps[i:i + chunk], ticks.prices[i:i + chunk]
+
+
+def load_series(source, name, start=None, end=None):
+    """
+    Reúne los tramos del histórico de una moneda en un único array.
+
+    Args:
+        source (str): 'db' o el directorio de un `TickStore`.
+        name (str): Nombre de la criptomoneda.
+        start (datetime, opcional): Inicio del rango.
+        end (datetime, opcional): Fin del rango (excluido).
+
+    Returns:
+        tuple[np.ndarray, np.ndarray]: Timestamps y precios en orden cronológico.
+    """
+    chunks = iter_db_chunks(name, start, end) if source == 'db' \
+        else iter_tickstore_chunks(TickStore(source), name, start, end)
+    timestamps, prices = [], []
+    for chunk_timestamps, chunk_prices in chunks:
+        timestamps.append(chunk_timestamps)
+        prices.append(chunk_prices)
+    if not prices:
+        return np.empty(0, np.int64), np.empty(0, np.float64)
+    return np.concatenate(timestamps), np.concatenate(prices)
+
+
+def list_coins(source):
+    """
+    Args:
+        source (str): 'db' o el directorio de un `TickStore`.
+
+    Returns:
+        list[str]: Monedas con histórico.
+    """
+    if source == 'db':
+        from database import query_db
+        return sorted(row['name'] for row in query_db('SELECT DISTINCT name FROM historical_prices'))
+    return TickStore(source).coins()
+
+
+def positions(signals, allow_short=False):
+    """
+    Convierte las señales en la posición mantenida tras cada tick.
+
+    'B' abre (o mantiene) una posición larga, 'S' la cierra (o abre una corta con
+    `allow_short`) y sin señal se mantiene la posición anterior.
+
+    Args:
+        signals (np.ndarray): `BUY`, `SELL` o `NEUTRAL` por tick.
+        allow_short (bool, opcional): Permite posiciones cortas. Por defecto False.
+
+    Returns:
+        np.ndarray: Posición (1, 0 o -1) por tick.
+    """
+    target = np.where(signals == BUY, 1.0, np.where(signals == SELL, -1.0 if allow_short else 0.0, np.nan))
+    last = np.where(np.isnan(target), 0, np.arange(len(target)))
+    np.maximum.accumulate(last, out=last)
+    held = target[last]
+    held[np.isnan(held)] = 0.0  # antes de la primera señal
+    return held
+
+
+def evaluate(prices, signals, fee=BACKTEST_FEE, allow_short=False):
+    """
+    Calcula el resultado de operar una serie de precios con unas señales.
+
+    La posición decidida en el tick `t` se aplica al rendimiento de `t` a `t + 1`, de modo que
+    una señal nunca usa precios futuros. Cada cambio de posición paga `fee` por unidad cambiada;
+    en 'hit_rate' cada operación cuenta su comisión de entrada y la de salida.
+
+    Args:
+        prices (np.ndarray): Precios en orden cronológico.
+        signals (np.ndarray): `BUY`, `SELL` o `NEUTRAL` por tick.
+        fee (float, opcional): Coste por cambio de posición. Por defecto `BACKTEST_FEE`.
+        allow_short (bool, opcional): Permite posiciones cortas. Por defecto False.
+
+    Returns:
+        dict: 'pnl' (rendimiento total sobre un capital de 1), 'max_drawdown' (mayor caída desde
+            un máximo, en fracción), 'trades', 'hit_rate' (fracción de operaciones con beneficio,
+            None sin operaciones) y 'exposure' (fracción de ticks con posición).
+    """
+    if len(prices) < 2:
+        return {'pnl': 0.0, 'max_drawdown': 0.0, 'trades': 0, 'hit_rate': None, 'exposure': 0.0}
+    held = positions(signals, allow_short)[:-1]
+    changes = np.abs(np.diff(held, prepend=0.0))
+    gross = held * (prices[1:] / prices[:-1] - 1.0)
+    returns = gross - fee * changes
+    equity = np.cumprod(1.0 + returns)
+    peak = np.maximum(np.maximum.accumulate(equity), 1.0)
+    drawdown = float(np.max(1.0 - equity / peak))
+
+    # Operaciones: tramos consecutivos con la misma posición distinta de cero. Un cambio en `t`
+    # paga la entrada del tramo que empieza y la salida del que termina (|a - b| = |a| + |b|
+    # entre posiciones distintas de -1, 0 y 1); la salida se imputa al último tick del tramo cerrado
+    entries = np.where(changes != 0, np.abs(held), 0.0)
+    steps = np.log1p(gross - fee * entries)
+    steps[:-1] += np.log1p(-fee * (changes - entries)[1:])
+    starts = np.flatnonzero(changes)
+    trade_returns = np.add.reduceat(steps, starts)[held[starts] != 0] if len(starts) else np.empty(0)
+    return {
+        'pnl': float(equity[-1] - 1.0),
+        'max_drawdown': drawdown,
+        'trades': len(trade_returns),
+        'hit_rate': float(np.mean(trade_returns > 0)) if len(trade_returns) else None,
+        'exposure': float(np.mean(held != 0)),
+    }
+
+
+def backtest_coin(source, name, strategies, start=None, end=None, fee=BACKTEST_FEE, allow_short=False):
+    """
+    Ejecuta todas las estrategias y combinaciones de parámetros sobre el histórico de una moneda.
+
+    El histórico se lee una sola vez y se reutiliza para toda la rejilla.
+
+    Args:
+        source (str): 'db' o el directorio de un `TickStore`.
+        name (str): Nombre de la criptomoneda.
+        strategies (dict): Lista de combinaciones de parámetros por nombre de estrategia.
+        start (datetime, opcional): Inicio del rango.
+        end (datetime, opcional): Fin del rango (excluido).
+        fee (float, opcional): Coste por cambio de posición.
+        allow_short (bool, opcional): Permite posiciones cortas.
+
+    Returns:
+        list[dict]: Un resultado de `evaluate` por estrategia y combinación, con 'coin',
+            'strategy', 'params' y 'ticks'.
+    """
+    _, prices = load_series(source, name, start, end)
+    results = []
+    if len(prices) < 2:
+        return results
+    for strategy, combos in strategies.items():
+        fn, _ = STRATEGIES[strategy]
+        for params in combos:
+            signals = fn(prices, **params)
+            if signals is None:
+                continue
+            result = evaluate(prices, signals, fee, allow_short)
+            result.update(coin=name, strategy=strategy, params=params, ticks=len(prices))
+            results.append(result)
+    return results
+
+
+def _backtest_coin_task(args):
+    return backtest_coin(*args)
+
+
+def run_backtest(source='db', coins=None, strategies=None, start=None, end=None, fee=BACKTEST_FEE,
+                 allow_short=False, workers=BACKTEST_WORKERS):
+    """
+    Ejecuta la búsqueda en rejilla repartiendo las monedas entre procesos.
+
+    Cada proceso recibe una moneda, la lee por tramos y evalúa sobre ella toda la rejilla de
+    parámetros con operaciones vectorizadas.
+
+    Args:
+        source (str, opcional): 'db' o el directorio de un `TickStore`. Por defecto 'db'.
+        coins (list[str], opcional): Monedas a evaluar. Por defecto todas las de `source`.
+        strategies (dict, opcional): Lista de combinaciones de parámetros por estrategia.
+            Por defecto la rejilla completa de todas las estrategias vectorizadas.
+        start (datetime, opcional): Inicio del rango.
+        end (datetime, opcional): Fin del rango (excluido).
+        fee (float, opcional): Coste por cambio de posición. Por defecto `BACKTEST_FEE`.
+        allow_short (bool, opcional): Permite posiciones cortas. Por defecto False.
+        workers (int, opcional): Procesos. Por defecto `BACKTEST_WORKERS`; con 1 no se crea pool.
+
+    Returns:
+        list[dict]: Resultados de `backtest_coin` de todas las monedas.
+    """
+    if strategies is None:
+        strategies = {name: param_grid(grid) for name, (_, grid) in STRATEGIES.items() if name != 'generate_signal'}
+    coins = coins if coins is not None else list_coins(source)
+    if source == 'db':
+        # Los procesos hijos no deben heredar conexiones abiertas por el proceso principal
+        from database import configure_pool
+        configure_pool()
+    tasks = [(source, name, strategies, start, end, fee, allow_short) for name in coins]
+    if workers <= 1:
+        return [result for task in tasks for result in _backtest_coin_task(task)]
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        return [result for results in executor.map(_backtest_coin_task, tasks) for result in results]
+
+
+def summarize(results):
+    """
+    Agrega los resultados por estrategia y combinación de parámetros.
+
+    Args:
+        results (list[dict]): Resultados de `run_backtest`.
+
+    Returns:
+        list[dict]: Por combinación, 'strategy', 'params', 'coins', 'mean_pnl', 'median_pnl',
+            'mean_hit_rate', 'worst_drawdown' y 'trades', de mayor a menor 'mean_pnl'.
+    """
+    groups = defaultdict(list)
+    for result in results:
+        groups[(result['strategy'], json.dumps(result['params'], sort_keys=True))].append(result)
+    summary = []
+    for (strategy, params), group in groups.items():
+        pnl = np.array([result['pnl'] for result in group])
+        hit_rates = [result['hit_rate'] for result in group if result['hit_rate'] is not None]
+        summary.append({
+            'strategy': strategy,
+            'params': json.loads(params),
+            'coins': len(group),
+            'mean_pnl': float(pnl.mean()),
+            'median_pnl': float(np.median(pnl)),
+            'mean_hit_rate': float(np.mean(hit_rates)) if hit_rates else None,
+            'worst_drawdown': max(result['max_drawdown'] for result in group),
+            'trades': sum(result['trades'] for result in group),
+        })
+    return sorted(summary, key=lambda row: row['mean_pnl'], reverse=True)
+
+
+if __name__ == '__main__':
+    """
+    Punto de entrada del backtesting.
+
+    Ejemplo:
+        python backtest.py --strategies sma_cross rsi --from 2025-01-01
+        python tickstore.py export --dir ticks && python backtest.py --source ticks --workers 8
+        python backtest.py --strategies generate_signal last --coins Bitcoin   # referencia
+    """
+    parser = argparse.ArgumentParser(description="Evalúa estrategias de señales sobre el histórico de precios")
+    parser.add_argument('--source', default='db', help="'db' o directorio de un TickStore exportado")
+    parser.add_argument('--coins', nargs='*', help="por defecto todas")
+    parser.add_argument('--strategies', nargs='*', choices=sorted(STRATEGIES),
+                        help="por defecto todas las vectorizadas")
+    parser.add_argument('--grid', type=json.loads, default={},
+                        help='rejilla que reemplaza a la registrada, p. ej. \'{"sma_cross": {"fast": [5], "slow": [50]}}\'')
+    parser.add_argument('--from', dest='start', type=datetime.fromisoformat)
+    parser.add_argument('--to', dest='end', type=datetime.fromisoformat)
+    parser.add_argument('--fee', type=float, default=BACKTEST_FEE)
+    parser.add_argument('--short', action='store_true', help="permite posiciones cortas")
+    parser.add_argument('--workers', type=int, default=BACKTEST_WORKERS)
+    parser.add_argument('--top', type=int, default=20)
+    parser.add_argument('--output', help="fichero JSON con los resultados por moneda")
+    args = parser.parse_args()
+
+    selected = args.strategies or [name for name in STRATEGIES if name != 'generate_signal']
+    grids = {name: param_grid(dict(STRATEGIES[name][1], **args.grid.get(name, {}))) for name in selected}
+    started = time.perf_counter()
+    results = run_backtest(args.source, args.coins, grids, args.start, args.end, args.fee, args.short, args.workers)
+    elapsed = time.perf_counter() - started
+
+    summary = summarize(results)
+    print(f"{len(results)} evaluaciones en {elapsed:.1f}s")
+    print(f"{'estrategia':<16}{'parámetros':<44}{'monedas':>8}{'PnL medio':>11}{'aciertos':>10}{'máx. caída':>12}")
+    for row in summary[:args.top]:
+        hit_rate = f"{row['mean_hit_rate']:.1%}" if row['mean_hit_rate'] is not None else '-'
+        print(f"{row['strategy']:<16}{json.dumps(row['params']):<44}{row['coins']:>8}"
+              f"{row['mean_pnl']:>11.2%}{hit_rate:>10}{row['worst_drawdown']:>12.2%}")
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump({'results': results, 'summary': summary}, f, indent=2)
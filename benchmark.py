@@ -0,0 +1,680 @@
+import argparse
+import glob
+import itertools
+import json
+import os
+import platform
+import random
+import statistics
+import subprocess
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+from html_parsing import BACKENDS as HTML_BACKENDS, TABLE_CONTAINER_CLASS
+
+script_dir = os.path.dirname(os.path.abspath(__file__))
+FIXTURE_DIR = os.path.join(script_dir, 'fixtures')
+
+
+def measure(fn, repeat, warmup=1):
+    """
+    Ejecuta `fn` `repeat` veces y resume la duración de cada ejecución.
+
+    Args:
+        fn (callable): Función sin argumentos a medir.
+        repeat (int): Número de ejecuciones medidas.
+        warmup (int, opcional): Ejecuciones previas sin medir. Por defecto 1.
+
+    Returns:
+        dict: 'runs', 'mean', 'p50', 'p95', 'min' y 'max' en segundos, y 'ops_per_sec'.
+    """
+    for _ in range(warmup):
+        fn()
+    durations = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        durations.append(time.perf_counter() - start)
+    durations.sort()
+    mean = statistics.fmean(durations)
+    return {
+        'runs': repeat,
+        'mean': round(mean, 6),
+        'p50': round(durations[len(durations) // 2], 6),
+        'p95': round(durations[min(len(durations) - 1, int(len(durations) * 0.95))], 6),
+        'min': round(durations[0], 6),
+        'max': round(durations[-1], 6),
+        'ops_per_sec': round(1 / mean, 1) if mean else None,
+    }
+
+
+def format_es(value, decimals=2):
+    """Formatea un número como en investing.com ('67.890,12')."""
+    return f"{value:,.{decimals}f}".replace(',', '_').replace('.', ',').replace('_', '.')
+
+
+def build_listing_html(coins, seed=0, start=0):
+    """
+    Genera una página sintética con la misma estructura que la tabla de investing.com.
+
+    Args:
+        coins (int): Número de filas.
+        seed (int, opcional): Semilla de los precios, para páginas reproducibles. Por defecto 0.
+        start (int, opcional): Índice de la primera moneda, para páginas sucesivas del listado. Por defecto 0.
+
+    Returns:
+        str: HTML de la página.
+    """
+    rng = random.Random(seed)
+    rows = []
+    for i in range(start, start + coins):
+        price = 10 ** rng.uniform(-4, 5)
+        cells = [
+            str(i + 1),
+            f"<a href=\"/crypto/coin-{i}\">Coin{i}</a>",
+            f"C{i}",
+            format_es(price, 2 if price >= 1 else 6),
+            f"{format_es(price * rng.uniform(1e6, 1e9) / 1e9)}B",
+            f"{format_es(rng.uniform(1, 900))}M",
+            f"{format_es(rng.uniform(0, 5))}%",
+            f"{'+' if rng.random() > 0.5 else '-'}{format_es(rng.uniform(0, 10))}%",
+            f"{'+' if rng.random() > 0.5 else '-'}{format_es(rng.uniform(0, 20))}%",
+        ]
+        rows.append('<tr>' + ''.join(f'<td><span>{cell}</span></td>' for cell in cells) + '</tr>')
+    return (
+        '<html><head><title>Criptomonedas</title></head><body>'
+        f'<div class="{TABLE_CONTAINER_CLASS}"><table class="datatable-v2_table__93S4Y">'
+        '<thead><tr><th>#</th><th>Nombre</th><th>Símbolo</th><th>Precio</th></tr></thead>'
+        f'<tbody>{"".join(rows)}</tbody></table></div></body></html>'
+    )
+
+
+def load_fixtures(directory=None, coins=100, pages=5):
+    """
+    Carga las páginas grabadas de `directory` o, si no hay, genera páginas sintéticas.
+
+    Args:
+        directory (str, opcional): Directorio con ficheros .html. Por defecto `FIXTURE_DIR`.
+        coins (int, opcional): Filas de cada página sintética. Por defecto 100.
+        pages (int, opcional): Páginas sintéticas a generar. Por defecto 5.
+
+    Returns:
+        list[str]: HTML de cada página.
+    """
+    paths = sorted(glob.glob(os.path.join(directory or FIXTURE_DIR, '*.html')))
+    if paths:
+        fixtures = []
+        for path in paths:
+            with open(path, encoding='utf-8') as f:
+                fixtures.append(f.read())
+        return fixtures
+    return [build_listing_html(coins, seed) for seed in range(pages)]
+
+
+def record_fixture(directory=None):
+    """
+    Descarga la página actual de investing.com y la guarda como fixture.
+
+    Args:
+        directory (str, opcional): Directorio de destino. Por defecto `FIXTURE_DIR`.
+
+    Returns:
+        str: Ruta del fichero guardado.
+    """
+    from extractor import URL, get_http_session
+
+    directory = directory or FIXTURE_DIR
+    os.makedirs(directory, exist_ok=True)
+    response = get_http_session().get(URL, timeout=30)
+    response.raise_for_status()
+    path = os.path.join(directory, datetime.now().strftime('investing_%Y%m%d_%H%M%S.html'))
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write(response.text)
+    return path
+
+
+class ReplayResponse:
+    """Respuesta HTTP mínima con la interfaz que usa `scrape_with_beautifulsoup`."""
+
+    def __init__(self, text):
+        self.text = text
+        self.status_code = 200
+        self.headers = {}
+
+    def raise_for_status(self):
+        pass
+
+
+class ReplaySession:
+    """
+    Sesión HTTP que devuelve las páginas grabadas en ciclo, en lugar de ir a la red.
+
+    Args:
+        fixtures (list[str]): HTML de cada página.
+    """
+
+    def __init__(self, fixtures):
+        self.fixtures = fixtures
+        self.requests = 0
+
+    def get(self, url, headers=None, timeout=None):
+        page = self.fixtures[self.requests % len(self.fixtures)]
+        self.requests += 1
+        return ReplayResponse(page)
+
+
+def bench_scrape(fixtures, repeat):
+    """
+    Mide `scrape_with_beautifulsoup` reproduciendo las páginas grabadas con cada backend HTML instalado.
+
+    Returns:
+        dict: Por backend, las estadísticas de `measure` y las filas por página.
+    """
+    import extractor
+    import html_parsing
+
+    results = {}
+    previous_session, previous_parser = extractor._http_session, html_parsing.HTML_PARSER
+    extractor._http_session = ReplaySession(fixtures)
+    try:
+        for name in HTML_BACKENDS:
+            try:
+                html_parsing.get_backend(name)
+            except ImportError:
+                results[name] = {'error': 'no instalado'}
+                continue
+            html_parsing.HTML_PARSER = name
+            extractor._http_cache.update(etag=None, last_modified=None, rows=None)
+            rows = len(extractor.scrape_with_beautifulsoup() or [])
+            results[name] = dict(measure(extractor.scrape_with_beautifulsoup, repeat), rows=rows)
+    finally:
+        extractor._http_session, html_parsing.HTML_PARSER = previous_session, previous_parser
+        extractor._http_cache.update(etag=None, last_modified=None, rows=None)
+    return results
+
+
+def synthetic_rows(coins, cycle):
+    """
+    Filas crudas de una extracción sintética, en el formato de los scrapers.
+
+    Args:
+        coins (int): Número de monedas.
+        cycle (int): Número de extracción (varía los precios).
+
+    Returns:
+        list[list[str]]: Filas crudas.
+    """
+    from transformer import ROW_FIELDS, ROW_WIDTH
+
+    rng = random.Random(cycle)
+    rows = []
+    for i in range(coins):
+        row = [''] * ROW_WIDTH
+        row[ROW_FIELDS['rank']] = str(i + 1)
+        row[ROW_FIELDS['name']] = f"Coin{i}"
+        row[ROW_FIELDS['code']] = f"C{i}"
+        row[ROW_FIELDS['price']] = format_es((100 + i) * (1 + rng.uniform(-0.01, 0.01)))
+        row[ROW_FIELDS['change_24h']] = f"+{format_es(rng.uniform(0, 5))}%"
+        rows.append(row)
+    return rows
+
+
+def bench_parser(values=100_000, repeat=5):
+    """
+    Compara la conversión de una columna de precios con el formato de la tabla ('67.890,12').
+
+    Mide el reemplazo de separadores con `float()` del parser original, `parse_number` valor a
+    valor y `parse_column` sobre toda la columna.
+
+    Args:
+        values (int, opcional): Valores de la columna. Por defecto 100000.
+        repeat (int, opcional): Repeticiones de cada medición. Por defecto 5.
+
+    Returns:
+        dict: Estadísticas de cada variante.
+    """
+    from price_parser import parse_column, parse_number
+
+    rng = random.Random(0)
+    column = [format_es(10 ** rng.uniform(-4, 5), 2) for _ in range(values)]
+    return {
+        'values': values,
+        'replace_float': measure(lambda: [float(v.replace('.', '').replace(',', '.')) for v in column], repeat),
+        'parse_number': measure(lambda: [parse_number(v) for v in column], repeat),
+        'parse_column': measure(lambda: parse_column(column), repeat),
+    }
+
+
+@contextmanager
+def serve_listing(coins, per_page=100):
+    """
+    Servidor HTTP local que hace de investing.com con un listado sintético paginado.
+
+    Sirve `/currencies?page=N` con `per_page` monedas por página y `/coin/<nombre>` con una
+    página de detalle mínima.
+
+    Args:
+        coins (int): Monedas del listado.
+        per_page (int, opcional): Monedas por página. Por defecto 100.
+
+    Yields:
+        tuple[str, int]: URL base del servidor y número de páginas.
+    """
+    pages = [build_listing_html(min(per_page, coins - start), seed=start, start=start)
+             for start in range(0, coins, per_page)]
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            url = urlsplit(self.path)
+            if url.path == '/currencies':
+                page = int(parse_qs(url.query).get('page', ['1'])[0])
+                body = pages[page - 1] if 1 <= page <= len(pages) else None
+            elif url.path.startswith('/coin/'):
+                body = f'<html><body><h1>{url.path[6:]}</h1></body></html>'
+            else:
+                body = None
+            if body is None:
+                self.send_error(404)
+                return
+            payload = body.encode()
+            self.send_response(200)
+            self.send_header('Content-Type', 'text/html; charset=utf-8')
+            self.send_header('Content-Length', str(len(payload)))
+            self.end_headers()
+            self.wfile.write(payload)
+
+        def log_message(self, format, *args):
+            pass
+
+    server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+    server.daemon_threads = True
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    try:
+        yield f"http://127.0.0.1:{server.server_port}", len(pages)
+    finally:
+        server.shutdown()
+        server.server_close()
+
+
+def bench_async_scrape(counts=(5, 500), per_page=100, repeat=3, rate_per_host=10_000):
+    """
+    Mide el rendimiento de `AsyncExtractor` con 5 y 500 monedas contra un servidor local.
+
+    Cada extracción descarga las páginas del listado y una página de detalle por moneda. Por
+    defecto el limitador por host no frena las peticiones, de modo que se mide el motor y no
+    `SCRAPE_RATE_PER_HOST`.
+
+    Args:
+        counts (tuple[int], opcional): Números de monedas. Por defecto (5, 500).
+        per_page (int, opcional): Monedas por página del listado. Por defecto 100.
+        repeat (int, opcional): Repeticiones de cada medición. Por defecto 3.
+        rate_per_host (float, opcional): Peticiones por segundo por host. Por defecto 10000.
+
+    Returns:
+        list[dict]: Por tamaño, 'coins', 'pages', 'rows', 'requests', las estadísticas de
+            `measure` y 'rows_per_sec'.
+    """
+    import asyncio
+
+    import requests
+
+    from async_extractor import AsyncExtractor
+    from transformer import ROW_FIELDS
+
+    results = []
+    for coins in counts:
+        with serve_listing(coins, per_page) as (base, pages), requests.Session() as session:
+            extractor = AsyncExtractor(session=session, rate_per_host=rate_per_host)
+            rows = []
+
+            def extract():
+                rows[:] = asyncio.run(extractor.extract(
+                    pages, url_template=base + '/currencies?page={page}',
+                    detail_url=lambda row: f"{base}/coin/{row[ROW_FIELDS['name']]}",
+                    detail_parser=lambda html, row: None))
+
+            stats = measure(extract, repeat)
+            results.append(dict(stats, coins=coins, pages=pages, rows=len(rows),
+                                requests=extractor.stats['requests'] // (repeat + 1),
+                                rows_per_sec=round(len(rows) / stats['mean'], 1) if stats['mean'] else None))
+    return results
+
+
+def bench_ingest(coins, cycles):
+    """
+    Mide el ciclo transform_data → insert_scrape_batch con extracciones sintéticas.
+
+    Returns:
+        dict: Estadísticas de la transformación, de la escritura por lote y de
+            `insert_historical_price` fila a fila.
+    """
+    from database import insert_historical_price, insert_scrape_batch
+    from transformer import transform_data
+
+    origin = datetime.now() - timedelta(minutes=cycles)
+    raw = [synthetic_rows(coins, cycle) for cycle in range(cycles)]
+    batches = [transform_data(rows, origin + timedelta(minutes=cycle)) for cycle, rows in enumerate(raw)]
+
+    raw_iter = itertools.cycle(raw)
+    transform_stats = measure(lambda: transform_data(next(raw_iter)), cycles, warmup=0)
+
+    batch_iter = iter(batches)
+    insert_stats = measure(lambda: insert_scrape_batch(next(batch_iter)), cycles, warmup=0)
+
+    single_stats = measure(lambda: insert_historical_price('Coin0', 100.0, datetime.now()), min(coins, 100), warmup=0)
+
+    return {
+        'coins': coins,
+        'cycles': cycles,
+        'transform_data': transform_stats,
+        'insert_scrape_batch': insert_stats,
+        'insert_historical_price': single_stats,
+    }
+
+
+def bench_reads(coins, repeat):
+    """
+    Mide get_historical_prices → generate_signal / calculate_metrics sobre los datos ya escritos.
+
+    Returns:
+        dict: Estadísticas de la lectura por moneda, de las funciones de señales y de la
+            lectura conjunta de `get_crypto_data_with_history`.
+    """
+    from database import get_crypto_data_with_history, get_historical_prices
+    from signals import calculate_metrics, generate_signal
+
+    names = [f"Coin{i}" for i in range(coins)]
+    histories = {name: get_historical_prices(name) for name in names}
+    name_iter = itertools.cycle(names)
+
+    return {
+        'get_historical_prices': measure(lambda: get_historical_prices(next(name_iter)), repeat),
+        'generate_signal': measure(lambda: [generate_signal(h) for h in histories.values()], repeat),
+        'calculate_metrics': measure(lambda: [calculate_metrics(h) for h in histories.values()], repeat),
+        'get_crypto_data_with_history': measure(lambda: get_crypto_data_with_history(limit=100), max(1, repeat // 10)),
+    }
+
+
+def bench_rolling(coins=500, ticks=120, repeat=20):
+    """
+    Compara `RollingMetrics` con `signals.calculate_metrics` en el cálculo de `/api/crypto`.
+
+    Cada moneda tiene `ticks` precios a un minuto de distancia que terminan ahora (a medio
+    minuto del borde de la ventana, para que ambos cuenten los mismos precios). La
+    referencia recorre el histórico de cada moneda en cada petición; el motor incremental
+    registra el último precio de cada moneda y lee sus métricas.
+
+    Args:
+        coins (int, opcional): Número de monedas. Por defecto 500.
+        ticks (int, opcional): Precios por moneda. Por defecto 120 (dos horas).
+        repeat (int, opcional): Repeticiones de cada medición. Por defecto 20.
+
+    Returns:
+        dict: Estadísticas de 'calculate_metrics' y 'rolling_metrics' (actualización y lectura
+            de todas las monedas), y 'matches' si ambos dan las mismas métricas.
+    """
+    from rolling import RollingMetrics
+    from signals import calculate_metrics
+
+    rng = random.Random(0)
+    now = datetime.now()
+    histories = {
+        f"Coin{i}": [{'price': round(rng.uniform(1, 1000), 2), 'timestamp': now - timedelta(minutes=tick + 0.5)}
+                     for tick in range(ticks)]
+        for i in range(coins)
+    }
+    metrics = RollingMetrics()
+    metrics.warm([{'name': name, 'history': history[1:]} for name, history in histories.items()])
+    latest = [{'name': name, 'actual_price': history[0]['price'], 'timestamp': history[0]['timestamp']}
+              for name, history in histories.items()]
+    metrics.update_many(latest)
+    matches = all(metrics.as_calculate_metrics(name, now) == calculate_metrics(history)
+                  for name, history in histories.items())
+
+    step = timedelta(microseconds=1)
+
+    def incremental():
+        # Cada medición registra un precio nuevo por moneda (los repetidos se ignoran)
+        for row in latest:
+            row['timestamp'] += step
+        metrics.update_many(latest)
+        return [metrics.as_calculate_metrics(name, now) for name in histories]
+
+    return {
+        'coins': coins,
+        'ticks': ticks,
+        'calculate_metrics': measure(lambda: [calculate_metrics(h) for h in histories.values()], repeat),
+        'rolling_metrics': measure(incremental, repeat),
+        'matches': matches,
+    }
+
+
+def bench_indicators(coins=10_000, ticks=1_000, repeat=3):
+    """
+    Mide cada indicador de `indicators.py` y cada regla registrada sobre una matriz de precios.
+
+    Args:
+        coins (int, opcional): Filas de la matriz. Por defecto 10000.
+        ticks (int, opcional): Columnas de la matriz. Por defecto 1000.
+        repeat (int, opcional): Repeticiones de cada medición. Por defecto 3.
+
+    Returns:
+        dict: Estadísticas por indicador ('indicators') y por regla ('rules'), y el tiempo medio
+            de calcular todos los indicadores ('all_indicators_seconds').
+    """
+    import numpy as np
+    import indicators
+
+    rng = np.random.default_rng(0)
+    prices = 100 * np.exp(np.cumsum(rng.normal(0, 0.01, (coins, ticks)), axis=1))
+    volumes = rng.uniform(1, 1000, (coins, ticks))
+    functions = {
+        'sma': lambda: indicators.sma(prices, 20),
+        'ema': lambda: indicators.ema(prices, 26),
+        'rsi': lambda: indicators.rsi(prices),
+        'macd': lambda: indicators.macd(prices),
+        'bollinger': lambda: indicators.bollinger(prices),
+        'vwap': lambda: indicators.vwap(prices, volumes, window=20),
+    }
+    results = {'coins': coins, 'ticks': ticks, 'indicators': {}, 'rules': {}}
+    for name, fn in functions.items():
+        results['indicators'][name] = measure(fn, repeat)
+    results['all_indicators_seconds'] = round(sum(r['mean'] for r in results['indicators'].values()), 6)
+    for name, (rule, _) in indicators.SIGNAL_RULES.items():
+        results['rules'][name] = measure(lambda: rule(prices), repeat)
+    return results
+
+
+def bench_coin_scaling(counts=(5, 50, 500), history=100, repeat=20):
+    """
+    Mide cómo crece la lectura de `/api/crypto` con el número de monedas.
+
+    Para cada tamaño crea una base de datos SQLite en memoria con `history` extracciones y
+    compara la lectura en bloque (`get_crypto_data_with_history`) con la lectura anterior:
+    `get_all_crypto_data` y una llamada a `get_historical_prices` por moneda.
+
+    Args:
+        counts (tuple[int], opcional): Números de monedas. Por defecto (5, 50, 500).
+        history (int, opcional): Precios por moneda. Por defecto 100.
+        repeat (int, opcional): Repeticiones de cada medición. Por defecto 20.
+
+    Returns:
+        list[dict]: Por tamaño, 'coins' y las estadísticas y el número de consultas de 'bulk' y 'per_coin'.
+    """
+    from database import (configure_backend, get_all_crypto_data, get_crypto_data_with_history,
+                          get_historical_prices, init_db, insert_scrape_batch)
+
+    def per_coin():
+        for row in get_all_crypto_data():
+            get_historical_prices(row['name'])
+
+    results = []
+    origin = datetime.now() - timedelta(minutes=history)
+    for coins in counts:
+        configure_backend('sqlite', path=':memory:')
+        init_db()
+        for cycle in range(history):
+            insert_scrape_batch([
+                {'name': f"Coin{i}", 'actual_price': 100.0 + i + cycle * 0.01,
+                 'timestamp': origin + timedelta(minutes=cycle)}
+                for i in range(coins)
+            ])
+        results.append({
+            'coins': coins,
+            'bulk': dict(measure(lambda: get_crypto_data_with_history(limit=history), repeat), queries=1),
+            'per_coin': dict(measure(per_coin, repeat), queries=coins + 1),
+        })
+    return results
+
+
+def bench_api(requests):
+    """
+    Prueba de carga de `/api/crypto` con el cliente de pruebas de Flask, con y sin caché de respuestas.
+
+    Returns:
+        dict: Peticiones por segundo por escenario y estadísticas de la caché.
+    """
+    from app import app, get_crypto_data_with_history, price_cache, rolling_metrics
+    from response_cache import response_cache, run_load_test
+
+    price_cache.warm(get_crypto_data_with_history(limit=price_cache.capacity))
+    rolling_metrics.warm(price_cache.snapshot(limit=price_cache.capacity))
+    response_cache.invalidate()
+
+    client = app.test_client()
+    results = {}
+    enabled = response_cache.enabled
+    try:
+        for scenario, rule in (('last', 'last'), ('rsi', 'rsi')):
+            url = f'/api/crypto?signal={rule}'
+            response_cache.enabled = False
+            results[f'{scenario}_uncached'] = run_load_test(client, url, requests)
+            response_cache.enabled = True
+            results[f'{scenario}_cached'] = run_load_test(client, url, requests)
+        etag = client.get('/api/crypto', headers={'Accept-Encoding': 'gzip'}).headers['ETag']
+        results['last_not_modified'] = run_load_test(
+            client, '/api/crypto', requests, {'Accept-Encoding': 'gzip', 'If-None-Match': etag})
+    finally:
+        response_cache.enabled = enabled
+    results['response_cache'] = response_cache.stats()
+    return results
+
+
+def environment():
+    """
+    Returns:
+        dict: Versión de Python, plataforma, commit de git y fecha, para comparar ejecuciones.
+    """
+    try:
+        commit = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=script_dir,
+                                capture_output=True, text=True, timeout=10).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        commit = None
+    return {
+        'python': sys.version.split()[0],
+        'platform': platform.platform(),
+        'commit': commit,
+        'date': datetime.now().isoformat(timespec='seconds'),
+    }
+
+
+def run_suite(coins=500, cycles=20, repeat=50, requests=500, fixtures=None, backends=('sqlite',),
+              tickstore_ticks=0, indicator_shape=(10_000, 1_000)):
+    """
+    Ejecuta toda la batería de benchmarks sin red ni servidor de base de datos.
+
+    La base de datos es SQLite en memoria (`database.configure_backend`) y la extracción
+    reproduce páginas grabadas o sintéticas.
+
+    Args:
+        coins (int, opcional): Monedas por extracción. Por defecto 500.
+        cycles (int, opcional): Extracciones sintéticas escritas. Por defecto 20.
+        repeat (int, opcional): Repeticiones de cada medición. Por defecto 50.
+        requests (int, opcional): Peticiones por escenario de la prueba de carga. Por defecto 500.
+        fixtures (str, opcional): Directorio de páginas grabadas. Por defecto `FIXTURE_DIR`.
+        backends (tuple[str], opcional): Backends de almacenamiento a comparar. Por defecto ('sqlite',).
+        tickstore_ticks (int, opcional): Si es > 0, mide también el almacén local con ese número de precios.
+        indicator_shape (tuple[int, int], opcional): Monedas y ticks de la matriz de indicadores.
+            Por defecto (10000, 1000).
+
+    Returns:
+        dict: Resultados por benchmark, junto con los parámetros y el entorno.
+    """
+    from database import configure_backend, init_db
+
+    configure_backend('sqlite', path=':memory:')
+    init_db()
+
+    results = {
+        'environment': environment(),
+        'parameters': {'coins': coins, 'cycles': cycles, 'repeat': repeat, 'requests': requests},
+        'scrape': bench_scrape(load_fixtures(fixtures, coins), repeat),
+        'async_scrape': bench_async_scrape(),
+        'parser': bench_parser(),
+        'ingest': bench_ingest(coins, cycles),
+        'reads': bench_reads(coins, repeat),
+        'rolling': bench_rolling(coins, repeat=repeat),
+        'indicators': bench_indicators(*indicator_shape),
+        'api': bench_api(requests),
+    }
+
+    # Cada tamaño usa su propia base de datos; los backends de abajo vuelven a configurarla
+    results['coin_scaling'] = bench_coin_scaling(repeat=max(1, repeat // 5))
+
+    from backends import run_benchmark as run_backend_benchmark
+    results['backends'] = []
+    for name in backends:
+        kwargs = {'path': ':memory:'} if name == 'sqlite' else {}
+        try:
+            results['backends'].append(run_backend_benchmark(name, coins, cycles, **kwargs))
+        except Exception as e:
+            results['backends'].append({'backend': name, 'error': str(e)})
+    configure_backend('sqlite', path=':memory:')
+
+    if tickstore_ticks:
+        import tempfile
+        from tickstore import run_benchmark as run_tickstore_benchmark
+        with tempfile.TemporaryDirectory() as root:
+            results['tickstore'] = run_tickstore_benchmark(root, tickstore_ticks)
+    return results
+
+
+if __name__ == '__main__':
+    """
+    Batería de benchmarks reproducible (sin investing.com ni MySQL):
+
+        python benchmark.py --coins 500 --output bench.json
+        python benchmark.py --record               # graba la página actual en fixtures/
+        python benchmark.py --backends sqlite mysql --tickstore-ticks 10000000
+    """
+    parser = argparse.ArgumentParser(description="Benchmarks de extracción, ingesta, lectura y API")
+    parser.add_argument('--coins', type=int, default=500)
+    parser.add_argument('--cycles', type=int, default=20)
+    parser.add_argument('--repeat', type=int, default=50)
+    parser.add_argument('--requests', type=int, default=500)
+    parser.add_argument('--fixtures', help="Directorio con páginas .html grabadas")
+    parser.add_argument('--backends', nargs='+', default=['sqlite'])
+    parser.add_argument('--tickstore-ticks', type=int, default=0)
+    parser.add_argument('--indicator-shape', type=int, nargs=2, default=[10_000, 1_000], metavar=('COINS', 'TICKS'))
+    parser.add_argument('--record', action='store_true', help="Graba la página actual como fixture y termina")
+    parser.add_argument('--output', help="Fichero JSON de resultados. Por defecto la salida estándar")
+    args = parser.parse_args()
+
+    if args.record:
+        print(record_fixture(args.fixtures))
+        sys.exit(0)
+
+    results = run_suite(args.coins, args.cycles, args.repeat, args.requests, args.fixtures,
+                        tuple(args.backends), args.tickstore_ticks, tuple(args.indicator_shape))
+    output = json.dumps(results, indent=2, default=str)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(output + '\n')
+    else:
+        print(output)
@@ -0,0 +1,234 @@
+import atexit
+import logging
+import os
+import shutil
+import threading
+import time
+from contextlib import contextmanager
+
+from selenium import webdriver
+from selenium.common.exceptions import WebDriverException
+from selenium.webdriver.chrome.options import Options
+from selenium.webdriver.chrome.service import Service
+from webdriver_manager.chrome import ChromeDriverManager
+
+from instrumentation import SCRAPE_PHASE_SECONDS
+
+BROWSER_POOL_SIZE = int(os.environ.get('BROWSER_POOL_SIZE', 1))
+BROWSER_MAX_USES = int(os.environ.get('BROWSER_MAX_USES', 50))
+
+
+class ScrapeTimings:
+    """
+    Tiempos por fase del scraping con navegador ('launch', 'navigation', 'wait', 'parse').
+
+    Guarda la última duración de cada fase y los acumulados para calcular medias; cada
+    duración se observa también en el histograma `scrape_phase_seconds` de `/metrics`.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._last = {}
+        self._total = {}
+        self._count = {}
+
+    def record(self, phase, seconds):
+        """
+        Registra la duración de una fase.
+
+        Args:
+            phase (str): Nombre de la fase.
+            seconds (float): Duración en segundos.
+        """
+        with self._lock:
+            self._last[phase] = seconds
+            self._total[phase] = self._total.get(phase, 0.0) + seconds
+            self._count[phase] = self._count.get(phase, 0) + 1
+        SCRAPE_PHASE_SECONDS.observe(seconds, phase=phase)
+
+    @contextmanager
+    def phase(self, phase):
+        """Context manager que mide la duración del bloque y la registra como `phase`."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(phase, time.perf_counter() - start)
+
+    def summary(self):
+        """
+        Returns:
+            dict: Por fase, 'last', 'avg' y 'count' en segundos.
+        """
+        with self._lock:
+            return {
+                phase: {
+                    'last': self._last[phase],
+                    'avg': self._total[phase] / self._count[phase],
+                    'count': self._count[phase],
+                }
+                for phase in self._last
+            }
+
+
+scrape_timings = ScrapeTimings()
+
+
+def build_chrome_options():
+    """
+    Construye las opciones de Chrome en modo 'headless' usadas para el scraping.
+
+    Returns:
+        Options: Opciones de Chrome.
+    """
+    chrome_options = Options()
+    chrome_options.add_argument("--headless")  # Navegación en modo sin cabeza
+    chrome_options.add_argument("--disable-gpu")  # Desactiva GPU
+    chrome_options.add_argument("--disable-extensions")  # Desactiva extensiones innecesarias
+    chrome_options.add_argument("--no-sandbox")  # Requerido en algunos entornos Linux
+    chrome_options.add_argument("--disable-dev-shm-usage")  # Reduce el uso de memoria compartida
+    chrome_options.add_argument("--window-size=1920x1080")
+
+    # Agregar estos argumentos adicionales
+    chrome_options.add_argument("--dns-prefetch-disable")
+    chrome_options.add_argument("--page-load-strategy=normal")
+
+    prefs = {
+        "profile.managed_default_content_settings.images": 2,
+        "profile.default_content_setting_values.notifications": 2
+    }
+    chrome_options.add_experimental_option("prefs", prefs)
+    return chrome_options
+
+
+def resolve_driver_path():
+    """
+    Localiza el ejecutable de chromedriver.
+
+    Usa el chromedriver del PATH si existe y, si no, lo descarga con `ChromeDriverManager`.
+
+    Returns:
+        str: Ruta al ejecutable de chromedriver.
+    """
+    return shutil.which("chromedriver") or ChromeDriverManager().install()
+
+
+class BrowserSession:
+    """Navegador en ejecución prestado por `DriverPool`, con el número de usos acumulados."""
+
+    def __init__(self, driver):
+        self.driver = driver
+        self.uses = 0
+
+
+class DriverPool:
+    """
+    Pool de navegadores Chrome reutilizables.
+
+    Los navegadores se lanzan bajo demanda hasta `size` y se reutilizan entre extracciones,
+    evitando el arranque en frío en cada ciclo. Un navegador se recicla tras `max_uses`
+    usos o cuando falla con `WebDriverException`. La ruta de chromedriver se resuelve
+    una sola vez por pool.
+
+    Args:
+        size (int, opcional): Navegadores simultáneos. Por defecto `BROWSER_POOL_SIZE`.
+        max_uses (int, opcional): Usos antes de reciclar un navegador. Por defecto `BROWSER_MAX_USES`.
+        driver_path (str, opcional): Ruta de chromedriver. Por defecto `resolve_driver_path()`.
+        timings (ScrapeTimings, opcional): Destino de los tiempos de arranque.
+    """
+
+    def __init__(self, size=BROWSER_POOL_SIZE, max_uses=BROWSER_MAX_USES, driver_path=None, timings=None):
+        self.size = size
+        self.max_uses = max_uses
+        self._driver_path = driver_path
+        self.timings = timings or scrape_timings
+        self._idle = []
+        self._slots = threading.BoundedSemaphore(size)
+        self._lock = threading.Lock()
+
+    @property
+    def driver_path(self):
+        """str: Ruta de chromedriver, resuelta en el primer acceso."""
+        with self._lock:
+            if self._driver_path is None:
+                self._driver_path = resolve_driver_path()
+            return self._driver_path
+
+    def warm(self):
+        """
+        Resuelve chromedriver y arranca los navegadores del pool por adelantado.
+
+        Pensado para llamarse al iniciar el proceso, de modo que la primera extracción
+        no pague el arranque en frío.
+        """
+        sessions = [self._launch() for _ in range(self.size - len(self._idle))]
+        with self._lock:
+            self._idle.extend(sessions)
+
+    def _launch(self):
+        with self.timings.phase('launch'):
+            service = Service(self.driver_path)
+            driver = webdriver.Chrome(options=build_chrome_options(), service=service)
+
+            # Configurar timeouts más largos
+            driver.set_page_load_timeout(180)  # 3 minutos
+            driver.implicitly_wait(30)  # 30 segundos
+        return BrowserSession(driver)
+
+    @staticmethod
+    def _quit(session):
+        try:
+            session.driver.quit()
+        except Exception as e:
+            logging.warning("Error al cerrar el navegador: %s", e)
+
+    @contextmanager
+    def session(self):
+        """
+        Context manager que presta un navegador del pool.
+
+        Si el bloque lanza `WebDriverException` el navegador se descarta; en otro caso vuelve
+        al pool salvo que haya alcanzado `max_uses`.
+
+        Yields:
+            BrowserSession: Sesión con el atributo `driver` y el contador `uses`.
+        """
+        self._slots.acquire()
+        try:
+            with self._lock:
+                session = self._idle.pop() if self._idle else None
+            if session is None:
+                session = self._launch()
+
+            try:
+                yield session
+            except WebDriverException:
+                logging.warning("Navegador descartado tras un error de WebDriver")
+                self._quit(session)
+                raise
+            except BaseException:
+                self._release(session)
+                raise
+            else:
+                self._release(session)
+        finally:
+            self._slots.release()
+
+    def _release(self, session):
+        session.uses += 1
+        if session.uses >= self.max_uses:
+            self._quit(session)
+            return
+        with self._lock:
+            self._idle.append(session)
+
+    def close(self):
+        """Cierra todos los navegadores ociosos."""
+        with self._lock:
+            idle, self._idle = self._idle, []
+        for session in idle:
+            self._quit(session)
+
+
+driver_pool = DriverPool()
+atexit.register(driver_pool.close)
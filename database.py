@@ -1,54 +1,237 @@
-import sqlite3
+import logging
 import os
+import threading
+import time
+from datetime import datetime
+
+from backends import create_backend, DB_BACKEND
+from instrumentation import DB_OPERATION_SECONDS
+from pool import ConnectionPool
+from rollups import update_rollups
 
 script_dir = os.path.dirname(os.path.abspath(__file__))
 DATABASE = 'scraping_cripto.db'
-db_path = os.path.join(script_dir, DATABASE)
+db_path = os.environ.get('SQLITE_PATH', os.path.join(script_dir, DATABASE))
+
+DB_POOL_SIZE = int(os.environ.get('DB_POOL_SIZE', 5))
+DB_POOL_MAX_IDLE = float(os.environ.get('DB_POOL_MAX_IDLE', 300))
+DB_POOL_TIMEOUT = float(os.environ.get('DB_POOL_TIMEOUT', 30))
+
+# Segundos entre ejecuciones del mantenimiento del backend (particiones futuras y retención en MySQL)
+DB_MAINTENANCE_INTERVAL = float(os.environ.get('DB_MAINTENANCE_INTERVAL', 3600))
+
+# Incrementar al cambiar schema.sql, schema_sqlite.sql o las migraciones de `after_init`
+SCHEMA_VERSION = 1
+
+_pool = None
+_pool_lock = threading.RLock()
+_backend = None
+_maintained_at = None
+
+
+def get_backend():
+    """
+    Devuelve el backend de almacenamiento activo, creándolo según `DB_BACKEND` si no existe.
+
+    Returns:
+        StorageBackend: Backend de `backends.py` ('mysql' o 'sqlite').
+    """
+    global _backend
+    if _backend is None:
+        with _pool_lock:
+            if _backend is None:
+                _backend = create_backend(DB_BACKEND, **({'path': db_path} if DB_BACKEND == 'sqlite' else {}))
+    return _backend
+
+
+def configure_backend(name, **kwargs):
+    """
+    Cambia el backend de almacenamiento y recrea el pool de conexiones.
+
+    Ejemplo:
+        configure_backend('sqlite', path=':memory:')
+
+    Args:
+        name (str): Clave de `backends.BACKENDS`.
+        **kwargs: Argumentos del constructor del backend.
+
+    Returns:
+        StorageBackend: El backend configurado.
+    """
+    global _backend
+    with _pool_lock:
+        _backend = create_backend(name, **kwargs)
+        configure_pool()
+    return _backend
+
 
 def get_db():
-    """Abre una conexión a la base de datos SQLite y configura la fábrica de filas para acceder a las columnas mediante nombres."""
-    import mysql.connector
-
-    conn = mysql.connector.connect(
-        host="localhost",  # Servidor MySQL
-        user="operador",  # Usuario de MySQL
-        password="",  # Contraseña
-        database="scraping_cripto",  # Nombre de la base de datos
-        auth_plugin = 'mysql_native_password'
+    """Abre una conexión con el backend de almacenamiento activo (MySQL o SQLite)."""
+    return get_backend().connect()
+
+
+def configure_pool(factory=None, size=None, max_idle=None, timeout=None, health_check=None):
+    """
+    Crea (o reemplaza) el pool de conexiones compartido por todos los helpers de este módulo.
+
+    Permite sustituir la conexión MySQL por otro driver, por ejemplo `sqlite3` o un driver falso
+    en pruebas. Si ya existía un pool, se cierran sus conexiones ociosas.
+
+    Args:
+        factory (callable, opcional): Función que abre una conexión. Por defecto `get_db`.
+        size (int, opcional): Número máximo de conexiones. Por defecto `DB_POOL_SIZE`.
+        max_idle (float, opcional): Segundos de inactividad antes de descartar una conexión.
+        timeout (float, opcional): Segundos de espera máxima por una conexión libre.
+        health_check (callable, opcional): Comprobación ejecutada al entregar cada conexión.
+
+    Returns:
+        ConnectionPool: El pool recién creado.
+    """
+    global _pool
+    kwargs = {}
+    if health_check is not None:
+        kwargs['health_check'] = health_check
+    new_pool = ConnectionPool(
+        factory or get_db,
+        size=size or DB_POOL_SIZE,
+        max_idle=DB_POOL_MAX_IDLE if max_idle is None else max_idle,
+        timeout=DB_POOL_TIMEOUT if timeout is None else timeout,
+        **kwargs
     )
-    return conn
+    with _pool_lock:
+        old_pool, _pool = _pool, new_pool
+    if old_pool is not None:
+        old_pool.close()
+    return new_pool
+
+
+def get_pool():
+    """
+    Devuelve el pool de conexiones compartido, creándolo con la configuración por defecto si no existe.
+
+    Returns:
+        ConnectionPool: Pool de conexiones del módulo.
+    """
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                return configure_pool()
+    return _pool
 
 
-def init_db():
+def db_connection():
+    """
+    Context manager que toma prestada una conexión del pool compartido.
+
+    Ejemplo:
+        with db_connection() as conn:
+            cursor = conn.cursor()
+
+    Returns:
+        contextmanager: Entrega una conexión y la devuelve al pool al salir del bloque.
+    """
+    return get_pool().connection()
+
+
+def pool_stats():
+    """
+    Devuelve las estadísticas del pool de conexiones (checkouts, esperas, creaciones, etc.).
+
+    Returns:
+        dict: Estadísticas devueltas por `ConnectionPool.stats`.
+    """
+    return get_pool().stats()
+
+
+def get_schema_version():
+    """
+    Devuelve la versión del esquema registrada en `schema_version`.
+
+    Returns:
+        int | None: La versión aplicada, o None si la tabla no existe o está vacía.
+    """
+    try:
+        row = query_db('SELECT version FROM schema_version WHERE id = 1', one=True)
+    except Exception:
+        return None
+    return row['version'] if row else None
+
+
+def init_db(force=False):
     """
     Inicializa la base de datos ejecutando el script de esquema SQL.
 
     El script de esquema se encuentra en el archivo 'schema.sql'.
-    Crea o reemplaza tablas y su estructura siguiendo las definiciones contenidas en dicho archivo.
+    Crea o reemplaza tablas y su estructura siguiendo las definiciones contenidas en dicho archivo
+    ('schema_sqlite.sql' con el backend SQLite). Después aplica las migraciones del backend; en
+    MySQL, el índice y las particiones próximas de `historical_prices`.
+
+    Si `schema_version` ya registra `SCHEMA_VERSION` no se ejecutan el DDL ni las migraciones,
+    de modo que arrancar varios procesos (o reiniciarlos) no los repite. El mantenimiento del
+    backend (`maintain_db`) se ejecuta siempre.
+
+    Args:
+        force (bool, opcional): Ejecuta el script aunque el esquema esté al día. Por defecto False.
+
+    Returns:
+        bool: True si se aplicó el esquema, False si ya estaba al día.
     """
-    schema_path = os.path.join(script_dir, 'schema.sql')
-    conn = get_db()
-    cursor = conn.cursor()
+    if not force and get_schema_version() == SCHEMA_VERSION:
+        logging.info("Esquema en la versión %s, se omite la inicialización", SCHEMA_VERSION)
+        maintain_db(force=True)
+        return False
+
+    backend = get_backend()
+    schema_path = backend.schema_path
+    with db_connection() as conn:
+        cursor = conn.cursor()
 
-    try:
-        with open(schema_path, 'r') as f:
-            # Leemos todo el contenido del archivo
-            sql_commands = f.read()
-            # Dividimos por ; para ejecutar cada comando por separado
-            commands = sql_commands.split(';')
-
-            for command in commands:
-                # Ignoramos líneas vacías o solo con espacios
-                if command.strip():
-                    cursor.execute(command)
-
-        conn.commit()
-    except Exception as e:
-        conn.rollback()
-        raise e
-    finally:
-        cursor.close()
-        conn.close()
+        try:
+            with open(schema_path, 'r') as f:
+                # Leemos todo el contenido del archivo
+                sql_commands = f.read()
+                # Dividimos por ; para ejecutar cada comando por separado
+                commands = sql_commands.split(';')
+
+                for command in commands:
+                    # Ignoramos líneas vacías o solo con espacios
+                    if command.strip():
+                        cursor.execute(command)
+
+            conn.commit()
+        except Exception as e:
+            conn.rollback()
+            raise e
+        finally:
+            cursor.close()
+
+    backend.after_init()
+    execute_db('DELETE FROM schema_version')
+    execute_db('INSERT INTO schema_version (id, version) VALUES (1, %s)', (SCHEMA_VERSION,))
+    maintain_db(force=True)
+    return True
+
+
+def maintain_db(force=False):
+    """
+    Ejecuta el mantenimiento periódico del backend si han pasado `DB_MAINTENANCE_INTERVAL` segundos.
+
+    En MySQL crea las particiones de los próximos periodos y, con `HISTORY_RETENTION_DAYS`,
+    elimina las caducadas. Lo llama el proceso que ingesta tras cada ciclo.
+
+    Args:
+        force (bool, opcional): Ejecuta el mantenimiento aunque no toque. Por defecto False.
+
+    Returns:
+        bool: True si se ejecutó.
+    """
+    global _maintained_at
+    now = time.monotonic()
+    if not force and _maintained_at is not None and now - _maintained_at < DB_MAINTENANCE_INTERVAL:
+        return False
+    _maintained_at = now
+    get_backend().maintain()
+    return True
 
 
 def query_db(query, args=(), one=False):
@@ -63,18 +246,18 @@ def query_db(query, args=(), one=False):
     Returns:
         list | dict | None: Resultados de la consulta. Si 'one' es True, devuelve un diccionario o None.
     """
-    conn = get_db()
-    cursor = conn.cursor(dictionary=True)  # Para obtener resultados como diccionarios
+    backend = get_backend()
+    with DB_OPERATION_SECONDS.time(operation='query'), db_connection() as conn:
+        cursor = backend.cursor(conn, dictionary=True)  # Para obtener resultados como diccionarios
 
-    try:
-        cursor.execute(query, args)
-        rv = cursor.fetchall()
-        return (rv[0] if rv else None) if one else rv
-    except Exception as e:
-        raise e
-    finally:
-        cursor.close()
-        conn.close()
+        try:
+            cursor.execute(backend.prepare(query), args)
+            rv = cursor.fetchall()
+            return (rv[0] if rv else None) if one else rv
+        except Exception as e:
+            raise e
+        finally:
+            cursor.close()
 
 
 def execute_db(query, args=()):
@@ -87,18 +270,18 @@ def execute_db(query, args=()):
 
     Esta función realiza operaciones como inserciones, actualizaciones o eliminaciones.
     """
-    conn = get_db()
-    cursor = conn.cursor()
+    backend = get_backend()
+    with DB_OPERATION_SECONDS.time(operation='execute'), db_connection() as conn:
+        cursor = backend.cursor(conn)
 
-    try:
-        cursor.execute(query, args)
-        conn.commit()
-    except Exception as e:
-        conn.rollback()
-        raise e
-    finally:
-        cursor.close()
-        conn.close()
+        try:
+            cursor.execute(backend.prepare(query), args)
+            conn.commit()
+        except Exception as e:
+            conn.rollback()
+            raise e
+        finally:
+            cursor.close()
 
 
 def insert_crypto_data(crypto_data):
@@ -117,27 +300,56 @@ def insert_crypto_data(crypto_data):
     Esta función reemplaza registros existentes si la criptomoneda ya estaba en la base de datos.
     """
     if crypto_data is not None:
-        conn = get_db()
-        cursor = conn.cursor()
+        backend = get_backend()
+        with db_connection() as conn:
+            cursor = backend.cursor(conn)
+
+            try:
+                backend.upsert_latest(cursor, [
+                    (data['name'], data['actual_price'], data['timestamp']) for data in crypto_data
+                ])
+                conn.commit()
+            except Exception as e:
+                conn.rollback()
+                raise e
+            finally:
+                cursor.close()
+
+
+def insert_scrape_batch(crypto_data):
+    """
+    Escribe el resultado de un scraping en `crypto_prices` y `historical_prices` en una única transacción.
 
-        try:
-            for data in crypto_data:
-                cursor.execute('''
-                               INSERT INTO crypto_prices (name, actual_price, last_updated)
-                               VALUES (%s, %s, %s) ON DUPLICATE KEY
-                               UPDATE
-                                   actual_price =
-                               VALUES (actual_price), last_updated =
-                               VALUES (last_updated)
-                               ''', (data['name'], data['actual_price'], data['timestamp']))
+    Ambas tablas, y los agregados OHLC de `price_rollups`, se escriben con `executemany`
+    (que `mysql.connector` reescribe como un único INSERT de varias filas), de modo que una
+    extracción de N criptomonedas cuesta una conexión y un commit en lugar de N+1.
+
+    Args:
+        crypto_data (list[dict]): Lista de diccionarios con 'name', 'actual_price' y 'timestamp',
+            en el formato devuelto por `transform_data`.
+
+    Returns:
+        int: Número de filas escritas en `historical_prices`.
+    """
+    if not crypto_data:
+        return 0
+
+    rows = [(data['name'], data['actual_price'], data['timestamp']) for data in crypto_data]
+    backend = get_backend()
+    with DB_OPERATION_SECONDS.time(operation='insert_scrape_batch'), db_connection() as conn:
+        cursor = backend.cursor(conn)
 
+        try:
+            backend.upsert_latest(cursor, rows)
+            backend.insert_history(cursor, rows)
+            update_rollups(cursor, rows, backend.prepare(backend.UPSERT_ROLLUP_SQL))
             conn.commit()
         except Exception as e:
             conn.rollback()
             raise e
         finally:
             cursor.close()
-            conn.close()
+    return len(rows)
 
 
 def get_all_crypto_data():
@@ -150,17 +362,10 @@ def get_all_crypto_data():
         list[]: Lista vacía si hay un error o no hay datos.
     """
     try:
-        results = query_db("""
-            SELECT 
-                name,
-                CAST(actual_price AS DECIMAL(20,8)) as actual_price 
-            FROM crypto_prices
-            WHERE actual_price IS NOT NULL
-            ORDER BY name
-        """)
+        results = query_db(get_backend().LATEST_SQL)
         return results if results else []
     except Exception as e:
-        print(f"Error al obtener datos de criptomonedas: {e}")
+        logging.error("Error al obtener datos de criptomonedas: %s", e)
         return []
 
 
@@ -178,24 +383,78 @@ def get_historical_prices(name, limit=100):
         list[]: Lista vacía si hay un error o no hay datos.
     """
     try:
-        return query_db('''
-            SELECT 
-                CAST(price AS DECIMAL(20,8)) as price,
-                timestamp 
-            FROM historical_prices 
-            WHERE name = %s 
-                AND price IS NOT NULL 
-            ORDER BY timestamp DESC 
-            LIMIT %s
-        ''', (name, limit)) or []
+        return query_db(get_backend().HISTORY_SQL, (name, limit)) or []
+    except Exception as e:
+        logging.error("Error al obtener precios históricos para %s: %s", name, e)
+        return []
+
+def get_crypto_data_with_history(limit=100):
+    """
+    Recupera en una sola consulta el precio actual y el histórico reciente de todas las criptomonedas.
+
+    Cada backend lee los `limit` registros más recientes de cada criptomoneda con una búsqueda en
+    el índice `(name, timestamp)` por moneda (`LATEST_WITH_HISTORY_SQL`), de modo que el coste no
+    crece con el histórico acumulado y se evita una consulta a `historical_prices` por moneda.
+
+    Args:
+        limit (int, opcional): Número máximo de precios históricos por criptomoneda. Por defecto es 100.
+
+    Returns:
+        list[dict]: Lista ordenada por nombre. Cada diccionario contiene 'name', 'actual_price' y
+            'history', esta última con el mismo formato que `get_historical_prices`
+            (ordenada del registro más reciente al más antiguo).
+        list[]: Lista vacía si hay un error o no hay datos.
+    """
+    try:
+        rows = query_db(get_backend().LATEST_WITH_HISTORY_SQL, (limit,))
     except Exception as e:
-        print(f"Error al obtener precios históricos para {name}: {e}")
+        logging.error("Error al obtener datos de criptomonedas con histórico: %s", e)
         return []
 
+    results = []
+    for row in rows or []:
+        if not results or results[-1]['name'] != row['name']:
+            results.append({'name': row['name'], 'actual_price': row['actual_price'], 'history': []})
+        if row['price'] is not None and len(results[-1]['history']) < limit:
+            results[-1]['history'].append({'price': row['price'], 'timestamp': row['timestamp']})
+    return results
+
+
+def get_window_history(since):
+    """
+    Recupera en una sola consulta los precios de todas las criptomonedas desde `since`.
+
+    Para cada moneda incluye además el último precio anterior a `since`, que es el vigente al
+    inicio del rango: sin él, una moneda escrita con `INGEST_DEDUP` cuyo precio no ha cambiado
+    en el rango no tendría ningún precio.
+
+    Args:
+        since (datetime): Inicio del rango.
+
+    Returns:
+        list[dict]: Lista ordenada por nombre con 'name' y 'history' (del más reciente al más antiguo).
+        list[]: Lista vacía si hay un error o no hay datos.
+    """
+    try:
+        rows = query_db(get_backend().WINDOW_HISTORY_SQL, (since, since))
+    except Exception as e:
+        logging.error("Error al obtener el histórico desde %s: %s", since, e)
+        return []
+
+    results = []
+    for row in rows or []:
+        if not results or results[-1]['name'] != row['name']:
+            results.append({'name': row['name'], 'history': []})
+        results[-1]['history'].append({'price': row['price'], 'timestamp': row['timestamp']})
+    return results
+
+
 def insert_historical_price(name, price, timestamp):
     """
     Inserta un precio histórico para una criptomoneda en la tabla `historical_prices`.
 
+    En la misma transacción actualiza los agregados OHLC de `price_rollups`.
+
     Args:
         name (str): Nombre de la criptomoneda.
         price (float): Precio en el momento especificado.
@@ -204,17 +463,70 @@ def insert_historical_price(name, price, timestamp):
     Raises:
         Exception: Si hay un error al insertar los datos.
     """
+    if isinstance(timestamp, str):
+        timestamp = datetime.fromisoformat(timestamp)
+    backend = get_backend()
     try:
-        execute_db('''
-            INSERT INTO historical_prices 
-                (name, price, timestamp) 
-            VALUES 
-                (%s, CAST(%s AS DECIMAL(20,8)), %s)
-        ''', (name, price, timestamp))
+        with db_connection() as conn:
+            cursor = backend.cursor(conn)
+
+            try:
+                backend.insert_history(cursor, [(name, price, timestamp)])
+                update_rollups(cursor, [(name, price, timestamp)], backend.prepare(backend.UPSERT_ROLLUP_SQL))
+                conn.commit()
+            except Exception as e:
+                conn.rollback()
+                raise e
+            finally:
+                cursor.close()
     except Exception as e:
-        print(f"Error al insertar precio histórico para {name}: {e}")
+        logging.error("Error al insertar precio histórico para %s: %s", name, e)
         raise
 
+
+def get_historical_range(name, start, end, limit=1000):
+    """
+    Recupera los precios históricos de una criptomoneda dentro de un rango de fechas.
+
+    Args:
+        name (str): Nombre de la criptomoneda.
+        start (datetime): Inicio del rango (incluido).
+        end (datetime): Fin del rango (excluido).
+        limit (int, opcional): Número máximo de registros. Por defecto es 1000.
+
+    Returns:
+        list[dict]: Lista con 'price' y 'timestamp', del más reciente al más antiguo.
+        list[]: Lista vacía si hay un error o no hay datos.
+    """
+    try:
+        return query_db(get_backend().RANGE_SQL, (name, start, end, limit)) or []
+    except Exception as e:
+        logging.error("Error al obtener precios históricos para %s: %s", name, e)
+        return []
+
+
+def get_history_bounds(name=None):
+    """
+    Recupera el primer y el último timestamp de `historical_prices`.
+
+    SQLite devuelve los `MIN`/`MAX` como texto (el tipo declarado de la columna no se aplica a
+    los agregados), así que se convierten a `datetime` aquí para todos los backends.
+
+    Args:
+        name (str, opcional): Limita la búsqueda a una criptomoneda. Por defecto todas.
+
+    Returns:
+        tuple[datetime, datetime] | None: Primer y último timestamp, o None si no hay precios.
+    """
+    query = 'SELECT MIN(timestamp) as first, MAX(timestamp) as last FROM historical_prices'
+    bounds = query_db(query + ' WHERE name = %s', (name,), one=True) if name is not None \
+        else query_db(query, one=True)
+    if not bounds or bounds['first'] is None:
+        return None
+    return tuple(value if isinstance(value, datetime) else datetime.fromisoformat(value)
+                 for value in (bounds['first'], bounds['last']))
+
+
 if __name__ == '__main__':
     """
     Punto de entrada del script para inicializar la base de datos.
@@ -1,157 +1,240 @@
 import logging
-import shutil
+import os
+import threading
+import time
 
 import cloudscraper
 import requests
-from bs4 import BeautifulSoup, NavigableString
-from selenium import webdriver
-from selenium.webdriver.chrome.options import Options
-from selenium.webdriver.chrome.service import Service
 from selenium.webdriver.common.by import By
 from selenium.webdriver.support import expected_conditions as EC
 from selenium.webdriver.support.ui import WebDriverWait
-from webdriver_manager.chrome import ChromeDriverManager
+
+from async_extractor import iter_listing_rows, scrape_listing_pages
+from browser_pool import driver_pool, scrape_timings
+from html_parsing import parse_crypto_rows
+from instrumentation import SCRAPE_TIER_SECONDS
+from transformer import ROW_FIELDS, transform_price
 
 URL = "https://es.investing.com/crypto"
-logging.basicConfig(level=logging.DEBUG)
+
+# Sin SCRAPE_LIMIT se extraen todas las filas de la tabla
+SCRAPE_LIMIT = int(os.environ['SCRAPE_LIMIT']) if os.environ.get('SCRAPE_LIMIT') else None
+# Con SCRAPE_PAGES > 1 el nivel HTTP descarga varias páginas del listado de forma concurrente
+SCRAPE_PAGES = int(os.environ.get('SCRAPE_PAGES', 1))
+# Fracción de filas mal formadas a partir de la cual un nivel se da por fallido y se prueba el siguiente
+SCRAPE_MAX_INVALID = float(os.environ.get('SCRAPE_MAX_INVALID', 0.5))
+
+try:
+    import brotli  # noqa: F401  (requests solo descomprime 'br' si está instalado)
+    ACCEPT_ENCODING = 'gzip, deflate, br'
+except ImportError:
+    ACCEPT_ENCODING = 'gzip, deflate'
+
+_http_session = None
+_http_session_lock = threading.Lock()
+# Validadores y filas de la última respuesta completa, para peticiones condicionales
+_http_cache = {'etag': None, 'last_modified': None, 'rows': None}
+
+
+class TierStats:
+    """
+    Contadores de éxito y latencia de cada nivel de extracción ('http', 'browser').
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._tiers = {}
+
+    def record(self, tier, success, seconds):
+        """
+        Registra un intento de extracción.
+
+        Args:
+            tier (str): Nombre del nivel.
+            success (bool): Si el intento devolvió datos válidos.
+            seconds (float): Duración del intento.
+        """
+        with self._lock:
+            stats = self._tiers.setdefault(tier, {'attempts': 0, 'successes': 0, 'failures': 0, 'seconds': 0.0})
+            stats['attempts'] += 1
+            stats['successes' if success else 'failures'] += 1
+            stats['seconds'] += seconds
+        SCRAPE_TIER_SECONDS.observe(seconds, tier=tier, outcome='success' if success else 'failure')
+
+    def summary(self):
+        """
+        Returns:
+            dict: Por nivel, los contadores junto con 'success_rate' y 'avg_latency'.
+        """
+        with self._lock:
+            return {
+                tier: dict(stats,
+                           success_rate=stats['successes'] / stats['attempts'],
+                           avg_latency=stats['seconds'] / stats['attempts'])
+                for tier, stats in self._tiers.items()
+            }
+
+
+tier_stats = TierStats()
+
+
+def get_http_session():
+    """
+    Devuelve la sesión HTTP compartida, creándola en el primer uso.
+
+    La sesión de `cloudscraper` conserva las cookies del desafío de Cloudflare y las
+    conexiones keep-alive entre extracciones, y pide las respuestas comprimidas.
+
+    Returns:
+        cloudscraper.CloudScraper: Sesión HTTP reutilizable.
+    """
+    global _http_session
+    with _http_session_lock:
+        if _http_session is None:
+            _http_session = cloudscraper.create_scraper(
+                browser={
+                    'browser': 'chrome',
+                    'platform': 'windows',
+                    'mobile': False
+                }
+            )
+            _http_session.headers.update({
+                'Accept-Encoding': ACCEPT_ENCODING,
+                'Connection': 'keep-alive',
+            })
+        return _http_session
+
+
+def is_valid_row(row):
+    """
+    Comprueba que una fila extraída tiene el formato que espera `transform_data`.
+
+    Args:
+        row (list): Fila devuelta por un scraper.
+
+    Returns:
+        bool: True si la fila tiene nombre y un precio convertible.
+    """
+    if len(row) <= ROW_FIELDS['price'] or not row[ROW_FIELDS['name']]:
+        return False
+    return transform_price(row[ROW_FIELDS['price']]) is not None
+
+
+def valid_rows(rows, max_invalid=SCRAPE_MAX_INVALID):
+    """
+    Descarta las filas mal formadas de una extracción.
+
+    Una fila rota (un anuncio o una moneda sin precio en la tabla) no invalida el resto, igual
+    que en `iter_crypto_rows`; solo si la fracción de filas descartadas supera `max_invalid`
+    se considera que la página ha cambiado de formato y la extracción falla.
+
+    Args:
+        rows (list | None): Filas devueltas por un scraper.
+        max_invalid (float, opcional): Fracción máxima de filas descartadas. Por defecto `SCRAPE_MAX_INVALID`.
+
+    Returns:
+        list | None: Filas válidas, o None si no hay ninguna o se descartaron demasiadas.
+    """
+    if not rows:
+        return None
+    valid = [row for row in rows if is_valid_row(row)]
+    dropped = len(rows) - len(valid)
+    if dropped:
+        logging.warning("Se descartaron %s de %s filas mal formadas", dropped, len(rows))
+    if not valid or dropped > max_invalid * len(rows):
+        return None
+    return valid
 
 
 def scrape_with_selenium():
     """
     Realiza un web scraping de datos de criptomonedas utilizando Selenium.
 
-    La función utiliza un navegador Chrome en modo 'headless' para navegar al sitio objetivo,
-    captura la tabla dinámica de criptomonedas y extrae sus datos en un formato tabular.
+    La función toma un navegador Chrome en modo 'headless' del pool `driver_pool`, navega
+    al sitio objetivo (o recarga la página si el navegador ya estaba en ella), captura
+    la tabla dinámica de criptomonedas y extrae sus datos en un formato tabular.
+    La duración de cada fase se registra en `scrape_timings`.
 
     Returns:
         list: Lista de listas, donde cada sublista representa una fila con datos de una criptomoneda.
     """
-    PATH_TO_CHROMEDRIVER = "/usr/bin/chromedriver"
-    chromedriver_path = shutil.which("chromedriver")
-    if chromedriver_path:
-        PATH_TO_CHROMEDRIVER = chromedriver_path
-
-    chrome_options = Options()
-    chrome_options.add_argument("--headless")  # Navegación en modo sin cabeza
-    chrome_options.add_argument("--disable-gpu")  # Desactiva GPU
-    chrome_options.add_argument("--disable-extensions")  # Desactiva extensiones innecesarias
-    chrome_options.add_argument("--no-sandbox")  # Requerido en algunos entornos Linux
-    chrome_options.add_argument("--disable-dev-shm-usage")  # Reduce el uso de memoria compartida
-    chrome_options.add_argument("--window-size=1920x1080")
-
-    # Agregar estos argumentos adicionales
-    chrome_options.add_argument("--dns-prefetch-disable")
-    chrome_options.add_argument("--page-load-strategy=normal")
-
-    prefs = {
-        "profile.managed_default_content_settings.images": 2,
-        "profile.default_content_setting_values.notifications": 2
-    }
-    chrome_options.add_experimental_option("prefs", prefs)
-
-    # Inicializar el controlador
-    service = Service(ChromeDriverManager().install())
-    driver = webdriver.Chrome(options=chrome_options, service=service)
-
-    # Configurar timeouts más largos
-    driver.set_page_load_timeout(180)  # 3 minutos
-    driver.implicitly_wait(30)  # 30 segundos
+    with driver_pool.session() as session:
+        driver = session.driver
 
-    try:
-        # Navegar al sitio web
-        driver.get(URL)
+        # Navegar al sitio web; un navegador reutilizado solo necesita recargar la página
+        with scrape_timings.phase('navigation'):
+            if session.uses and driver.current_url.startswith(URL):
+                driver.refresh()
+            else:
+                driver.get(URL)
 
         # Esperar a que el elemento dinámico esté cargado
-        WebDriverWait(driver, 30).until(
-            EC.presence_of_element_located((By.CLASS_NAME, 'datatable-v2_table__93S4Y'))
-        )
-
-        # Capturar la tabla completa
-        table = driver.find_element(By.CLASS_NAME, 'datatable-v2_table__93S4Y')
-        tbody = table.find_element(By.TAG_NAME, 'tbody')
-        rows = tbody.find_elements(By.TAG_NAME, 'tr')[:5]
-
-        crypto_data = []
-        for row in rows:
-            vals = []
-            cols = row.find_elements(By.TAG_NAME, 'td')
+        with scrape_timings.phase('wait'):
+            WebDriverWait(driver, 30).until(
+                EC.presence_of_element_located((By.CLASS_NAME, 'datatable-v2_table__93S4Y'))
+            )
+
+        with scrape_timings.phase('parse'):
+            # Capturar la tabla completa
+            table = driver.find_element(By.CLASS_NAME, 'datatable-v2_table__93S4Y')
+            tbody = table.find_element(By.TAG_NAME, 'tbody')
+            rows = tbody.find_elements(By.TAG_NAME, 'tr')[:SCRAPE_LIMIT]
+
+            crypto_data = []
+            for row in rows:
+                vals = []
+                cols = row.find_elements(By.TAG_NAME, 'td')
 
-            for col in cols:
-                vals.append(col.text)
-            vals.insert(0, '')  # Elemento agregado siguiendo el formato esperado
-            vals.insert(3, '')
-            vals.insert(5, '')
+                for col in cols:
+                    vals.append(col.text)
+                vals.insert(0, '')  # Elemento agregado siguiendo el formato esperado
+                vals.insert(3, '')
+                vals.insert(5, '')
 
-            crypto_data.append(vals)
+                crypto_data.append(vals)
 
-        return crypto_data
-    finally:
-        driver.quit()
+    logging.info("Tiempos de scraping con Selenium: %s", scrape_timings.summary())
+    return crypto_data
 
 
 def scrape_with_beautifulsoup():
     """
     Realiza un web scraping de datos de criptomonedas utilizando BeautifulSoup.
 
-    La función hace una solicitud HTTP al sitio objetivo a través de la librería `cloudscraper`
-    y extrae los datos relevantes de criptomonedas desde una tabla HTML.
+    La función hace una solicitud HTTP al sitio objetivo a través de la sesión `cloudscraper`
+    compartida (keep-alive y respuestas comprimidas). Si la respuesta anterior traía `ETag`
+    o `Last-Modified`, la petición es condicional y un 304 reutiliza las filas ya extraídas.
+    Después extrae los datos relevantes de criptomonedas desde una tabla HTML con el backend de
+    `html_parsing` más rápido disponible (selectolax, lxml o BeautifulSoup).
 
     Returns:
-        list: Lista de listas, donde cada sublista contiene los datos de una criptomoneda.
+        list: Lista de listas con el mismo formato que `scrape_with_selenium`.
         None: En caso de errores HTTP o si no se encuentran datos.
     """
     try:
-        headers = {
-            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
-        }
-        scraper = cloudscraper.create_scraper(
-            browser={
-                'browser': 'chrome',
-                'platform': 'windows',
-                'mobile': False
-            }
-        )
-        response = scraper.get(URL)
+        scraper = get_http_session()
+        conditional_headers = {}
+        if _http_cache['rows'] is not None:
+            if _http_cache['etag']:
+                conditional_headers['If-None-Match'] = _http_cache['etag']
+            if _http_cache['last_modified']:
+                conditional_headers['If-Modified-Since'] = _http_cache['last_modified']
+
+        response = scraper.get(URL, headers=conditional_headers, timeout=30)
+        if response.status_code == 304:
+            logging.debug("Página sin cambios (304), se reutilizan las filas anteriores")
+            return [list(row) for row in _http_cache['rows']]
         response.raise_for_status()
 
-        soup = BeautifulSoup(response.text, 'html.parser')
-        div_crypto = soup.find('div', {'class': 'crypto-coins-table_crypto-coins-table-container__bgBaf'})
-        first_div = div_crypto.find('div')
-        second_div = first_div.find('div')
-        table = second_div.find('table')
-        if not table:
-            logging.warning("No se encontró la tabla de criptomonedas")
-
-        rows = table.find('tbody').find_all('tr', limit=5)
-        crypto_data = []
-        for row in rows:
-            try:
-                vals = []
-                cols = row.find_all('td')
-                for col in cols:
-                    if col:
-                        for x in col.contents:
-                            if isinstance(x, NavigableString):
-                                texto = x.strip()
-                                if texto:
-                                    vals.append(texto)
-                            elif len(x.contents) > 1:
-                                for y in x.contents:
-                                    texto = y.get_text(strip=True)
-                                    if texto:
-                                        vals.append(texto)
-                            elif x.name in ['span', 'div']:
-                                texto = x.get_text(strip=True)
-                                if texto:
-                                    vals.append(texto)
-
-                crypto_data.append(vals)
-            except AttributeError as e:
-                logging.warning("Error al procesar una fila: %s", e)
-                continue
-
+        crypto_data = list(parse_crypto_rows(response.text, limit=SCRAPE_LIMIT))
         if not crypto_data:
             logging.warning("No se obtuvieron datos con requests")
+        else:
+            _http_cache.update(
+                etag=response.headers.get('ETag'),
+                last_modified=response.headers.get('Last-Modified'),
+                rows=[list(row) for row in crypto_data],
+            )
 
         return crypto_data
     except requests.RequestException as e:
@@ -164,13 +247,62 @@ def extract_crypto_data():
     """
     Extrae datos de criptomonedas.
 
-    Llama a una de las funciones de scraping disponibles (`scrape_with_selenium` o `scrape_with_beautifulsoup`)
-    para extraer datos de criptomonedas desde el sitio web.
+    Prueba primero la extracción HTTP (`scrape_with_beautifulsoup`, o `scrape_listing_pages`
+    si `SCRAPE_PAGES` > 1), mucho más barata, y solo recurre al navegador (`scrape_with_selenium`)
+    si falla o más de `SCRAPE_MAX_INVALID` de sus filas están mal formadas (ver `valid_rows`).
+    Cada intento se contabiliza en `tier_stats`.
 
     Returns:
         list: Lista de datos de criptomonedas extraídos.
+        None: Si ningún nivel devolvió datos válidos.
+    """
+    http_scraper = scrape_with_beautifulsoup if SCRAPE_PAGES <= 1 else lambda: scrape_listing_pages(SCRAPE_PAGES)
+    for tier, scraper in (('http', http_scraper), ('browser', scrape_with_selenium)):
+        start = time.perf_counter()
+        try:
+            rows = scraper()
+        except Exception as e:
+            logging.error("Error en la extracción '%s': %s", tier, e)
+            rows = None
+        rows = valid_rows(rows)
+        success = rows is not None
+        tier_stats.record(tier, success, time.perf_counter() - start)
+        if success:
+            return rows
+        logging.warning("La extracción '%s' no devolvió datos válidos", tier)
+    return None
+
+
+def iter_crypto_rows():
+    """
+    Genera las filas de criptomonedas para el pipeline de `pipeline.run_pipeline`.
+
+    Con `SCRAPE_PAGES` > 1 las filas se generan a medida que llegan las páginas del listado,
+    descartando las mal formadas; si ninguna es válida se recurre al navegador. Con una sola
+    página se usa la extracción por niveles de `extract_crypto_data`.
+
+    Yields:
+        list: Filas crudas en el formato de `transform_data`.
     """
-    return scrape_with_selenium()
+    if SCRAPE_PAGES <= 1:
+        yield from extract_crypto_data() or []
+        return
+
+    start = time.perf_counter()
+    valid = 0
+    for row in iter_listing_rows(SCRAPE_PAGES):
+        if is_valid_row(row):
+            valid += 1
+            yield row
+    tier_stats.record('http', valid > 0, time.perf_counter() - start)
+    if valid:
+        return
+
+    start = time.perf_counter()
+    rows = valid_rows(scrape_with_selenium())
+    tier_stats.record('browser', rows is not None, time.perf_counter() - start)
+    if rows is not None:
+        yield from rows
 
 
 if __name__ == '__main__':
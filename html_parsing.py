@@ -0,0 +1,160 @@
+import logging
+import os
+
+from transformer import ROW_FIELDS, ROW_WIDTH
+
+TABLE_CONTAINER_CLASS = 'crypto-coins-table_crypto-coins-table-container__bgBaf'
+HTML_PARSER = os.environ.get('HTML_PARSER')  # 'selectolax', 'lxml' o 'bs4'
+
+# Índice de la celda <td> de la tabla de investing.com de la que sale cada campo
+COLUMN_MAP = {
+    'rank': 0,
+    'name': 1,
+    'code': 2,
+    'price': 3,
+    'market_cap': 4,
+    'volume': 5,
+    'total_volume': 6,
+    'change_24h': 7,
+    'change_7d': 8,
+}
+
+
+def compile_layout(column_map=None, row_fields=None):
+    """
+    Precompila la correspondencia entre celdas de la tabla y posiciones de la fila de salida.
+
+    Args:
+        column_map (dict, opcional): Campo -> índice de celda. Por defecto `COLUMN_MAP`.
+        row_fields (dict, opcional): Campo -> posición en la fila. Por defecto `transformer.ROW_FIELDS`.
+
+    Returns:
+        tuple[tuple[int, int], ...]: Pares (índice de celda, posición de salida).
+    """
+    column_map = column_map or COLUMN_MAP
+    row_fields = row_fields or ROW_FIELDS
+    return tuple((cell, row_fields[field]) for field, cell in column_map.items() if field in row_fields)
+
+
+LAYOUT = compile_layout()
+
+
+class SelectolaxBackend:
+    """Backend basado en `selectolax` (Lexbor), el más rápido de los disponibles."""
+
+    name = 'selectolax'
+
+    def __init__(self):
+        from selectolax.lexbor import LexborHTMLParser
+        self._parser = LexborHTMLParser
+
+    def iter_rows(self, html, limit=None):
+        tree = self._parser(html)
+        tbody = tree.css_first(f'div.{TABLE_CONTAINER_CLASS} table tbody')
+        if tbody is None:
+            return
+        for i, row in enumerate(tbody.css('tr')):
+            if limit is not None and i >= limit:
+                return
+            yield [cell.text(separator=' ', strip=True) for cell in row.css('td')]
+
+
+class LxmlBackend:
+    """Backend basado en `lxml.html`."""
+
+    name = 'lxml'
+
+    def __init__(self):
+        from lxml import html as lxml_html
+        from lxml.etree import XPath
+        self._fromstring = lxml_html.fromstring
+        self._rows = XPath(
+            f"//div[contains(concat(' ', normalize-space(@class), ' '), ' {TABLE_CONTAINER_CLASS} ')]"
+            "//table/tbody/tr"
+        )
+        self._cells = XPath('./td')
+
+    def iter_rows(self, html, limit=None):
+        tree = self._fromstring(html)
+        for i, row in enumerate(self._rows(tree)):
+            if limit is not None and i >= limit:
+                return
+            yield [' '.join(' '.join(cell.itertext()).split()) for cell in self._cells(row)]
+
+
+class SoupBackend:
+    """Backend de respaldo basado en BeautifulSoup con `html.parser`."""
+
+    name = 'bs4'
+
+    def __init__(self):
+        from bs4 import BeautifulSoup
+        self._soup = BeautifulSoup
+
+    def iter_rows(self, html, limit=None):
+        soup = self._soup(html, 'html.parser')
+        tbody = soup.select_one(f'div.{TABLE_CONTAINER_CLASS} table tbody')
+        if tbody is None:
+            return
+        for row in tbody.find_all('tr', limit=limit):
+            yield [cell.get_text(' ', strip=True) for cell in row.find_all('td')]
+
+
+BACKENDS = {
+    SelectolaxBackend.name: SelectolaxBackend,
+    LxmlBackend.name: LxmlBackend,
+    SoupBackend.name: SoupBackend,
+}
+_backends = {}
+
+
+def get_backend(name=None):
+    """
+    Devuelve un backend de análisis HTML.
+
+    Sin nombre se usa `HTML_PARSER` o, si no está definido, el primero disponible en el orden
+    selectolax, lxml, BeautifulSoup.
+
+    Args:
+        name (str, opcional): 'selectolax', 'lxml' o 'bs4'.
+
+    Returns:
+        Backend con el método `iter_rows(html, limit=None)`.
+
+    Raises:
+        ImportError: Si se pide un backend cuya librería no está instalada.
+    """
+    name = name or HTML_PARSER
+    candidates = [name] if name else list(BACKENDS)
+    for candidate in candidates:
+        if candidate in _backends:
+            return _backends[candidate]
+        try:
+            backend = _backends[candidate] = BACKENDS[candidate]()
+            return backend
+        except ImportError:
+            if name:
+                raise
+            logging.debug("Backend HTML %s no disponible", candidate)
+    raise ImportError("No hay ningún backend de análisis HTML disponible")
+
+
+def parse_crypto_rows(html, limit=None, backend=None, layout=LAYOUT):
+    """
+    Extrae las filas de la tabla de criptomonedas con el formato que espera `transform_data`.
+
+    Args:
+        html (str): HTML de la página de investing.com.
+        limit (int, opcional): Número máximo de filas. Por defecto todas.
+        backend (str, opcional): Nombre del backend. Por defecto el que devuelve `get_backend()`.
+        layout (tuple, opcional): Correspondencia precompilada de `compile_layout`.
+
+    Yields:
+        list[str]: Filas de longitud `ROW_WIDTH`; las posiciones sin dato quedan como ''.
+    """
+    for cells in get_backend(backend).iter_rows(html, limit):
+        row = [''] * ROW_WIDTH
+        for cell, position in layout:
+            if cell < len(cells):
+                row[position] = cells[cell]
+        yield row
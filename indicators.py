@@ -0,0 +1,288 @@
+import numpy as np
+
+BUY = 1
+SELL = -1
+NEUTRAL = 0
+
+SIGNAL_RULES = {}
+
+
+def to_matrix(histories, length=None):
+    """
+    Convierte los históricos de varias criptomonedas en una matriz de precios.
+
+    Las series se alinean por la derecha (el último precio en la última columna). Las series
+    más cortas se rellenan por la izquierda repitiendo su primer precio: el relleno sí altera
+    los indicadores que lo abarcan (medias, suavizados), así que quien necesite el resultado
+    del tramo real debe recortar cada fila con `counts` (ver `compute_signals`).
+
+    Args:
+        histories (list[list[float]]): Precios de cada moneda, del más antiguo al más reciente.
+        length (int, opcional): Número de columnas. Por defecto la longitud de la serie más larga.
+
+    Returns:
+        tuple[np.ndarray, np.ndarray]: Matriz `float64` de forma (monedas, length) y el número de
+            precios reales de cada moneda.
+    """
+    counts = np.array([min(len(h), length) if length else len(h) for h in histories], dtype=np.int64)
+    length = length or (int(counts.max()) if len(counts) else 0)
+    matrix = np.empty((len(histories), length), dtype=np.float64)
+    for row, (history, count) in enumerate(zip(histories, counts)):
+        if count == 0:
+            matrix[row] = np.nan
+            continue
+        matrix[row, length - count:] = history[len(history) - count:]
+        matrix[row, :length - count] = history[len(history) - count]
+    return matrix, counts
+
+
+def sma(prices, window):
+    """
+    Media móvil simple a lo largo del eje temporal.
+
+    Args:
+        prices (np.ndarray): Matriz (monedas, ticks) de precios.
+        window (int): Número de ticks de la media.
+
+    Returns:
+        np.ndarray: Matriz de la misma forma; NaN en los primeros `window - 1` ticks.
+    """
+    prices = np.asarray(prices, dtype=np.float64)
+    out = np.full(prices.shape, np.nan)
+    if prices.shape[-1] < window:
+        return out
+    csum = np.cumsum(prices, axis=-1)
+    out[..., window - 1] = csum[..., window - 1]
+    out[..., window:] = csum[..., window:] - csum[..., :-window]
+    out[..., window - 1:] /= window
+    return out
+
+
+def ema(prices, span=None, alpha=None):
+    """
+    Media móvil exponencial, vectorizada entre monedas y a lo largo del tiempo.
+
+    La recurrencia `y[i] = alpha * x[i] + (1 - alpha) * y[i - 1]` se resuelve por bloques:
+    dentro de cada bloque es una suma acumulada ponderada por potencias de `1 - alpha`, y solo
+    el estado final de cada bloque se propaga en un bucle. El tamaño del bloque se elige para
+    que las potencias no desborden, de modo que una serie de un año de minutos se calcula
+    con unos cientos de operaciones vectoriales en lugar de un bucle por tick.
+
+    Args:
+        prices (np.ndarray): Matriz (monedas, ticks) de precios.
+        span (int, opcional): Periodo de la media; equivale a `alpha = 2 / (span + 1)`.
+        alpha (float, opcional): Factor de suavizado. Tiene prioridad sobre `span`.
+
+    Returns:
+        np.ndarray: Matriz de la misma forma, iniciada con el primer precio de cada serie.
+    """
+    prices = np.asarray(prices, dtype=np.float64)
+    alpha = alpha if alpha is not None else 2.0 / (span + 1)
+    n = prices.shape[-1]
+    if n == 0:
+        return np.empty_like(prices)
+    beta = 1.0 - alpha
+    if beta <= 0:
+        return prices.copy()
+    # beta^-block <= 1e30: los pesos del bloque caben holgadamente en float64
+    block = max(1, min(n, int(30 / -np.log10(beta))))
+    blocks = -(-n // block)
+    lead = prices.shape[:-1]
+    padded = np.zeros(lead + (blocks * block,))
+    padded[..., :n] = prices
+    steps = np.arange(block)
+    partial = np.cumsum(padded.reshape(lead + (blocks, block)) * (alpha * beta ** -steps), axis=-1) * beta ** steps
+    carry = beta ** (steps + 1)  # peso del estado al final del bloque anterior
+    out = np.empty_like(partial)
+    state = prices[..., 0]  # y[-1] = x[0] reproduce y[0] = x[0]
+    for b in range(blocks):
+        out[..., b, :] = partial[..., b, :] + carry * state[..., None]
+        state = out[..., b, -1]
+    return out.reshape(lead + (blocks * block,))[..., :n]
+
+
+def rsi(prices, period=14):
+    """
+    Índice de fuerza relativa (RSI) con el suavizado de Wilder.
+
+    Args:
+        prices (np.ndarray): Matriz (monedas, ticks) de precios.
+        period (int, opcional): Periodo del RSI. Por defecto 14.
+
+    Returns:
+        np.ndarray: Matriz de la misma forma con valores entre 0 y 100; NaN en el primer tick.
+    """
+    prices = np.asarray(prices, dtype=np.float64)
+    delta = np.diff(prices, axis=-1)
+    gains = ema(np.clip(delta, 0, None), alpha=1.0 / period)
+    losses = ema(np.clip(-delta, 0, None), alpha=1.0 / period)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        rs = gains / losses
+        values = np.where(losses == 0, np.where(gains == 0, 50.0, 100.0), 100.0 - 100.0 / (1.0 + rs))
+    out = np.full(prices.shape, np.nan)
+    out[..., 1:] = values
+    return out
+
+
+def macd(prices, fast=12, slow=26, signal=9):
+    """
+    MACD: diferencia entre dos EMAs y su línea de señal.
+
+    Args:
+        prices (np.ndarray): Matriz (monedas, ticks) de precios.
+        fast (int, opcional): Periodo de la EMA rápida. Por defecto 12.
+        slow (int, opcional): Periodo de la EMA lenta. Por defecto 26.
+        signal (int, opcional): Periodo de la EMA de la señal. Por defecto 9.
+
+    Returns:
+        tuple[np.ndarray, np.ndarray, np.ndarray]: Línea MACD, línea de señal e histograma.
+    """
+    line = ema(prices, fast) - ema(prices, slow)
+    signal_line = ema(line, signal)
+    return line, signal_line, line - signal_line
+
+
+def bollinger(prices, window=20, k=2.0):
+    """
+    Bandas de Bollinger: media móvil simple ± `k` desviaciones típicas.
+
+    Args:
+        prices (np.ndarray): Matriz (monedas, ticks) de precios.
+        window (int, opcional): Número de ticks de la media. Por defecto 20.
+        k (float, opcional): Número de desviaciones típicas. Por defecto 2.
+
+    Returns:
+        tuple[np.ndarray, np.ndarray, np.ndarray]: Banda inferior, media y banda superior.
+    """
+    prices = np.asarray(prices, dtype=np.float64)
+    mean = sma(prices, window)
+    mean_sq = sma(prices * prices, window)
+    std = np.sqrt(np.clip(mean_sq - mean * mean, 0, None))
+    return mean - k * std, mean, mean + k * std
+
+
+def vwap(prices, volumes=None, window=None):
+    """
+    Precio medio ponderado por volumen, acumulado o sobre una ventana móvil.
+
+    Sin volúmenes cada tick pesa lo mismo (precio medio en el tiempo).
+
+    Args:
+        prices (np.ndarray): Matriz (monedas, ticks) de precios.
+        volumes (np.ndarray, opcional): Matriz de volúmenes con la misma forma.
+        window (int, opcional): Número de ticks de la ventana. Por defecto acumulado desde el inicio.
+
+    Returns:
+        np.ndarray: Matriz de la misma forma.
+    """
+    prices = np.asarray(prices, dtype=np.float64)
+    volumes = np.ones_like(prices) if volumes is None else np.asarray(volumes, dtype=np.float64)
+    if window is None:
+        with np.errstate(divide='ignore', invalid='ignore'):
+            return np.cumsum(prices * volumes, axis=-1) / np.cumsum(volumes, axis=-1)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return sma(prices * volumes, window) / sma(volumes, window)
+
+
+def register_rule(name, min_periods=2):
+    """
+    Decorador que registra una regla de señal en `SIGNAL_RULES`.
+
+    Una regla recibe la matriz (monedas, ticks) de precios y devuelve un array con
+    `BUY`, `SELL` o `NEUTRAL` por moneda.
+
+    Args:
+        name (str): Nombre con el que se selecciona la regla (por ejemplo en `?signal=`).
+        min_periods (int, opcional): Precios reales mínimos para emitir señal. Por defecto 2.
+    """
+    def decorator(fn):
+        SIGNAL_RULES[name] = (fn, min_periods)
+        return fn
+    return decorator
+
+
+def _compare(a, b):
+    return np.where(a > b, BUY, np.where(a < b, SELL, NEUTRAL))
+
+
+@register_rule('last', min_periods=2)
+def last_change_rule(prices):
+    """Equivalente vectorizado de `signals.generate_signal`: compara los dos últimos precios."""
+    return _compare(prices[:, -1], prices[:, -2])
+
+
+@register_rule('sma_cross', min_periods=20)
+def sma_cross_rule(prices, fast=5, slow=20):
+    """Compra si la SMA rápida está por encima de la lenta y vende en el caso contrario."""
+    return _compare(sma(prices, fast)[:, -1], sma(prices, slow)[:, -1])
+
+
+@register_rule('ema_cross', min_periods=26)
+def ema_cross_rule(prices, fast=12, slow=26):
+    """Compra si la EMA rápida está por encima de la lenta y vende en el caso contrario."""
+    return _compare(ema(prices, fast)[:, -1], ema(prices, slow)[:, -1])
+
+
+@register_rule('rsi', min_periods=15)
+def rsi_rule(prices, period=14, oversold=30, overbought=70):
+    """Compra en sobreventa (RSI < 30) y vende en sobrecompra (RSI > 70)."""
+    last = rsi(prices, period)[:, -1]
+    return np.where(last < oversold, BUY, np.where(last > overbought, SELL, NEUTRAL))
+
+
+@register_rule('macd', min_periods=35)
+def macd_rule(prices):
+    """Compra si la línea MACD está por encima de su señal y vende en el caso contrario."""
+    line, signal_line, _ = macd(prices)
+    return _compare(line[:, -1], signal_line[:, -1])
+
+
+@register_rule('bollinger', min_periods=20)
+def bollinger_rule(prices, window=20, k=2.0):
+    """Compra por debajo de la banda inferior y vende por encima de la superior."""
+    lower, _, upper = bollinger(prices, window, k)
+    last = prices[:, -1]
+    return np.where(last < lower[:, -1], BUY, np.where(last > upper[:, -1], SELL, NEUTRAL))
+
+
+@register_rule('sma', min_periods=2)
+def sma_rule(prices, window=20):
+    """
+    Compra si el precio está por encima de su SMA de la ventana y vende si está por debajo.
+
+    Los históricos de la caché y de `historical_prices` no guardan el volumen, así que no hay
+    con qué ponderar un VWAP; `vwap` queda disponible para quien tenga los volúmenes.
+    """
+    window = min(window, prices.shape[1])
+    return _compare(prices[:, -1], sma(prices, window)[:, -1])
+
+
+def compute_signals(histories, rule='last'):
+    """
+    Calcula en bloque la señal de todas las criptomonedas con una regla registrada.
+
+    Args:
+        histories (list[list[dict]]): Históricos de cada moneda en el formato de
+            `get_historical_prices` (del más reciente al más antiguo).
+        rule (str, opcional): Nombre de la regla en `SIGNAL_RULES`. Por defecto 'last'.
+
+    Returns:
+        list[str | None]: 'B', 'S' o None por moneda, en el mismo orden que `histories`.
+
+    Raises:
+        KeyError: Si la regla no está registrada.
+    """
+    fn, min_periods = SIGNAL_RULES[rule]
+    if not histories:
+        return []
+    series = [[float(entry['price']) for entry in reversed(history)] for history in histories]
+    matrix, counts = to_matrix(series)
+    labels = {BUY: 'B', SELL: 'S'}
+    signals = [None] * len(histories)
+    # Cada regla se evalúa sobre el tramo real de cada moneda, sin el relleno de `to_matrix`, para
+    # que la señal no dependa de las demás monedas: las de igual longitud se calculan en bloque
+    for count in np.unique(counts[counts >= min_periods]):
+        rows = np.flatnonzero(counts == count)
+        for row, code in zip(rows, fn(matrix[rows, matrix.shape[1] - count:])):
+            signals[row] = labels.get(int(code))
+    return signals
@@ -0,0 +1,256 @@
+import logging
+import math
+import os
+import threading
+import time
+from datetime import datetime, timedelta
+
+# Con INGEST_DEDUP=1 solo se escriben los precios que cambian más de INGEST_EPSILON (relativo)
+# o que llevan INGEST_HEARTBEAT segundos sin escribirse
+INGEST_DEDUP = os.environ.get('INGEST_DEDUP', '0') == '1'
+INGEST_EPSILON = float(os.environ.get('INGEST_EPSILON', 0))
+INGEST_HEARTBEAT = float(os.environ.get('INGEST_HEARTBEAT', 300))
+
+
+class WriteBuffer:
+    """
+    Buffer de micro-lotes para la escritura de precios.
+
+    Acumula filas transformadas y las entrega a `flush_fn` de una sola vez cuando se alcanza
+    `max_rows` filas o cuando la fila más antigua supera `max_age` segundos en el buffer.
+    Pensado para extracciones más frecuentes que cada pocos segundos, donde un commit por
+    extracción sigue siendo demasiado costoso.
+
+    Args:
+        flush_fn (callable): Función que recibe una lista de filas y las persiste,
+            por ejemplo `database.insert_scrape_batch`.
+        max_rows (int, opcional): Número de filas que dispara un vaciado. Por defecto 500.
+        max_age (float, opcional): Antigüedad máxima en segundos de una fila pendiente. Por defecto 5.
+    """
+
+    def __init__(self, flush_fn, max_rows=500, max_age=5.0):
+        self.flush_fn = flush_fn
+        self.max_rows = max_rows
+        self.max_age = max_age
+        self._rows = []
+        self._oldest = None
+        self._lock = threading.Lock()
+        self._timer = None
+        self._closed = False
+
+    def add(self, rows):
+        """
+        Añade filas al buffer y lo vacía si se supera `max_rows` o `max_age`.
+
+        Args:
+            rows (list[dict]): Filas en el formato devuelto por `transform_data`.
+
+        Returns:
+            int: Número de filas escritas por este llamado (0 si solo se encolaron).
+        """
+        with self._lock:
+            if self._closed:
+                raise RuntimeError("El buffer de escritura está cerrado")
+            if not self._rows:
+                self._oldest = time.monotonic()
+            self._rows.extend(rows)
+            due = len(self._rows) >= self.max_rows or self._is_expired()
+            if not due:
+                self._schedule_timer()
+        return self.flush() if due else 0
+
+    def _is_expired(self):
+        return self._oldest is not None and time.monotonic() - self._oldest >= self.max_age
+
+    def _schedule_timer(self):
+        # Garantiza que las filas no esperen más de `max_age` aunque no lleguen nuevas
+        if self._timer is None and self.max_age is not None:
+            self._timer = threading.Timer(self.max_age, self._on_timer)
+            self._timer.daemon = True
+            self._timer.start()
+
+    def _on_timer(self):
+        with self._lock:
+            self._timer = None
+        try:
+            self.flush()
+        except Exception as e:
+            logging.error("Error al vaciar el buffer de escritura: %s", e)
+
+    def flush(self):
+        """
+        Escribe todas las filas pendientes mediante `flush_fn`.
+
+        Si la escritura falla, las filas se devuelven al buffer, se rearma el temporizador para
+        reintentarse pasados `max_age` segundos y la excepción se propaga.
+
+        Returns:
+            int: Número de filas escritas.
+        """
+        with self._lock:
+            rows, self._rows = self._rows, []
+            self._oldest = None
+            if self._timer is not None:
+                self._timer.cancel()
+                self._timer = None
+        if not rows:
+            return 0
+        try:
+            self.flush_fn(rows)
+        except Exception:
+            with self._lock:
+                self._rows[:0] = rows
+                self._oldest = time.monotonic()
+                # Sin temporizador, las filas devueltas esperarían a la siguiente llamada a `add`
+                self._schedule_timer()
+            raise
+        return len(rows)
+
+    def pending(self):
+        """
+        Returns:
+            int: Número de filas a la espera de ser escritas.
+        """
+        with self._lock:
+            return len(self._rows)
+
+    def close(self):
+        """Vacía el buffer y rechaza nuevas filas."""
+        self.flush()
+        with self._lock:
+            self._closed = True
+
+
+class ChangeFilter:
+    """
+    Filtro de ingesta que solo deja pasar los precios que aportan información.
+
+    Un precio se escribe si es el primero de la moneda, si se aleja del último escrito más
+    de `epsilon` (relativo a ese precio) o si han pasado `heartbeat` segundos desde el último
+    escrito. Así `historical_prices` crece con los cambios de precio y no con el tiempo
+    transcurrido; `reconstruct_steps` recupera la serie original a partir de lo escrito.
+
+    Args:
+        epsilon (float, opcional): Variación relativa mínima (0.001 = 0,1 %). Con 0 se escribe
+            cualquier cambio. Por defecto 0.
+        heartbeat (float, opcional): Segundos máximos sin escribir un precio de una moneda. Por defecto 300.
+    """
+
+    def __init__(self, epsilon=0.0, heartbeat=300.0):
+        self.epsilon = epsilon
+        self.heartbeat = heartbeat
+        self._last = {}  # name -> (precio, timestamp) del último precio escrito
+        self._undo = {}  # name -> (valor de `_last` antes del último `filter`, contadores incrementados)
+        self._lock = threading.Lock()
+        self._stats = {'seen': 0, 'written': 0, 'changes': 0, 'heartbeats': 0}
+
+    def _changed(self, price, last_price):
+        return abs(price - last_price) > self.epsilon * abs(last_price)
+
+    def filter(self, rows):
+        """
+        Devuelve las filas de una extracción que deben escribirse.
+
+        Las filas sin precio se descartan. Las filas devueltas se dan por escritas; si la
+        escritura falla hay que llamar a `rollback` para que vuelvan a pasar en la siguiente
+        extracción.
+
+        Args:
+            rows (list[dict]): Filas con 'name', 'actual_price' y 'timestamp'.
+
+        Returns:
+            list[dict]: Filas a escribir, en el mismo orden.
+        """
+        kept = []
+        with self._lock:
+            self._undo = {}
+            for row in rows:
+                self._stats['seen'] += 1
+                price = row['actual_price']
+                if price is None:
+                    continue
+                last = self._last.get(row['name'])
+                if last is None or self._changed(price, last[0]):
+                    reason = 'changes'
+                elif (row['timestamp'] - last[1]).total_seconds() >= self.heartbeat:
+                    reason = 'heartbeats'
+                else:
+                    continue
+                self._stats[reason] += 1
+                self._undo.setdefault(row['name'], (last, []))[1].append(reason)
+                self._last[row['name']] = (price, row['timestamp'])
+                kept.append(row)
+            self._stats['written'] += len(kept)
+        return kept
+
+    def rollback(self, rows):
+        """
+        Deshace el último `filter` para las filas que no se pudieron escribir.
+
+        Restaura el último precio escrito de cada moneda y descuenta de las estadísticas las
+        escrituras de esas monedas, para que no se cuenten dos veces al reintentarse.
+
+        Args:
+            rows (list[dict]): Filas devueltas por el último `filter`.
+        """
+        with self._lock:
+            for row in rows:
+                name = row['name']
+                if name not in self._undo or self._last.get(name) != (row['actual_price'], row['timestamp']):
+                    continue
+                previous, reasons = self._undo.pop(name)
+                if previous is None:
+                    self._last.pop(name, None)
+                else:
+                    self._last[name] = previous
+                for reason in reasons:
+                    self._stats[reason] -= 1
+                self._stats['written'] -= len(reasons)
+
+    def stats(self):
+        """
+        Returns:
+            dict: Filas vistas y escritas, escrituras por cambio y por heartbeat, y
+                'reduction', la fracción de filas que no se escribieron.
+        """
+        with self._lock:
+            stats = dict(self._stats)
+        stats['reduction'] = round(1 - stats['written'] / stats['seen'], 4) if stats['seen'] else 0.0
+        return stats
+
+
+def reconstruct_steps(history, interval, heartbeat, until=None, limit=None):
+    """
+    Reconstruye la serie de precios a intervalos regulares a partir de lo escrito por `ChangeFilter`.
+
+    Cada precio escrito se repite cada `interval` segundos hasta el siguiente precio escrito
+    (función escalonada). Un precio no se extiende más allá de `heartbeat` segundos: pasado
+    ese tiempo sin una fila nueva es que no hubo extracciones, y el hueco se conserva.
+
+    Args:
+        history (list[dict]): Precios con 'price' y 'timestamp', del más reciente al más
+            antiguo (formato de `get_historical_prices`).
+        interval (float): Segundos entre extracciones.
+        heartbeat (float): Heartbeat del `ChangeFilter` que escribió los precios.
+        until (datetime, opcional): Fin de la serie. Por defecto la hora actual.
+        limit (int, opcional): Número máximo de puntos, los más recientes.
+
+    Returns:
+        list[dict]: Precios con 'price' y 'timestamp', del más reciente al más antiguo.
+    """
+    if not history:
+        return []
+    until = until or datetime.now()
+    step = timedelta(seconds=interval)
+    reach = timedelta(seconds=heartbeat)
+    points = []
+    newer = until
+    for entry in history:
+        end = min(newer, entry['timestamp'] + reach)
+        count = max(1, math.ceil((end - entry['timestamp']) / step))
+        for k in range(count - 1, -1, -1):
+            points.append({'price': entry['price'], 'timestamp': entry['timestamp'] + k * step})
+            if limit is not None and len(points) >= limit:
+                return points
+        newer = entry['timestamp']
+    return points
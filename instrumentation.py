@@ -0,0 +1,353 @@
+import logging
+import os
+import sys
+import threading
+import time
+from collections import Counter as _StackCounter
+from contextlib import contextmanager
+
+# Con PROFILER_INTERVAL > 0 (segundos entre muestras) se activa el perfilador por muestreo
+PROFILER_INTERVAL = float(os.environ.get('PROFILER_INTERVAL', 0))
+PROFILER_MAX_DEPTH = int(os.environ.get('PROFILER_MAX_DEPTH', 40))
+
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+ROW_BUCKETS = (1, 10, 50, 100, 250, 500, 1000, 2500, 5000, 10000)
+
+
+def _format_labels(labelnames, values, extra=None):
+    pairs = list(zip(labelnames, values))
+    if extra:
+        pairs.append(extra)
+    if not pairs:
+        return ''
+    escaped = (
+        (name, str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"'))
+        for name, value in pairs
+    )
+    return '{' + ','.join(f'{name}="{value}"' for name, value in escaped) + '}'
+
+
+def _format_value(value):
+    if value == float('inf'):
+        return '+Inf'
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Metric:
+    """
+    Base de las métricas: nombre, ayuda, etiquetas y valores por combinación de etiquetas.
+
+    Args:
+        name (str): Nombre de la métrica en formato Prometheus.
+        help (str): Descripción.
+        labelnames (tuple[str], opcional): Nombres de las etiquetas.
+    """
+
+    type = None
+
+    def __init__(self, name, help, labelnames=()):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def _key(self, labels):
+        if set(labels) != set(self.labelnames):
+            raise ValueError(f"{self.name} espera las etiquetas {self.labelnames}, no {tuple(labels)}")
+        return tuple(labels[name] for name in self.labelnames)
+
+    def samples(self):
+        """
+        Returns:
+            list[tuple]: Tuplas (sufijo, etiquetas, valor) en formato de exposición.
+        """
+        with self._lock:
+            return [('', _format_labels(self.labelnames, key), value) for key, value in self._values.items()]
+
+    def render(self):
+        """
+        Returns:
+            str: La métrica en el formato de texto de Prometheus.
+        """
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.type}"]
+        lines.extend(f"{self.name}{suffix}{labels} {_format_value(value)}" for suffix, labels, value in self.samples())
+        return '\n'.join(lines)
+
+
+class Counter(Metric):
+    """Contador monótono."""
+
+    type = 'counter'
+
+    def inc(self, amount=1, **labels):
+        """
+        Incrementa el contador.
+
+        Args:
+            amount (float, opcional): Incremento. Por defecto 1.
+            **labels: Valor de cada etiqueta.
+        """
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels):
+        with self._lock:
+            return self._values.get(self._key(labels), 0)
+
+
+class Gauge(Metric):
+    """Valor instantáneo que puede subir o bajar."""
+
+    type = 'gauge'
+
+    def set(self, value, **labels):
+        """
+        Fija el valor.
+
+        Args:
+            value (float): Nuevo valor.
+            **labels: Valor de cada etiqueta.
+        """
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = value
+
+
+class Histogram(Metric):
+    """
+    Histograma de observaciones con cubetas acumuladas, suma y recuento.
+
+    Args:
+        name (str): Nombre de la métrica.
+        help (str): Descripción.
+        labelnames (tuple[str], opcional): Nombres de las etiquetas.
+        buckets (tuple[float], opcional): Límites superiores de las cubetas. Por defecto `DEFAULT_BUCKETS`.
+    """
+
+    type = 'histogram'
+
+    def __init__(self, name, help, labelnames=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, help, labelnames)
+        self.buckets = tuple(sorted(buckets)) + (float('inf'),)
+
+    def observe(self, value, **labels):
+        """
+        Registra una observación.
+
+        Args:
+            value (float): Valor observado (segundos, filas...).
+            **labels: Valor de cada etiqueta.
+        """
+        key = self._key(labels)
+        with self._lock:
+            state = self._values.get(key)
+            if state is None:
+                state = self._values[key] = [[0] * len(self.buckets), 0.0, 0]
+            counts = state[0]
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    counts[i] += 1
+                    break
+            state[1] += value
+            state[2] += 1
+
+    @contextmanager
+    def time(self, **labels):
+        """Context manager que observa la duración del bloque en segundos."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+
+    def summary(self, **labels):
+        """
+        Returns:
+            dict: 'count' y 'sum' de las observaciones con esas etiquetas.
+        """
+        with self._lock:
+            state = self._values.get(self._key(labels))
+        return {'count': state[2], 'sum': state[1]} if state else {'count': 0, 'sum': 0.0}
+
+    def samples(self):
+        with self._lock:
+            values = [(key, list(state[0]), state[1], state[2]) for key, state in self._values.items()]
+        samples = []
+        for key, counts, total, count in values:
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets, counts):
+                cumulative += bucket_count
+                labels = _format_labels(self.labelnames, key, ('le', _format_value(bound)))
+                samples.append(('_bucket', labels, cumulative))
+            labels = _format_labels(self.labelnames, key)
+            samples.append(('_sum', labels, total))
+            samples.append(('_count', labels, count))
+        return samples
+
+
+class Registry:
+    """Conjunto de métricas que se exponen juntas en `/metrics`."""
+
+    def __init__(self):
+        self._metrics = {}
+        self._lock = threading.Lock()
+
+    def register(self, metric):
+        """
+        Args:
+            metric (Metric): Métrica a exponer.
+
+        Returns:
+            Metric: La misma métrica, o la ya registrada con ese nombre.
+        """
+        with self._lock:
+            return self._metrics.setdefault(metric.name, metric)
+
+    def counter(self, name, help, labelnames=()):
+        return self.register(Counter(name, help, labelnames))
+
+    def gauge(self, name, help, labelnames=()):
+        return self.register(Gauge(name, help, labelnames))
+
+    def histogram(self, name, help, labelnames=(), buckets=DEFAULT_BUCKETS):
+        return self.register(Histogram(name, help, labelnames, buckets))
+
+    def render(self):
+        """
+        Returns:
+            str: Todas las métricas en el formato de texto de Prometheus (versión 0.0.4).
+        """
+        with self._lock:
+            metrics = list(self._metrics.values())
+        return '\n'.join(metric.render() for metric in metrics) + '\n'
+
+
+registry = Registry()
+
+SCRAPE_PHASE_SECONDS = registry.histogram(
+    'scrape_phase_seconds', "Duración de cada fase del scraping con navegador", ('phase',))
+SCRAPE_TIER_SECONDS = registry.histogram(
+    'scrape_tier_seconds', "Duración de cada intento de extracción por nivel", ('tier', 'outcome'))
+DB_OPERATION_SECONDS = registry.histogram(
+    'db_operation_seconds', "Latencia de las operaciones de base de datos", ('operation',))
+INGEST_ROWS = registry.histogram(
+    'ingest_rows', "Filas escritas por ciclo de ingesta", buckets=ROW_BUCKETS)
+INGEST_CYCLE_SECONDS = registry.histogram(
+    'ingest_cycle_seconds', "Duración de cada ciclo de ingesta", ('outcome',))
+SIGNAL_SECONDS = registry.histogram(
+    'signal_compute_seconds', "Tiempo de cálculo de señales por regla", ('rule',))
+HTTP_REQUEST_SECONDS = registry.histogram(
+    'http_request_seconds', "Latencia de las rutas de Flask", ('endpoint', 'method', 'status'))
+
+
+def instrument_flask(app):
+    """
+    Mide la latencia de cada petición de una aplicación Flask por endpoint, método y estado.
+
+    Se usa el nombre del endpoint (no la URL) para que el número de series esté acotado.
+
+    Args:
+        app (Flask): Aplicación a instrumentar.
+    """
+    from flask import g, request
+
+    @app.before_request
+    def _start_timer():
+        g._request_start = time.perf_counter()
+
+    @app.after_request
+    def _observe_latency(response):
+        start = g.pop('_request_start', None)
+        if start is not None:
+            HTTP_REQUEST_SECONDS.observe(
+                time.perf_counter() - start,
+                endpoint=request.endpoint or 'unknown',
+                method=request.method,
+                status=str(response.status_code),
+            )
+        return response
+
+
+class SamplingProfiler:
+    """
+    Perfilador por muestreo para producción.
+
+    Un hilo toma cada `interval` segundos la pila de todos los hilos (`sys._current_frames`)
+    y cuenta cuántas veces aparece cada pila. No instrumenta el código, así que el coste es
+    proporcional a la frecuencia de muestreo y no al trabajo de la aplicación. El resultado
+    se exporta en formato de pilas colapsadas, listo para `flamegraph.pl` o speedscope.
+
+    Args:
+        interval (float, opcional): Segundos entre muestras. Por defecto 0.01.
+        max_depth (int, opcional): Marcos máximos por pila. Por defecto `PROFILER_MAX_DEPTH`.
+    """
+
+    def __init__(self, interval=0.01, max_depth=PROFILER_MAX_DEPTH):
+        self.interval = interval
+        self.max_depth = max_depth
+        self.samples = 0
+        self._stacks = _StackCounter()
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+
+    @property
+    def running(self):
+        """bool: True si el hilo de muestreo está activo."""
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self):
+        """Arranca el muestreo en un hilo daemon."""
+        if self.running:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name='sampling-profiler', daemon=True)
+        self._thread.start()
+        logging.info("Perfilador por muestreo activo cada %ss", self.interval)
+
+    def stop(self):
+        """Detiene el muestreo."""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def _run(self):
+        own = threading.get_ident()
+        while not self._stop.wait(self.interval):
+            sampled = []
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id == own:
+                    continue
+                stack = []
+                while frame is not None and len(stack) < self.max_depth:
+                    code = frame.f_code
+                    stack.append(f"{os.path.basename(code.co_filename)}:{code.co_name}")
+                    frame = frame.f_back
+                sampled.append(';'.join(reversed(stack)))
+            with self._lock:
+                self._stacks.update(sampled)
+                self.samples += 1
+
+    def collapsed(self, limit=None):
+        """
+        Args:
+            limit (int, opcional): Número máximo de pilas, las más frecuentes.
+
+        Returns:
+            str: Una línea 'marco;marco;... recuento' por pila.
+        """
+        with self._lock:
+            stacks = self._stacks.most_common(limit)
+        return '\n'.join(f"{stack} {count}" for stack, count in stacks) + '\n'
+
+    def reset(self):
+        """Descarta las muestras acumuladas."""
+        with self._lock:
+            self._stacks.clear()
+            self.samples = 0
+
+
+profiler = SamplingProfiler(PROFILER_INTERVAL) if PROFILER_INTERVAL > 0 else None
@@ -0,0 +1,355 @@
+import argparse
+import json
+import logging
+import os
+import random
+import sys
+import time
+from datetime import datetime, timedelta
+
+from database import db_connection, execute_db, get_backend, query_db
+
+TABLE = 'historical_prices'
+FUTURE_PARTITION = 'p_future'
+PARTITION_GRANULARITY = os.environ.get('PARTITION_GRANULARITY', 'month')  # 'month' o 'day'
+PARTITIONS_AHEAD = int(os.environ.get('PARTITIONS_AHEAD', 3))
+HISTORY_RETENTION_DAYS = os.environ.get('HISTORY_RETENTION_DAYS')
+
+
+def _period_start(moment, granularity):
+    if granularity == 'day':
+        return datetime(moment.year, moment.month, moment.day)
+    if granularity == 'month':
+        return datetime(moment.year, moment.month, 1)
+    raise ValueError(f"Granularidad de partición no soportada: {granularity}")
+
+
+def _next_period(start, granularity):
+    if granularity == 'day':
+        return start + timedelta(days=1)
+    if start.month == 12:
+        return datetime(start.year + 1, 1, 1)
+    return datetime(start.year, start.month + 1, 1)
+
+
+def partition_name(upper_bound, granularity):
+    """
+    Construye el nombre de la partición que contiene el periodo anterior a `upper_bound`.
+
+    Args:
+        upper_bound (datetime): Límite superior (exclusivo) de la partición.
+        granularity (str): 'month' o 'day'.
+
+    Returns:
+        str: Nombre de la partición, por ejemplo 'p202610' o 'p20261017'.
+    """
+    if granularity == 'day':
+        return 'p' + (upper_bound - timedelta(days=1)).strftime('%Y%m%d')
+    previous = upper_bound - timedelta(days=1)
+    return 'p' + previous.strftime('%Y%m')
+
+
+def get_partitions(table=TABLE):
+    """
+    Lee las particiones actuales de `historical_prices` desde INFORMATION_SCHEMA.
+
+    Args:
+        table (str, opcional): Tabla particionada. Por defecto `historical_prices`.
+
+    Returns:
+        list[dict]: Lista ordenada de particiones con 'name' y 'upper_bound' (datetime,
+            o None para la partición MAXVALUE). Lista vacía si la tabla no está particionada.
+    """
+    rows = query_db('''
+        SELECT PARTITION_NAME as name, PARTITION_DESCRIPTION as description
+        FROM INFORMATION_SCHEMA.PARTITIONS
+        WHERE TABLE_SCHEMA = DATABASE()
+            AND TABLE_NAME = %s
+            AND PARTITION_NAME IS NOT NULL
+        ORDER BY PARTITION_ORDINAL_POSITION
+    ''', (table,)) or []
+
+    partitions = []
+    for row in rows:
+        description = (row['description'] or '').strip("'")
+        upper_bound = None if description == 'MAXVALUE' else datetime.fromisoformat(description)
+        partitions.append({'name': row['name'], 'upper_bound': upper_bound})
+    return partitions
+
+
+def ensure_partitions(ahead=PARTITIONS_AHEAD, granularity=PARTITION_GRANULARITY, now=None, table=TABLE):
+    """
+    Crea las particiones que faltan hasta `ahead` periodos por delante dividiendo `p_future`.
+
+    Las nuevas particiones empiezan en el límite de la última existente, de modo que si el
+    mantenimiento no se ejecutó durante varios periodos también se crean las de esos periodos.
+    Si la tabla solo tiene `p_future` (recién creada o migrada), empiezan en el periodo del
+    precio más antiguo y cada periodo del histórico previo queda en su propia partición, que
+    `drop_expired_partitions` puede eliminar por separado. Mientras `p_future` esté vacía la
+    reorganización solo toca metadatos.
+
+    Args:
+        ahead (int, opcional): Número de periodos futuros a tener creados. Por defecto `PARTITIONS_AHEAD`.
+        granularity (str, opcional): 'month' o 'day'. Por defecto `PARTITION_GRANULARITY`.
+        now (datetime, opcional): Momento de referencia. Por defecto la hora actual.
+        table (str, opcional): Tabla particionada. Por defecto `historical_prices`.
+
+    Returns:
+        list[str]: Nombres de las particiones creadas.
+    """
+    partitions = get_partitions(table)
+    if not partitions:
+        logging.warning("La tabla %s no está particionada; ejecute migrate_historical_prices()", table)
+        return []
+
+    now = now or datetime.now()
+    horizon = _period_start(now, granularity)
+    for _ in range(ahead + 1):
+        horizon = _next_period(horizon, granularity)
+
+    bounds = [p['upper_bound'] for p in partitions if p['upper_bound'] is not None]
+    if bounds:
+        boundary = _next_period(max(bounds), granularity)
+    else:
+        # Las filas con la marca de 1970 de `migrate_historical_prices` van a la primera partición
+        oldest = query_db(f"SELECT MIN(timestamp) as oldest FROM {table} WHERE timestamp > '1970-01-01 00:00:00'",
+                          one=True)
+        first = oldest['oldest'] if oldest and oldest['oldest'] is not None else now
+        boundary = _next_period(_period_start(min(first, now), granularity), granularity)
+
+    targets = []
+    while boundary <= horizon:
+        targets.append(boundary)
+        boundary = _next_period(boundary, granularity)
+
+    if not targets:
+        return []
+
+    definitions = [
+        f"PARTITION {partition_name(bound, granularity)} VALUES LESS THAN ('{bound:%Y-%m-%d %H:%M:%S}')"
+        for bound in targets
+    ]
+    definitions.append(f"PARTITION {FUTURE_PARTITION} VALUES LESS THAN (MAXVALUE)")
+    execute_db(f'''
+        ALTER TABLE {table}
+        REORGANIZE PARTITION {FUTURE_PARTITION} INTO ({', '.join(definitions)})
+    ''')
+    return [partition_name(bound, granularity) for bound in targets]
+
+
+def drop_expired_partitions(retention_days, now=None, table=TABLE):
+    """
+    Elimina las particiones cuyo periodo completo es anterior a la ventana de retención.
+
+    `DROP PARTITION` descarta el fichero de la partición sin recorrer sus filas, por lo que
+    el coste no depende del volumen de histórico eliminado.
+
+    Args:
+        retention_days (int): Días de histórico que se conservan.
+        now (datetime, opcional): Momento de referencia. Por defecto la hora actual.
+        table (str, opcional): Tabla particionada. Por defecto `historical_prices`.
+
+    Returns:
+        list[str]: Nombres de las particiones eliminadas.
+    """
+    cutoff = (now or datetime.now()) - timedelta(days=retention_days)
+    expired = [
+        p['name'] for p in get_partitions(table)
+        if p['upper_bound'] is not None and p['upper_bound'] <= cutoff
+    ]
+    if expired:
+        execute_db(f"ALTER TABLE {table} DROP PARTITION {', '.join(expired)}")
+    return expired
+
+
+def migrate_historical_prices(partition=True):
+    """
+    Adapta una tabla `historical_prices` creada con el esquema anterior.
+
+    Añade el índice compuesto `(name, timestamp)` si falta y, opcionalmente, convierte la tabla
+    al esquema particionado por rango de `timestamp`. Cada paso comprueba INFORMATION_SCHEMA
+    antes de ejecutarse, así que la migración puede repetirse sin efectos.
+
+    Args:
+        partition (bool, opcional): Si es True, particiona la tabla. Por defecto es True.
+
+    Returns:
+        list[str]: Descripción de los pasos aplicados.
+    """
+    applied = []
+
+    index = query_db('''
+        SELECT 1 FROM INFORMATION_SCHEMA.STATISTICS
+        WHERE TABLE_SCHEMA = DATABASE()
+            AND TABLE_NAME = %s
+            AND INDEX_NAME = 'idx_historical_name_timestamp'
+        LIMIT 1
+    ''', (TABLE,), one=True)
+    if index is None:
+        execute_db(f"ALTER TABLE {TABLE} ADD INDEX idx_historical_name_timestamp (name, timestamp)")
+        applied.append('index')
+
+    if partition and not get_partitions():
+        # Las filas sin timestamp no pueden ubicarse en ninguna partición por rango
+        execute_db(f"UPDATE {TABLE} SET timestamp = '1970-01-01 00:00:00' WHERE timestamp IS NULL")
+        execute_db(f'''
+            ALTER TABLE {TABLE}
+                MODIFY id BIGINT NOT NULL AUTO_INCREMENT,
+                MODIFY timestamp DATETIME NOT NULL,
+                DROP PRIMARY KEY,
+                ADD PRIMARY KEY (id, timestamp)
+        ''')
+        execute_db(f'''
+            ALTER TABLE {TABLE}
+            PARTITION BY RANGE COLUMNS(timestamp) (
+                PARTITION {FUTURE_PARTITION} VALUES LESS THAN (MAXVALUE)
+            )
+        ''')
+        applied.append('partition')
+
+    return applied
+
+
+def run_retention(retention_days=None, ahead=PARTITIONS_AHEAD, granularity=PARTITION_GRANULARITY):
+    """
+    Tarea de mantenimiento: crea las particiones futuras y elimina las caducadas.
+
+    Args:
+        retention_days (int, opcional): Días de histórico a conservar. Si es None no se elimina nada.
+        ahead (int, opcional): Periodos futuros a mantener creados.
+        granularity (str, opcional): 'month' o 'day'.
+
+    Returns:
+        dict: Particiones 'created' y 'dropped'.
+    """
+    created = ensure_partitions(ahead=ahead, granularity=granularity)
+    dropped = drop_expired_partitions(retention_days) if retention_days is not None else []
+    return {'created': created, 'dropped': dropped}
+
+
+def _timed(fn, repeat=1):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        fn()
+    return round((time.perf_counter() - start) / repeat, 6)
+
+
+def run_benchmark(rows=10_000_000, coins=100, days=365, retention_days=180, granularity=PARTITION_GRANULARITY,
+                  batch=10_000, reads=100):
+    """
+    Compara en MySQL el esquema anterior de `historical_prices` con el indexado y particionado.
+
+    Crea dos tablas temporales con `rows` precios sintéticos repartidos en `days` días: una con
+    solo la clave primaria `id` (esquema anterior) y otra con el índice `(name, timestamp)` y
+    particiones. La segunda se carga en `p_future` y se particiona con `ensure_partitions`, como
+    tras `migrate_historical_prices`. Después se miden las lecturas de `get_historical_prices`
+    y de un rango de un día en ambas, y la retención con `DELETE` frente a `DROP PARTITION`.
+    Las tablas se eliminan al terminar.
+
+    Args:
+        rows (int, opcional): Precios a generar. Por defecto 10 millones.
+        coins (int, opcional): Monedas entre las que se reparten. Por defecto 100.
+        days (int, opcional): Días de histórico hasta ahora. Por defecto 365.
+        retention_days (int, opcional): Días que conserva la retención medida. Por defecto 180.
+        granularity (str, opcional): 'month' o 'day'. Por defecto `PARTITION_GRANULARITY`.
+        batch (int, opcional): Filas por inserción. Por defecto 10000.
+        reads (int, opcional): Lecturas medidas por consulta. Por defecto 100.
+
+    Returns:
+        dict: Segundos de carga y particionado, segundos por lectura en cada tabla y segundos
+            de la retención en cada tabla.
+    """
+    flat, partitioned = f"{TABLE}_bench_flat", f"{TABLE}_bench_partitioned"
+    columns = "name VARCHAR(255), code VARCHAR(10), price DECIMAL(20,8), timestamp DATETIME NOT NULL"
+    now = datetime.now().replace(microsecond=0)
+    origin = now - timedelta(days=days)
+    step = days * 86400 / rows
+    backend = get_backend()
+
+    for table in (flat, partitioned):
+        execute_db(f"DROP TABLE IF EXISTS {table}")
+    execute_db(f"CREATE TABLE {flat} (id BIGINT AUTO_INCREMENT PRIMARY KEY, {columns})")
+    execute_db(f'''
+        CREATE TABLE {partitioned} (
+            id BIGINT AUTO_INCREMENT, {columns},
+            PRIMARY KEY (id, timestamp),
+            KEY idx_bench_name_timestamp (name, timestamp)
+        )
+        PARTITION BY RANGE COLUMNS(timestamp) (PARTITION {FUTURE_PARTITION} VALUES LESS THAN (MAXVALUE))
+    ''')
+    try:
+        rng = random.Random(0)
+        start = time.perf_counter()
+        with db_connection() as conn:
+            cursor = backend.cursor(conn)
+            for offset in range(0, rows, batch):
+                cursor.executemany(
+                    f"INSERT INTO {flat} (name, code, price, timestamp) VALUES (%s, %s, %s, %s)",
+                    [(f"Coin{i % coins}", f"C{i % coins}", round(rng.uniform(1, 1000), 8),
+                      origin + timedelta(seconds=int(i * step)))
+                     for i in range(offset, min(offset + batch, rows))])
+                conn.commit()
+            cursor.close()
+        load_seconds = time.perf_counter() - start
+        execute_db(f"INSERT INTO {partitioned} (name, code, price, timestamp) "
+                   f"SELECT name, code, price, timestamp FROM {flat}")
+        partition_seconds = _timed(lambda: ensure_partitions(granularity=granularity, now=now, table=partitioned))
+
+        names = [f"Coin{i % coins}" for i in range(reads)]
+        day = now - timedelta(days=days // 2)
+        results = {
+            'rows': rows,
+            'coins': coins,
+            'days': days,
+            'granularity': granularity,
+            'partitions': len(get_partitions(partitioned)),
+            'load_seconds': round(load_seconds, 3),
+            'partition_seconds': partition_seconds,
+        }
+        for label, table in (('flat', flat), ('partitioned', partitioned)):
+            names_iter = iter(names * 2)
+            results[f'latest_100_{label}_seconds'] = _timed(lambda: query_db(
+                f"SELECT price, timestamp FROM {table} WHERE name = %s ORDER BY timestamp DESC LIMIT 100",
+                (next(names_iter),)), reads)
+            results[f'range_day_{label}_seconds'] = _timed(lambda: query_db(
+                f"SELECT price, timestamp FROM {table} WHERE name = %s AND timestamp >= %s AND timestamp < %s "
+                f"ORDER BY timestamp DESC LIMIT 1000", (next(names_iter), day, day + timedelta(days=1))), reads)
+
+        cutoff = now - timedelta(days=retention_days)
+        results['retention_delete_seconds'] = _timed(
+            lambda: execute_db(f"DELETE FROM {flat} WHERE timestamp < %s", (cutoff,)))
+        results['retention_drop_partition_seconds'] = _timed(
+            lambda: drop_expired_partitions(retention_days, now=now, table=partitioned))
+        return results
+    finally:
+        for table in (flat, partitioned):
+            execute_db(f"DROP TABLE IF EXISTS {table}")
+
+
+if __name__ == '__main__':
+    """
+    Punto de entrada de la tarea de retención.
+
+    Pensado para ejecutarse periódicamente (por ejemplo desde cron):
+        python partitions.py --retention-days 90
+        python partitions.py --migrate
+        python partitions.py --benchmark 10000000   # compara el esquema anterior en tablas temporales
+    """
+    parser = argparse.ArgumentParser(description="Mantenimiento de particiones de historical_prices")
+    parser.add_argument('--migrate', action='store_true', help="Migra una tabla creada con el esquema anterior")
+    parser.add_argument('--retention-days', type=int,
+                        default=int(HISTORY_RETENTION_DAYS) if HISTORY_RETENTION_DAYS else None)
+    parser.add_argument('--ahead', type=int, default=PARTITIONS_AHEAD)
+    parser.add_argument('--granularity', choices=['month', 'day'], default=PARTITION_GRANULARITY)
+    parser.add_argument('--benchmark', type=int, metavar='ROWS', help="Mide lecturas y retención con ROWS precios y termina")
+    args = parser.parse_args()
+
+    if args.benchmark:
+        print(json.dumps(run_benchmark(args.benchmark, granularity=args.granularity,
+                                       retention_days=args.retention_days or 180), indent=2))
+        sys.exit(0)
+
+    if args.migrate:
+        print(f"Migración aplicada: {migrate_historical_prices()}")
+    result = run_retention(args.retention_days, ahead=args.ahead, granularity=args.granularity)
+    print(f"Particiones creadas: {result['created']}, eliminadas: {result['dropped']}")
@@ -0,0 +1,214 @@
+import os
+import queue
+import threading
+import time
+from datetime import datetime
+
+from transformer import transform_data
+
+PIPELINE_BATCH_SIZE = int(os.environ.get('PIPELINE_BATCH_SIZE', 500))
+PIPELINE_QUEUE_SIZE = int(os.environ.get('PIPELINE_QUEUE_SIZE', 1000))
+
+_END = object()
+
+
+class PipelineCancelled(Exception):
+    """Se lanza en el productor de `threaded_source` cuando el consumidor deja de leer."""
+
+
+class PipelineStats:
+    """
+    Filas y tiempo de cada etapa del pipeline.
+
+    El tiempo de una etapa es el que pasa produciendo sus elementos, sin contar el que
+    consumen las etapas posteriores.
+    """
+
+    def __init__(self):
+        self.stages = {}
+
+    def record(self, stage, rows, seconds):
+        stats = self.stages.setdefault(stage, {'rows': 0, 'seconds': 0.0})
+        stats['rows'] += rows
+        stats['seconds'] += seconds
+
+    def as_dict(self):
+        """
+        Returns:
+            dict: Por etapa, 'rows' y 'seconds'.
+        """
+        return {stage: dict(stats) for stage, stats in self.stages.items()}
+
+
+def instrument(stage, iterable, stats, weight=None):
+    """
+    Envuelve un iterable para medir cuántos elementos produce y cuánto tarda en producirlos.
+
+    Args:
+        stage (str): Nombre de la etapa.
+        iterable (iterable): Etapa a medir.
+        stats (PipelineStats): Destino de las mediciones.
+        weight (callable, opcional): Número de filas que representa cada elemento (p. ej. `len` en lotes).
+
+    Yields:
+        Los mismos elementos que `iterable`.
+    """
+    iterator = iter(iterable)
+    while True:
+        start = time.perf_counter()
+        try:
+            item = next(iterator)
+        except StopIteration:
+            stats.record(stage, 0, time.perf_counter() - start)
+            return
+        stats.record(stage, weight(item) if weight else 1, time.perf_counter() - start)
+        yield item
+
+
+def threaded_source(produce, maxsize=PIPELINE_QUEUE_SIZE):
+    """
+    Convierte un productor que corre en otro hilo en un iterable con contrapresión.
+
+    El productor recibe una función `emit(item)` que bloquea cuando la cola de `maxsize`
+    elementos está llena, de modo que nunca se adelanta más de `maxsize` filas al consumidor.
+    Las excepciones del productor se relanzan en el consumidor.
+
+    Args:
+        produce (callable): Función que recibe `emit` y produce los elementos.
+        maxsize (int, opcional): Capacidad de la cola. Por defecto `PIPELINE_QUEUE_SIZE`.
+
+    Yields:
+        Los elementos emitidos por el productor, en orden.
+    """
+    items = queue.Queue(maxsize)
+    errors = []
+    cancelled = threading.Event()
+
+    def emit(item):
+        if cancelled.is_set():
+            raise PipelineCancelled("Consumidor del pipeline cerrado")
+        items.put(item)
+
+    def run():
+        try:
+            produce(emit)
+        except BaseException as e:
+            if not cancelled.is_set():
+                errors.append(e)
+        finally:
+            items.put(_END)
+
+    thread = threading.Thread(target=run, name='pipeline-source', daemon=True)
+    thread.start()
+    try:
+        while True:
+            item = items.get()
+            if item is _END:
+                break
+            yield item
+    finally:
+        # Si el consumidor se detiene antes de tiempo, desbloqueamos al productor
+        cancelled.set()
+        while thread.is_alive():
+            try:
+                items.get(timeout=0.1)
+            except queue.Empty:
+                pass
+        thread.join()
+    if errors:
+        raise errors[0]
+
+
+def transform_stage(rows, timestamp, size=PIPELINE_BATCH_SIZE):
+    """
+    Transforma filas crudas con una marca de tiempo común a toda la extracción.
+
+    Las filas se agrupan en bloques de `size` para que `transform_data` convierta cada columna
+    numérica en bloque con `price_parser.parse_column` en lugar de valor a valor.
+
+    Args:
+        rows (iterable[list]): Filas crudas de los scrapers.
+        timestamp (datetime): Marca de tiempo del lote.
+        size (int, opcional): Filas por bloque. Por defecto `PIPELINE_BATCH_SIZE`.
+
+    Yields:
+        dict: Filas en el formato de `transform_data`.
+    """
+    chunk = []
+    for row in rows:
+        chunk.append(row)
+        if len(chunk) >= size:
+            yield from transform_data(chunk, timestamp)
+            chunk = []
+    if chunk:
+        yield from transform_data(chunk, timestamp)
+
+
+def batch_stage(rows, size):
+    """
+    Agrupa filas en lotes de como máximo `size` elementos.
+
+    Args:
+        rows (iterable[dict]): Filas transformadas.
+        size (int): Tamaño máximo del lote.
+
+    Yields:
+        list[dict]: Lotes de filas.
+    """
+    batch = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def load_stage(batches, sink):
+    """
+    Escribe cada lote con `sink` en cuanto está completo.
+
+    Args:
+        batches (iterable[list[dict]]): Lotes de filas.
+        sink (callable): Función que persiste un lote.
+
+    Yields:
+        list[dict]: Los lotes ya escritos.
+    """
+    for batch in batches:
+        sink(batch)
+        yield batch
+
+
+def run_pipeline(source, sink, batch_size=PIPELINE_BATCH_SIZE, timestamp=None):
+    """
+    Ejecuta extracción → transformación → carga como una cadena de generadores.
+
+    Las filas fluyen hacia `sink` en lotes de `batch_size` a medida que se extraen, por lo que
+    la memoria ocupada depende del tamaño de lote y no del número de monedas o páginas.
+
+    Args:
+        source (iterable[list]): Filas crudas (por ejemplo `extractor.iter_crypto_rows()`).
+        sink (callable): Función que persiste un lote de filas transformadas.
+        batch_size (int, opcional): Filas por lote. Por defecto `PIPELINE_BATCH_SIZE`.
+        timestamp (datetime, opcional): Marca de tiempo del lote. Por defecto la hora actual.
+
+    Returns:
+        dict: Filas y segundos por etapa ('extract', 'transform', 'batch', 'load').
+    """
+    stats = PipelineStats()
+    timestamp = timestamp or datetime.now()
+    rows = instrument('extract', source, stats)
+    rows = instrument('transform', transform_stage(rows, timestamp, batch_size), stats)
+    batches = instrument('batch', batch_stage(rows, batch_size), stats, weight=len)
+    for _ in instrument('load', load_stage(batches, sink), stats, weight=len):
+        pass
+
+    # Cada etapa incluye el tiempo de las anteriores; restamos para dejar solo el propio
+    stages = ['extract', 'transform', 'batch', 'load']
+    result = stats.as_dict()
+    for upstream, stage in zip(reversed(stages[:-1]), reversed(stages[1:])):
+        if stage in result and upstream in result:
+            result[stage]['seconds'] = max(0.0, result[stage]['seconds'] - result[upstream]['seconds'])
+    return result
@@ -0,0 +1,225 @@
+import threading
+import time
+from contextlib import contextmanager
+
+
+class PoolTimeoutError(Exception):
+    """Se lanza cuando no hay conexiones disponibles en el pool dentro del tiempo de espera."""
+
+
+def default_health_check(conn):
+    """
+    Comprueba si una conexión sigue viva antes de entregarla.
+
+    Usa `is_connected()` en conexiones de `mysql.connector` y, en otros drivers
+    (por ejemplo SQLite), ejecuta un `SELECT 1`.
+
+    Args:
+        conn: Conexión DB-API a comprobar.
+
+    Returns:
+        bool: True si la conexión puede utilizarse.
+    """
+    try:
+        if hasattr(conn, 'is_connected'):
+            return conn.is_connected()
+        cursor = conn.cursor()
+        try:
+            cursor.execute('SELECT 1')
+            cursor.fetchall()
+        finally:
+            cursor.close()
+        return True
+    except Exception:
+        return False
+
+
+class ConnectionPool:
+    """
+    Pool de conexiones a base de datos seguro entre hilos.
+
+    Las conexiones se crean bajo demanda mediante `factory` hasta un máximo de `size`.
+    Al devolverse al pool se guardan junto con la hora de su último uso; al pedirse
+    se descartan las que llevan más de `max_idle` segundos ociosas o no superan el
+    `health_check`.
+
+    El pool registra también las conexiones prestadas: `close` las cierra aunque no se hayan
+    devuelto, y las que se devuelven a un pool cerrado se cierran en lugar de guardarse.
+
+    Args:
+        factory (callable): Función sin argumentos que abre una conexión nueva.
+        size (int, opcional): Número máximo de conexiones abiertas. Por defecto es 5.
+        max_idle (float, opcional): Segundos que una conexión puede permanecer ociosa. Por defecto 300.
+        timeout (float, opcional): Segundos de espera máxima por una conexión libre. Por defecto 30.
+        health_check (callable, opcional): Función que recibe una conexión y devuelve si es utilizable.
+    """
+
+    def __init__(self, factory, size=5, max_idle=300, timeout=30, health_check=default_health_check):
+        self.factory = factory
+        self.size = size
+        self.max_idle = max_idle
+        self.timeout = timeout
+        self.health_check = health_check
+        self._idle = []  # Pila de (conexión, último uso)
+        self._checked_out = set()  # Conexiones prestadas y aún no devueltas
+        self._open = 0
+        self._closed = False
+        self._cond = threading.Condition()
+        self._stats = {
+            'checkouts': 0,
+            'waits': 0,
+            'creations': 0,
+            'evictions': 0,
+            'failed_health_checks': 0,
+        }
+
+    def _discard(self, conn):
+        try:
+            conn.close()
+        except Exception:
+            pass
+        with self._cond:
+            self._checked_out.discard(conn)
+            self._open -= 1
+            self._cond.notify()
+
+    def _lend(self, conn):
+        with self._cond:
+            self._checked_out.add(conn)
+        return conn
+
+    def acquire(self):
+        """
+        Obtiene una conexión del pool, creando una nueva si hay capacidad.
+
+        Returns:
+            Conexión DB-API lista para usarse.
+
+        Raises:
+            PoolTimeoutError: Si no se libera ninguna conexión dentro de `timeout` segundos.
+        """
+        deadline = time.monotonic() + self.timeout
+        with self._cond:
+            self._stats['checkouts'] += 1
+
+        while True:
+            conn = None
+            expired = False
+            with self._cond:
+                while True:
+                    if self._idle:
+                        conn, last_used = self._idle.pop()
+                        expired = time.monotonic() - last_used > self.max_idle
+                        break
+                    if self._open < self.size:
+                        # Reservamos el hueco antes de abrir la conexión fuera del lock
+                        self._open += 1
+                        self._stats['creations'] += 1
+                        break
+                    self._stats['waits'] += 1
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0 or not self._cond.wait(remaining):
+                        raise PoolTimeoutError(f"No hay conexiones libres tras {self.timeout} segundos")
+
+            if conn is None:
+                try:
+                    return self._lend(self.factory())
+                except Exception:
+                    with self._cond:
+                        self._open -= 1
+                        self._cond.notify()
+                    raise
+
+            if expired:
+                with self._cond:
+                    self._stats['evictions'] += 1
+                self._discard(conn)
+                continue
+
+            if self.health_check is None or self.health_check(conn):
+                return self._lend(conn)
+
+            with self._cond:
+                self._stats['failed_health_checks'] += 1
+            self._discard(conn)
+
+    def release(self, conn):
+        """
+        Devuelve una conexión al pool.
+
+        Args:
+            conn: Conexión obtenida previamente con `acquire`.
+        """
+        with self._cond:
+            if not self._closed:
+                self._checked_out.discard(conn)
+                self._idle.append((conn, time.monotonic()))
+                self._cond.notify()
+                return
+        self._discard(conn)
+
+    @contextmanager
+    def connection(self):
+        """
+        Context manager que entrega una conexión y la devuelve al pool al salir.
+
+        Si el bloque lanza una excepción, la conexión se cierra en lugar de reutilizarse,
+        ya que su estado (transacciones abiertas, cursores) puede ser inconsistente.
+
+        Yields:
+            Conexión DB-API.
+        """
+        conn = self.acquire()
+        try:
+            yield conn
+        except BaseException:
+            self._discard(conn)
+            raise
+        else:
+            self.release(conn)
+
+    def evict_idle(self):
+        """
+        Cierra las conexiones ociosas que superan `max_idle`.
+
+        Returns:
+            int: Número de conexiones cerradas.
+        """
+        now = time.monotonic()
+        with self._cond:
+            expired = [conn for conn, last_used in self._idle if now - last_used > self.max_idle]
+            self._idle = [(conn, last_used) for conn, last_used in self._idle if now - last_used <= self.max_idle]
+            self._stats['evictions'] += len(expired)
+        for conn in expired:
+            self._discard(conn)
+        return len(expired)
+
+    def close(self):
+        """Cierra todas las conexiones del pool, también las prestadas que no se han devuelto."""
+        with self._cond:
+            self._closed = True
+            idle, self._idle = self._idle, []
+            checked_out = list(self._checked_out)
+        for conn, _ in idle:
+            self._discard(conn)
+        # Siguen contando como abiertas hasta que se devuelvan (si se devuelven) y se descarten
+        for conn in checked_out:
+            try:
+                conn.close()
+            except Exception:
+                pass
+
+    def stats(self):
+        """
+        Devuelve las estadísticas de uso del pool.
+
+        Returns:
+            dict: Contadores 'checkouts', 'waits', 'creations', 'evictions' y 'failed_health_checks',
+                junto con el número de conexiones 'open' e 'idle' en el momento de la llamada.
+        """
+        with self._cond:
+            stats = dict(self._stats)
+            stats['open'] = self._open
+            stats['idle'] = len(self._idle)
+            stats['size'] = self.size
+        return stats
@@ -0,0 +1,137 @@
+import os
+import threading
+from collections import OrderedDict, deque
+
+PRICE_CACHE_CAPACITY = int(os.environ.get('PRICE_CACHE_CAPACITY', 100))
+PRICE_CACHE_MAX_COINS = int(os.environ.get('PRICE_CACHE_MAX_COINS', 5000))
+
+
+class PriceCache:
+    """
+    Caché en memoria con un buffer circular de precios por criptomoneda.
+
+    Cada moneda guarda como máximo `capacity` pares (timestamp, precio) en un `deque` con
+    `maxlen`, y se conservan como máximo `max_coins` monedas (se descarta la actualizada hace
+    más tiempo), de modo que la memoria ocupada está acotada por `capacity * max_coins`.
+
+    Los precios se normalizan a `float` para que las lecturas de la base de datos (`Decimal`)
+    y las del proceso de ingesta puedan mezclarse en los cálculos.
+
+    Args:
+        capacity (int, opcional): Precios históricos por moneda. Por defecto `PRICE_CACHE_CAPACITY`.
+        max_coins (int, opcional): Número máximo de monedas. Por defecto `PRICE_CACHE_MAX_COINS`.
+    """
+
+    def __init__(self, capacity=PRICE_CACHE_CAPACITY, max_coins=PRICE_CACHE_MAX_COINS):
+        self.capacity = capacity
+        self.max_coins = max_coins
+        self._history = OrderedDict()  # name -> deque[(timestamp, price)], del más antiguo al más reciente
+        self._latest = {}  # name -> precio actual de `crypto_prices`
+        self._lock = threading.Lock()
+        self._warm = False
+
+    @property
+    def is_warm(self):
+        """bool: True si la caché ya se cargó desde la base de datos."""
+        return self._warm
+
+    def _ring(self, name):
+        ring = self._history.get(name)
+        if ring is None:
+            ring = self._history[name] = deque(maxlen=self.capacity)
+            while len(self._history) > self.max_coins:
+                evicted, _ = self._history.popitem(last=False)
+                self._latest.pop(evicted, None)
+        else:
+            self._history.move_to_end(name)
+        return ring
+
+    def warm(self, crypto_data):
+        """
+        Carga la caché con datos leídos de la base de datos, reemplazando el contenido actual.
+
+        Args:
+            crypto_data (list[dict]): Datos en el formato de `get_crypto_data_with_history`.
+        """
+        with self._lock:
+            self._history.clear()
+            self._latest.clear()
+            for data in crypto_data:
+                ring = self._ring(data['name'])
+                self._latest[data['name']] = float(data['actual_price'])
+                # La consulta devuelve el histórico del más reciente al más antiguo
+                for entry in reversed(data['history'][:self.capacity]):
+                    ring.append((entry['timestamp'], float(entry['price'])))
+            self._warm = True
+
+    def record(self, crypto_data):
+        """
+        Registra las filas de una extracción recién escrita.
+
+        Args:
+            crypto_data (list[dict]): Filas con 'name', 'actual_price' y 'timestamp',
+                en el formato devuelto por `transform_data`.
+        """
+        with self._lock:
+            for data in crypto_data:
+                if data['actual_price'] is None:
+                    continue
+                self._ring(data['name']).append((data['timestamp'], float(data['actual_price'])))
+                self._latest[data['name']] = float(data['actual_price'])
+
+    def get_history(self, name, limit=100):
+        """
+        Devuelve los precios más recientes de una criptomoneda.
+
+        Args:
+            name (str): Nombre de la criptomoneda.
+            limit (int, opcional): Número máximo de precios. Por defecto es 100.
+
+        Returns:
+            list[dict]: Lista con 'price' y 'timestamp', del más reciente al más antiguo,
+                con el mismo formato que `get_historical_prices`.
+        """
+        with self._lock:
+            ring = self._history.get(name)
+            if not ring:
+                return []
+            entries = list(ring)[-limit:] if limit < len(ring) else list(ring)
+        return [{'price': price, 'timestamp': timestamp} for timestamp, price in reversed(entries)]
+
+    def snapshot(self, limit=100):
+        """
+        Devuelve el precio actual y el histórico reciente de todas las criptomonedas.
+
+        Args:
+            limit (int, opcional): Número máximo de precios históricos por moneda. Por defecto es 100.
+
+        Returns:
+            list[dict]: Lista ordenada por nombre con 'name', 'actual_price' y 'history',
+                con el mismo formato que `get_crypto_data_with_history`.
+        """
+        with self._lock:
+            names = sorted(self._latest)
+        return [{
+            'name': name,
+            'actual_price': self._latest.get(name),
+            'history': self.get_history(name, limit)
+        } for name in names if self._latest.get(name) is not None]
+
+    def last_updated(self):
+        """
+        Returns:
+            datetime | None: Timestamp del precio más reciente de la caché.
+        """
+        with self._lock:
+            timestamps = [ring[-1][0] for ring in self._history.values() if ring]
+        return max(timestamps) if timestamps else None
+
+    def clear(self):
+        """Vacía la caché y la marca como no cargada."""
+        with self._lock:
+            self._history.clear()
+            self._latest.clear()
+            self._warm = False
+
+
+price_cache = PriceCache()
@@ -0,0 +1,228 @@
+import re
+from collections import namedtuple
+
+import numpy as np
+
+DEFAULT_LOCALE = 'es'
+
+# Sufijos de magnitud usados en las columnas de capitalización y volumen
+SUFFIXES = {
+    'K': 1e3,
+    'M': 1e6,
+    'B': 1e9,
+    'T': 1e12,
+}
+_SIGNS = {'+': 1.0, '-': -1.0, '−': -1.0}
+_STRIP_THOUSANDS = {',': str.maketrans('', '', '.'), '.': str.maketrans('', '', ',')}
+
+# Camino rápido para el formato más habitual de la tabla: '67.890,12', '0,000012', '15'
+_FAST_PATH = {
+    'es': (re.compile(r'(?!0\.)\d{1,3}(?:\.\d{3})*(?:,\d+)?|0,\d+'), str.maketrans({'.': None, ',': '.'})),
+    'en': (re.compile(r'\d{1,3}(?:,\d{3})*(?:\.\d+)?|0\.\d+'), str.maketrans({',': None})),
+}
+
+# Separadores de miles y decimal del formato que `parse_column` convierte en bloque
+_COLUMN_SEPARATORS = {'es': (b'.', b','), 'en': (b',', b'.')}
+
+ParsedColumn = namedtuple('ParsedColumn', ['values', 'errors'])
+
+
+class PriceParseError(ValueError):
+    """Se lanza cuando una cadena no puede interpretarse como número."""
+
+
+def _decimal_separator(text, locale):
+    """Decide qué separador es el decimal en una cadena sin signo ni sufijo."""
+    dots = text.count('.')
+    commas = text.count(',')
+    if dots and commas:
+        # Con ambos separadores, el decimal es el último que aparece
+        return ',' if text.rfind(',') > text.rfind('.') else '.'
+    if commas:
+        if commas > 1:
+            return '.'
+        if locale == 'es':
+            return ','
+        # En inglés una coma seguida de exactamente tres dígitos es separador de miles
+        return '.' if len(text) - text.find(',') - 1 == 3 else ','
+    if dots:
+        if dots > 1:
+            return ','
+        if locale == 'es':
+            # '1.234' es mil doscientos treinta y cuatro; '0.5' y '1.23' son decimales
+            return ',' if len(text) - text.find('.') - 1 == 3 and not text.startswith('0.') else '.'
+        return '.'
+    return '.'
+
+
+def parse_number(text, locale=DEFAULT_LOCALE):
+    """
+    Convierte una cadena numérica de investing.com en `float`.
+
+    Admite los formatos español ('1.234,56', '0,000012') e inglés ('1,234.56'), signo
+    ('+1,2', '-0,5'), sufijos de magnitud ('1,23B', '45,6M', '12K') y porcentajes
+    ('+1,23%' → 1.23). Cuando un único separador es ambiguo se resuelve según `locale`.
+
+    Args:
+        text (str): Cadena a convertir.
+        locale (str, opcional): 'es' o 'en'. Por defecto 'es'.
+
+    Returns:
+        float: Valor numérico.
+
+    Raises:
+        PriceParseError: Si la cadena está vacía o no es un número válido.
+    """
+    fast = _FAST_PATH.get(locale)
+    if fast is not None and text and fast[0].fullmatch(text):
+        return float(text.translate(fast[1]))
+
+    if text is None:
+        raise PriceParseError("Valor vacío")
+    s = text.strip().replace('\xa0', '').replace(' ', '')
+    if s.endswith('%'):
+        s = s[:-1]
+    if not s:
+        raise PriceParseError(f"Valor vacío: {text!r}")
+
+    sign = _SIGNS.get(s[0])
+    if sign is not None:
+        s = s[1:]
+    else:
+        sign = 1.0
+
+    multiplier = SUFFIXES.get(s[-1:].upper()) if s else None
+    if multiplier is not None:
+        s = s[:-1]
+    else:
+        multiplier = 1.0
+
+    decimal = _decimal_separator(s, locale)
+    s = s.translate(_STRIP_THOUSANDS[decimal])
+    if decimal == ',':
+        s = s.replace(',', '.')
+    try:
+        return sign * float(s) * multiplier
+    except ValueError:
+        raise PriceParseError(f"Número no válido: {text!r}") from None
+
+
+def _unsafe_lines(data, count, locale):
+    """
+    Localiza las líneas de una columna unida con '\\n' que no están en el formato habitual.
+
+    Una línea es segura si solo tiene dígitos y separadores, al menos un dígito, cada
+    separador de miles va seguido de exactamente tres dígitos y no hay ningún separador tras
+    el decimal. En español '0.xxx' no es segura porque `parse_number` la lee como decimal.
+
+    Args:
+        data (bytes): Columna unida y codificada.
+        count (int): Número de líneas.
+        locale (str): 'es' o 'en'.
+
+    Returns:
+        np.ndarray: Índices de las líneas no seguras.
+    """
+    thousands_sep, decimal_sep = _COLUMN_SEPARATORS[locale]
+    chars = np.frombuffer(data, dtype=np.uint8)
+    digit = (chars >= ord('0')) & (chars <= ord('9'))
+    thousands = chars == thousands_sep[0]
+    decimal = chars == decimal_sep[0]
+    newline = chars == ord('\n')
+    # Fin de cada línea: `searchsorted(ends, p)` es la línea de la posición p
+    ends = np.append(np.flatnonzero(newline), len(chars))
+
+    unsafe = [np.flatnonzero(~(digit | newline | thousands | decimal))]
+    padded = np.concatenate([digit, np.zeros(4, dtype=bool)])
+    at = np.flatnonzero(thousands)
+    unsafe.append(at[~(padded[at + 1] & padded[at + 2] & padded[at + 3] & ~padded[at + 4])])
+    # Un separador tras el decimal: basta con mirar el separador siguiente al decimal en la misma línea
+    at = np.flatnonzero(thousands | decimal)
+    same_line = np.searchsorted(ends, at[:-1]) == np.searchsorted(ends, at[1:])
+    unsafe.append(at[1:][decimal[at[:-1]] & same_line])
+    if locale == 'es':
+        at = np.append(0, ends[:-1] + 1)
+        at = at[at + 1 < len(chars)]
+        unsafe.append(at[(chars[at] == ord('0')) & (chars[at + 1] == ord('.'))])
+    digits_before = np.searchsorted(np.flatnonzero(digit), ends)
+    digitless = np.flatnonzero(np.diff(digits_before, prepend=0) == 0)
+    return np.union1d(np.searchsorted(ends, np.concatenate(unsafe)), digitless)
+
+
+def _vector_parse(values, locale):
+    """
+    Convierte en bloque los valores en el formato más habitual de la tabla.
+
+    La columna se une en una sola cadena, `_unsafe_lines` localiza con operaciones de NumPy
+    las líneas que no se pueden convertir quitando el separador de miles y normalizando el
+    decimal, y el resto se convierte con un único reemplazo sobre la cadena y
+    `np.array(..., dtype=float64)`.
+
+    Returns:
+        tuple[np.ndarray, list[int]] | None: Valores (NaN en las posiciones pendientes) e índices
+            que deben convertirse uno a uno, o None si la columna no admite el camino vectorizado.
+    """
+    try:
+        joined = '\n'.join(values)
+    except TypeError:  # None u otros tipos: camino general
+        return None
+    if joined.count('\n') != len(values) - 1:  # algún valor contiene saltos de línea
+        return None
+    pending = _unsafe_lines(joined.encode(), len(values), locale)
+    thousands_sep, decimal_sep = _COLUMN_SEPARATORS[locale]
+    joined = joined.replace(thousands_sep.decode(), '')
+    if decimal_sep != b'.':
+        joined = joined.replace(decimal_sep.decode(), '.')
+    lines = joined.split('\n')
+    out = np.full(len(values), np.nan)
+    try:
+        if not len(pending):
+            out[:] = np.array(lines, dtype=np.float64)
+            return out, []
+        clean = np.ones(len(values), dtype=bool)
+        clean[pending] = False
+        out[clean] = np.array([line for line, ok in zip(lines, clean.tolist()) if ok], dtype=np.float64)
+    except ValueError:
+        return None
+    return out, pending.tolist()
+
+
+def parse_column(values, locale=DEFAULT_LOCALE):
+    """
+    Convierte una columna completa de cadenas en un buffer `float64` de NumPy.
+
+    Los valores en el formato habitual de la tabla ('67.890,12') se convierten en bloque con
+    `_vector_parse`; el resto (signos, sufijos, porcentajes, separadores ambiguos) pasa por
+    `parse_number` uno a uno, memorizando los repetidos. Los valores que no se pueden convertir
+    quedan como NaN y se informan en `errors` en lugar de descartarse en silencio.
+
+    Args:
+        values (iterable[str]): Cadenas de la columna.
+        locale (str, opcional): 'es' o 'en'. Por defecto 'es'.
+
+    Returns:
+        ParsedColumn: Tupla con `values` (np.ndarray float64) y `errors`, una lista de
+            pares (índice, cadena original) de los valores no convertidos.
+    """
+    values = list(values)
+    vectorized = _vector_parse(values, locale) if values and locale in _COLUMN_SEPARATORS else None
+    if vectorized is not None:
+        out, pending = vectorized
+    else:
+        out, pending = np.empty(len(values), dtype=np.float64), range(len(values))
+    errors = []
+    cache = {}
+    for i in pending:
+        text = values[i]
+        parsed = cache.get(text)
+        if parsed is None:
+            try:
+                parsed = parse_number(text, locale)
+            except PriceParseError:
+                parsed = np.nan
+                errors.append((i, text))
+            cache[text] = parsed
+        elif parsed != parsed:  # NaN cacheado: también es un error
+            errors.append((i, text))
+        out[i] = parsed
+    return ParsedColumn(out, errors)
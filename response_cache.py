@@ -0,0 +1,286 @@
+import argparse
+import functools
+import gzip
+import hashlib
+import os
+import threading
+import time
+from collections import OrderedDict
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+RESPONSE_CACHE_ENABLED = os.environ.get('RESPONSE_CACHE_ENABLED', '1') != '0'
+RESPONSE_CACHE_MAX_ENTRIES = int(os.environ.get('RESPONSE_CACHE_MAX_ENTRIES', 1000))
+RESPONSE_CACHE_MAX_AGE = int(os.environ.get('RESPONSE_CACHE_MAX_AGE', 5))  # segundos
+# Las respuestas más pequeñas no compensan el coste de comprimirlas
+RESPONSE_COMPRESS_MIN_SIZE = int(os.environ.get('RESPONSE_COMPRESS_MIN_SIZE', 512))
+
+
+class CachedResponse:
+    """
+    Cuerpo serializado de una respuesta, con su ETag y sus versiones comprimidas.
+
+    Las versiones gzip y brotli se calculan la primera vez que un cliente las pide y se
+    reutilizan en las peticiones siguientes. Cada codificación tiene su propio ETag fuerte,
+    derivado del hash del cuerpo sin comprimir.
+
+    Args:
+        body (bytes): Cuerpo de la respuesta.
+        mimetype (str): Tipo MIME de la respuesta.
+    """
+
+    def __init__(self, body, mimetype):
+        self.body = body
+        self.mimetype = mimetype
+        self.digest = hashlib.blake2b(body, digest_size=16).hexdigest()
+        self._encoded = {}
+        self._lock = threading.Lock()
+
+    def etag(self, encoding=None):
+        """
+        Args:
+            encoding (str, opcional): 'gzip', 'br' o None para el cuerpo sin comprimir.
+
+        Returns:
+            str: ETag fuerte (sin comillas) de la codificación.
+        """
+        return f"{self.digest}-{encoding}" if encoding else self.digest
+
+    def encoded(self, encoding):
+        """
+        Devuelve el cuerpo en la codificación pedida, comprimiéndolo solo la primera vez.
+
+        Args:
+            encoding (str): 'gzip' o 'br'.
+
+        Returns:
+            bytes: Cuerpo comprimido.
+        """
+        body = self._encoded.get(encoding)
+        if body is None:
+            with self._lock:
+                body = self._encoded.get(encoding)
+                if body is None:
+                    if encoding == 'br':
+                        body = brotli.compress(self.body, quality=5)
+                    else:
+                        body = gzip.compress(self.body, compresslevel=6)
+                    self._encoded[encoding] = body
+        return body
+
+
+def available_encodings(size):
+    """
+    Args:
+        size (int): Tamaño del cuerpo sin comprimir.
+
+    Returns:
+        list[str]: Codificaciones que pueden ofrecerse, por orden de preferencia.
+    """
+    if size < RESPONSE_COMPRESS_MIN_SIZE:
+        return []
+    return ['br', 'gzip'] if brotli is not None else ['gzip']
+
+
+class ResponseCache:
+    """
+    Caché de respuestas de la API con ETags fuertes, `304 Not Modified` y compresión.
+
+    Las respuestas se indexan por endpoint, argumentos de la ruta, parámetros de la petición
+    y generación de ingesta. La generación se incrementa con `invalidate()` cada vez que una
+    extracción se confirma, de modo que las respuestas solo se reconstruyen cuando los datos
+    cambian. Se conservan como máximo `max_entries` respuestas (LRU).
+
+    Args:
+        max_entries (int, opcional): Respuestas en caché. Por defecto `RESPONSE_CACHE_MAX_ENTRIES`.
+        max_age (int, opcional): Segundos de `Cache-Control: max-age`. Por defecto `RESPONSE_CACHE_MAX_AGE`.
+        enabled (bool, opcional): Si es False las vistas se ejecutan siempre. Por defecto `RESPONSE_CACHE_ENABLED`.
+    """
+
+    def __init__(self, max_entries=RESPONSE_CACHE_MAX_ENTRIES, max_age=RESPONSE_CACHE_MAX_AGE,
+                 enabled=RESPONSE_CACHE_ENABLED):
+        self.max_entries = max_entries
+        self.max_age = max_age
+        self.enabled = enabled
+        self.generation = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._stats = {'hits': 0, 'misses': 0, 'not_modified': 0, 'invalidations': 0}
+
+    def invalidate(self):
+        """Pasa a una nueva generación de datos y descarta las respuestas anteriores."""
+        with self._lock:
+            self.generation += 1
+            self._entries.clear()
+            self._stats['invalidations'] += 1
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                self._stats['hits'] += 1
+            else:
+                self._stats['misses'] += 1
+            return entry
+
+    def put(self, key, entry):
+        with self._lock:
+            if key[-1] != self.generation:
+                return  # Se construyó con datos de una generación ya invalidada
+            self._entries[key] = entry
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def stats(self):
+        """
+        Returns:
+            dict: Aciertos, fallos, respuestas 304, invalidaciones, generación y entradas.
+        """
+        with self._lock:
+            return dict(self._stats, generation=self.generation, entries=len(self._entries))
+
+    def respond(self, entry, max_age=None):
+        """
+        Construye la respuesta HTTP de una entrada para la petición actual.
+
+        Elige la codificación según `Accept-Encoding` y devuelve `304 Not Modified` si el
+        cliente ya tiene esa versión (`If-None-Match`).
+
+        Args:
+            entry (CachedResponse): Respuesta en caché.
+            max_age (int, opcional): Segundos de `Cache-Control`. Por defecto `self.max_age`.
+
+        Returns:
+            Response: Respuesta de Flask.
+        """
+        from flask import Response, request
+
+        encodings = available_encodings(len(entry.body))
+        encoding = request.accept_encodings.best_match(encodings) if encodings else None
+        etag = entry.etag(encoding)
+        headers = {
+            'Cache-Control': f"public, max-age={self.max_age if max_age is None else max_age}",
+            'Vary': 'Accept-Encoding',
+        }
+
+        if request.if_none_match.contains(etag):
+            with self._lock:
+                self._stats['not_modified'] += 1
+            response = Response(status=304, headers=headers)
+        else:
+            if encoding:
+                headers['Content-Encoding'] = encoding
+            response = Response(entry.encoded(encoding) if encoding else entry.body,
+                                mimetype=entry.mimetype, headers=headers)
+        response.set_etag(etag)
+        return response
+
+    def cached(self, max_age=None, refresh=None):
+        """
+        Decorador de vistas de Flask que sirve sus respuestas desde la caché.
+
+        Solo se guardan las respuestas 200; los errores se devuelven tal cual.
+
+        Args:
+            max_age (int, opcional): Segundos de `Cache-Control`. Por defecto `self.max_age`.
+            refresh (callable, opcional): Se llama antes de calcular la clave, para que pueda
+                actualizar los datos (e invalidar la caché) antes de buscar la respuesta.
+
+        Returns:
+            callable: Decorador.
+        """
+        def decorator(view):
+            @functools.wraps(view)
+            def wrapper(*args, **kwargs):
+                from flask import make_response, request
+
+                if refresh is not None:
+                    refresh()
+                if not self.enabled:
+                    return view(*args, **kwargs)
+
+                key = (
+                    request.endpoint,
+                    tuple(sorted(kwargs.items())),
+                    tuple(sorted(request.args.items(multi=True))),
+                    self.generation,
+                )
+                entry = self.get(key)
+                if entry is None:
+                    response = make_response(view(*args, **kwargs))
+                    if response.status_code != 200 or response.direct_passthrough:
+                        return response
+                    entry = CachedResponse(response.get_data(), response.mimetype)
+                    self.put(key, entry)
+                return self.respond(entry, max_age)
+            return wrapper
+        return decorator
+
+
+response_cache = ResponseCache()
+
+
+def run_load_test(client, url, requests, headers=None):
+    """
+    Lanza `requests` peticiones GET secuenciales con el cliente de pruebas de Flask.
+
+    Args:
+        client: Cliente de `app.test_client()`.
+        url (str): URL a pedir.
+        requests (int): Número de peticiones.
+        headers (dict, opcional): Cabeceras de cada petición.
+
+    Returns:
+        dict: Peticiones por segundo, bytes de la última respuesta y su código de estado.
+    """
+    start = time.perf_counter()
+    for _ in range(requests):
+        response = client.get(url, headers=headers or {})
+    elapsed = time.perf_counter() - start
+    return {
+        'rps': round(requests / elapsed, 1),
+        'bytes': len(response.get_data()),
+        'status': response.status_code,
+    }
+
+
+if __name__ == '__main__':
+    """
+    Prueba de carga de la API con y sin caché de respuestas, sin base de datos:
+
+        python response_cache.py --coins 500 --requests 2000
+    """
+    from datetime import datetime, timedelta
+
+    parser = argparse.ArgumentParser(description="Peticiones por segundo de /api/crypto con y sin caché")
+    parser.add_argument('--coins', type=int, default=500)
+    parser.add_argument('--requests', type=int, default=2000)
+    args = parser.parse_args()
+
+    # Se usa la instancia del módulo importado por `app`, no la de este script
+    from app import app, price_cache, response_cache, rolling_metrics
+
+    now = datetime.now()
+    crypto_data = [{
+        'name': f"Coin{i}",
+        'actual_price': 100.0 + i,
+        'history': [{'price': 100.0 + i + j % 7, 'timestamp': now - timedelta(minutes=j)} for j in range(60)],
+    } for i in range(args.coins)]
+    price_cache.warm(crypto_data)
+    rolling_metrics.warm(price_cache.snapshot(limit=price_cache.capacity))
+
+    client = app.test_client()
+    url = '/api/crypto'
+    response_cache.enabled = False
+    print("sin caché:", run_load_test(client, url, args.requests))
+    response_cache.enabled = True
+    print("con caché:", run_load_test(client, url, args.requests))
+    print("con caché + gzip:", run_load_test(client, url, args.requests, {'Accept-Encoding': 'gzip'}))
+    etag = client.get(url, headers={'Accept-Encoding': 'gzip'}).headers['ETag']
+    print("con caché + 304:", run_load_test(client, url, args.requests,
+                                             {'Accept-Encoding': 'gzip', 'If-None-Match': etag}))
+    print(response_cache.stats())
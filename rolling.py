@@ -0,0 +1,301 @@
+import os
+import threading
+from collections import OrderedDict, deque
+from datetime import datetime
+from decimal import Decimal
+
+WINDOW_SPANS = {
+    '1h': 3600,
+    '24h': 24 * 3600,
+    '7d': 7 * 24 * 3600,
+}
+# Ventanas que se mantienen, separadas por comas (p. ej. '1h,24h'). Cada una guarda todos los
+# precios que abarca, así que '7d' multiplica la memoria por moneda; la API solo lee '1h'
+ROLLING_WINDOWS = os.environ.get('ROLLING_WINDOWS', '1h')
+ROLLING_MAX_COINS = int(os.environ.get('ROLLING_MAX_COINS', 5000))
+
+
+def parse_windows(value):
+    """
+    Convierte una lista de ventanas separadas por comas en el formato de `RollingMetrics`.
+
+    La ventana '1h' se añade siempre, ya que es la que usa `as_calculate_metrics`.
+
+    Args:
+        value (str): Nombres de `WINDOW_SPANS` separados por comas.
+
+    Returns:
+        dict: Nombre de ventana -> duración en segundos.
+
+    Raises:
+        ValueError: Si alguna ventana no está en `WINDOW_SPANS`.
+    """
+    labels = [label.strip() for label in value.split(',') if label.strip()]
+    unknown = [label for label in labels if label not in WINDOW_SPANS]
+    if unknown:
+        raise ValueError(f"Ventanas desconocidas: {', '.join(unknown)} (disponibles: {', '.join(WINDOW_SPANS)})")
+    return {label: WINDOW_SPANS[label] for label in ['1h'] + labels}
+
+
+WINDOWS = parse_windows(ROLLING_WINDOWS)
+
+
+class RollingWindow:
+    """
+    Máximo, mínimo y promedio de los precios de una ventana temporal deslizante.
+
+    Mantiene dos deques monótonas (decreciente para el máximo, creciente para el mínimo)
+    y una suma acumulada, de modo que cada nuevo precio y cada expulsión cuestan O(1)
+    amortizado. Los precios deben llegar en orden cronológico.
+
+    La suma se lleva en `Decimal` si los precios son `Decimal` (exacta) y, con `float`,
+    con compensación de Neumaier para que las altas y bajas no acumulen error.
+
+    Args:
+        span (float): Duración de la ventana en segundos.
+    """
+
+    def __init__(self, span):
+        self.span = span
+        self._ticks = deque()  # (seq, timestamp, price)
+        self._max = deque()  # (seq, price), precios decrecientes
+        self._min = deque()  # (seq, price), precios crecientes
+        self._seq = 0
+        self._sum = 0
+        self._comp = 0.0
+
+    def __len__(self):
+        return len(self._ticks)
+
+    def _add_to_sum(self, value):
+        if isinstance(value, Decimal) or isinstance(self._sum, Decimal):
+            self._sum += value
+            return
+        total = self._sum + value
+        if abs(self._sum) >= abs(value):
+            self._comp += (self._sum - total) + value
+        else:
+            self._comp += (value - total) + self._sum
+        self._sum = total
+
+    def push(self, timestamp, price):
+        """
+        Añade un precio a la ventana.
+
+        Args:
+            timestamp (datetime): Momento del precio.
+            price (float | Decimal): Precio.
+        """
+        seq = self._seq
+        self._seq += 1
+        self._ticks.append((seq, timestamp, price))
+        while self._max and self._max[-1][1] <= price:
+            self._max.pop()
+        self._max.append((seq, price))
+        while self._min and self._min[-1][1] >= price:
+            self._min.pop()
+        self._min.append((seq, price))
+        self._add_to_sum(price)
+
+    def evict(self, now):
+        """
+        Expulsa los precios más antiguos que `span` segundos respecto a `now`.
+
+        Args:
+            now (datetime): Momento de referencia.
+        """
+        ticks = self._ticks
+        while ticks and (now - ticks[0][1]).total_seconds() > self.span:
+            seq, _, price = ticks.popleft()
+            if self._max[0][0] == seq:
+                self._max.popleft()
+            if self._min[0][0] == seq:
+                self._min.popleft()
+            self._add_to_sum(-price)
+        if not ticks:
+            # Sin elementos la suma es exactamente cero: descartamos cualquier residuo
+            self._sum = 0
+            self._comp = 0.0
+
+    def stats(self):
+        """
+        Returns:
+            dict: 'highest', 'lowest', 'avg' (redondeado a 4 decimales) y 'count' de la ventana.
+                Los tres primeros son None si la ventana está vacía.
+        """
+        count = len(self._ticks)
+        if not count:
+            return {'highest': None, 'lowest': None, 'avg': None, 'count': 0}
+        total = self._sum if isinstance(self._sum, Decimal) else self._sum + self._comp
+        return {
+            'highest': self._max[0][1],
+            'lowest': self._min[0][1],
+            'avg': round(total / count, 4),
+            'count': count,
+        }
+
+
+class RollingMetrics:
+    """
+    Motor de métricas por criptomoneda sobre ventanas temporales deslizantes (`ROLLING_WINDOWS`, por defecto 1h).
+
+    Sustituye a `signals.calculate_metrics`: en lugar de recorrer todo el histórico en cada
+    petición, cada precio nuevo actualiza las ventanas en O(1) amortizado y las consultas
+    solo expulsan los precios que han salido de la ventana.
+
+    La memoria está acotada: una moneda sin precios en la ventana más larga se descarta en
+    cada `update_many`, y se conservan como máximo `max_coins` monedas (se descarta la
+    actualizada hace más tiempo), igual que en `price_cache.PriceCache`.
+
+    Args:
+        windows (dict, opcional): Nombre de ventana -> duración en segundos. Por defecto `WINDOWS`.
+        max_coins (int, opcional): Número máximo de monedas. Por defecto `ROLLING_MAX_COINS`.
+    """
+
+    def __init__(self, windows=None, max_coins=ROLLING_MAX_COINS):
+        self.windows = dict(windows or WINDOWS)
+        self.max_coins = max_coins
+        self._coins = OrderedDict()  # name -> {ventana: RollingWindow}
+        self._last = {}  # name -> timestamp del último precio registrado
+        self._lock = threading.Lock()
+        self._warm = False
+
+    @property
+    def span(self):
+        """float: Duración en segundos de la ventana más larga."""
+        return max(self.windows.values())
+
+    @property
+    def is_warm(self):
+        """bool: True si el motor ya se cargó con `warm`."""
+        return self._warm
+
+    def _coin(self, name):
+        coin = self._coins.get(name)
+        if coin is None:
+            coin = self._coins[name] = {key: RollingWindow(span) for key, span in self.windows.items()}
+            while len(self._coins) > self.max_coins:
+                evicted, _ = self._coins.popitem(last=False)
+                self._last.pop(evicted, None)
+        else:
+            self._coins.move_to_end(name)
+        return coin
+
+    def update(self, name, price, timestamp):
+        """
+        Registra un nuevo precio de una criptomoneda en todas sus ventanas.
+
+        Los precios no posteriores al último registrado de la moneda se ignoran, de modo que
+        el mismo histórico puede aplicarse varias veces (ver `merge`).
+
+        Args:
+            name (str): Nombre de la criptomoneda.
+            price (float | Decimal): Precio.
+            timestamp (datetime): Momento del precio.
+        """
+        if price is None:
+            return
+        with self._lock:
+            last = self._last.get(name)
+            if last is not None and timestamp <= last:
+                return
+            self._last[name] = timestamp
+            for window in self._coin(name).values():
+                window.push(timestamp, price)
+                window.evict(timestamp)
+
+    def update_many(self, crypto_data):
+        """
+        Registra las filas de una extracción y descarta las monedas que ya no reciben precios.
+
+        Args:
+            crypto_data (list[dict]): Filas con 'name', 'actual_price' y 'timestamp',
+                en el formato devuelto por `transform_data`.
+        """
+        for data in crypto_data:
+            self.update(data['name'], data['actual_price'], data['timestamp'])
+        if crypto_data:
+            self.prune(max(data['timestamp'] for data in crypto_data))
+
+    def prune(self, now):
+        """
+        Descarta las monedas cuyo último precio ha salido de la ventana más larga.
+
+        Args:
+            now (datetime): Momento de referencia.
+        """
+        span = self.span
+        with self._lock:
+            for name in [name for name, last in self._last.items() if (now - last).total_seconds() > span]:
+                del self._last[name]
+                self._coins.pop(name, None)
+
+    def warm(self, crypto_data):
+        """
+        Reinicia el motor con el histórico leído de la base de datos o de la caché.
+
+        Para que las métricas sean correctas desde el arranque, el histórico debe cubrir la
+        ventana más larga (ver `database.get_window_history`), no un número fijo de precios.
+
+        Args:
+            crypto_data (list[dict]): Datos en el formato de `get_crypto_data_with_history`
+                (histórico del más reciente al más antiguo).
+        """
+        with self._lock:
+            self._coins.clear()
+            self._last.clear()
+        self.merge(crypto_data)
+        self._warm = True
+
+    def merge(self, crypto_data):
+        """
+        Registra los precios de un histórico posteriores a los ya registrados de cada moneda.
+
+        Sirve para seguir un histórico que se recarga completo (la caché publicada por otro
+        proceso) sin reiniciar las ventanas, que pueden cubrir más precios que esa caché.
+
+        Args:
+            crypto_data (list[dict]): Datos en el formato de `get_crypto_data_with_history`
+                (histórico del más reciente al más antiguo).
+        """
+        for data in crypto_data:
+            for entry in reversed(data['history']):
+                self.update(data['name'], entry['price'], entry['timestamp'])
+
+    def get(self, name, window='1h', now=None):
+        """
+        Devuelve las métricas de una criptomoneda en una ventana.
+
+        Args:
+            name (str): Nombre de la criptomoneda.
+            window (str, opcional): Nombre de la ventana. Por defecto '1h'.
+            now (datetime, opcional): Momento de referencia. Por defecto la hora actual.
+
+        Returns:
+            dict: 'highest', 'lowest', 'avg' y 'count'.
+        """
+        now = now or datetime.now()
+        with self._lock:
+            coin = self._coins.get(name)
+            if coin is None:
+                return {'highest': None, 'lowest': None, 'avg': None, 'count': 0}
+            rolling = coin[window]
+            rolling.evict(now)
+            return rolling.stats()
+
+    def as_calculate_metrics(self, name, now=None):
+        """
+        Devuelve las métricas de la última hora con las claves de `signals.calculate_metrics`.
+
+        Args:
+            name (str): Nombre de la criptomoneda.
+            now (datetime, opcional): Momento de referencia. Por defecto la hora actual.
+
+        Returns:
+            dict: 'highest_1h', 'lower_1h' y 'avg_price'.
+        """
+        stats = self.get(name, '1h', now)
+        return {'highest_1h': stats['highest'], 'lower_1h': stats['lowest'], 'avg_price': stats['avg']}
+
+
+rolling_metrics = RollingMetrics()
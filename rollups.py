@@ -0,0 +1,220 @@
+import argparse
+from datetime import datetime, timedelta
+
+# Nombre de la resolución -> duración del intervalo en segundos, de la más fina a la más gruesa
+RESOLUTIONS = {
+    '1m': 60,
+    '5m': 300,
+    '1h': 3600,
+    '1d': 86400,
+}
+EPOCH = datetime(1970, 1, 1)
+
+UPSERT_SQL = '''
+    INSERT INTO price_rollups
+        (name, resolution, bucket_start, open, high, low, close, count)
+    VALUES
+        (%s, %s, %s, %s, %s, %s, %s, %s) ON DUPLICATE KEY
+    UPDATE
+        high = GREATEST(high, VALUES(high)),
+        low = LEAST(low, VALUES(low)),
+        close = VALUES(close),
+        count = count + VALUES(count)
+'''
+
+
+def bucket_start(timestamp, seconds):
+    """
+    Calcula el inicio del intervalo de `seconds` segundos que contiene `timestamp`.
+
+    Args:
+        timestamp (datetime): Momento del precio.
+        seconds (int): Duración del intervalo.
+
+    Returns:
+        datetime: Inicio del intervalo, alineado con 1970-01-01.
+    """
+    elapsed = int((timestamp - EPOCH).total_seconds())
+    return EPOCH + timedelta(seconds=elapsed - elapsed % seconds)
+
+
+def aggregate_ticks(ticks, resolutions=None):
+    """
+    Agrega precios en filas OHLC por moneda, resolución e intervalo.
+
+    Args:
+        ticks (iterable[tuple]): Tuplas (name, price, timestamp) en orden cronológico.
+        resolutions (dict, opcional): Nombre -> segundos. Por defecto `RESOLUTIONS`.
+
+    Returns:
+        list[tuple]: Filas (name, resolution, bucket_start, open, high, low, close, count)
+            listas para `UPSERT_SQL`.
+    """
+    resolutions = resolutions or RESOLUTIONS
+    buckets = {}
+    for name, price, timestamp in ticks:
+        if price is None:
+            continue
+        for seconds in resolutions.values():
+            key = (name, seconds, bucket_start(timestamp, seconds))
+            bucket = buckets.get(key)
+            if bucket is None:
+                buckets[key] = [price, price, price, price, 1]
+            else:
+                bucket[1] = max(bucket[1], price)
+                bucket[2] = min(bucket[2], price)
+                bucket[3] = price
+                bucket[4] += 1
+    return [key + tuple(values) for key, values in buckets.items()]
+
+
+def update_rollups(cursor, ticks, sql=UPSERT_SQL):
+    """
+    Actualiza los agregados OHLC con nuevos precios dentro de la transacción del llamador.
+
+    Los precios deben llegar en orden cronológico: el primero de un intervalo fija 'open'
+    y el último actualiza 'close'.
+
+    Args:
+        cursor: Cursor de la conexión en la que se insertan los precios.
+        ticks (iterable[tuple]): Tuplas (name, price, timestamp).
+        sql (str, opcional): Sentencia de upsert del backend. Por defecto la de MySQL.
+    """
+    rows = aggregate_ticks(ticks)
+    if rows:
+        cursor.executemany(sql, rows)
+
+
+def choose_resolution(start, end, points):
+    """
+    Elige la resolución más gruesa que aún da al menos `points` puntos en el rango.
+
+    Args:
+        start (datetime): Inicio del rango.
+        end (datetime): Fin del rango.
+        points (int): Número de puntos deseado.
+
+    Returns:
+        str | None: Nombre de la resolución, o None si ni la más fina da suficientes puntos
+            y deben usarse los precios sin agregar.
+    """
+    span = (end - start).total_seconds()
+    for name, seconds in sorted(RESOLUTIONS.items(), key=lambda item: -item[1]):
+        if span / seconds >= points:
+            return name
+    return None
+
+
+def get_rollup_series(name, resolution, start, end):
+    """
+    Recupera los agregados OHLC de una criptomoneda en un rango.
+
+    Args:
+        name (str): Nombre de la criptomoneda.
+        resolution (str): Nombre de la resolución de `RESOLUTIONS`.
+        start (datetime): Inicio del rango (incluido).
+        end (datetime): Fin del rango (excluido).
+
+    Returns:
+        list[dict]: Intervalos con 'bucket_start', 'open', 'high', 'low', 'close' y 'count',
+            del más reciente al más antiguo.
+    """
+    from database import query_db
+
+    return query_db('''
+        SELECT bucket_start, open, high, low, close, count
+        FROM price_rollups
+        WHERE name = %s
+            AND resolution = %s
+            AND bucket_start >= %s
+            AND bucket_start < %s
+        ORDER BY bucket_start DESC
+    ''', (name, RESOLUTIONS[resolution], bucket_start(start, RESOLUTIONS[resolution]), end)) or []
+
+
+def backfill_rollups(start=None, end=None, chunk=timedelta(days=1), resolutions=None):
+    """
+    Recalcula los agregados OHLC a partir de `historical_prices`.
+
+    Procesa el rango por tramos de `chunk` (alineados con los intervalos de todas las
+    resoluciones) para acotar el tamaño de cada transacción. Los agregados existentes del
+    rango se sustituyen. Usa SQL propio de MySQL (`TIMESTAMPDIFF`, `ON DUPLICATE KEY`).
+
+    Args:
+        start (datetime, opcional): Inicio del rango. Por defecto el precio más antiguo.
+        end (datetime, opcional): Fin del rango. Por defecto justo después del más reciente.
+        chunk (timedelta, opcional): Tamaño de cada tramo. Por defecto un día.
+        resolutions (dict, opcional): Nombre -> segundos. Por defecto `RESOLUTIONS`.
+
+    Returns:
+        int: Número de tramos procesados.
+    """
+    from database import execute_db, get_history_bounds, query_db
+
+    resolutions = resolutions or RESOLUTIONS
+    if start is None or end is None:
+        bounds = get_history_bounds()
+        if bounds is None:
+            return 0
+        start = start or bounds[0]
+        end = end or bounds[1] + timedelta(seconds=1)
+
+    chunk_seconds = int(chunk.total_seconds())
+    current = bucket_start(start, chunk_seconds)
+    processed = 0
+    while current < end:
+        chunk_end = current + chunk
+        for seconds in resolutions.values():
+            bucket = f"TIMESTAMPDIFF(SECOND, '1970-01-01', timestamp) DIV {int(seconds)}"
+            execute_db(f'''
+                INSERT INTO price_rollups
+                    (name, resolution, bucket_start, open, high, low, close, count)
+                SELECT
+                    name,
+                    {int(seconds)},
+                    DATE_ADD('1970-01-01', INTERVAL bucket * {int(seconds)} SECOND),
+                    MIN(open_price),
+                    MAX(price),
+                    MIN(price),
+                    MIN(close_price),
+                    COUNT(*)
+                FROM (
+                    SELECT
+                        name,
+                        price,
+                        {bucket} as bucket,
+                        FIRST_VALUE(price) OVER w as open_price,
+                        LAST_VALUE(price) OVER (w ROWS BETWEEN UNBOUNDED PRECEDING AND UNBOUNDED FOLLOWING)
+                            as close_price
+                    FROM historical_prices
+                    WHERE price IS NOT NULL
+                        AND timestamp >= %s
+                        AND timestamp < %s
+                    WINDOW w AS (PARTITION BY name, {bucket} ORDER BY timestamp, id)
+                ) t
+                GROUP BY name, bucket
+                ON DUPLICATE KEY UPDATE
+                    open = VALUES(open),
+                    high = VALUES(high),
+                    low = VALUES(low),
+                    close = VALUES(close),
+                    count = VALUES(count)
+            ''', (current, chunk_end))
+        current = chunk_end
+        processed += 1
+    return processed
+
+
+if __name__ == '__main__':
+    """
+    Punto de entrada del recálculo de agregados OHLC.
+
+        python rollups.py --from 2024-01-01 --to 2024-02-01
+    """
+    parser = argparse.ArgumentParser(description="Recalcula price_rollups desde historical_prices")
+    parser.add_argument('--from', dest='start', type=datetime.fromisoformat)
+    parser.add_argument('--to', dest='end', type=datetime.fromisoformat)
+    args = parser.parse_args()
+
+    chunks = backfill_rollups(args.start, args.end)
+    print(f"Agregados recalculados en {chunks} tramos.")
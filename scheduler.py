@@ -0,0 +1,241 @@
+import logging
+import os
+import random
+import tempfile
+import threading
+import time
+from datetime import datetime
+
+INGESTION_INTERVAL = float(os.environ.get('INGESTION_INTERVAL', 60))
+INGESTION_MAX_BACKOFF = float(os.environ.get('INGESTION_MAX_BACKOFF', 600))
+INGESTION_JITTER = float(os.environ.get('INGESTION_JITTER', 0.1))
+# Fichero de bloqueo con el que los procesos de `server.py` eligen al único que ingesta
+INGESTION_LOCK_PATH = os.environ.get('INGESTION_LOCK_PATH',
+                                     os.path.join(tempfile.gettempdir(), 'scraping_cripto_ingestion.lock'))
+INGESTION_LEADER_RETRY = float(os.environ.get('INGESTION_LEADER_RETRY', 5))
+
+
+class IngestionScheduler:
+    """
+    Ejecuta periódicamente el proceso ETL en un hilo propio, fuera del ciclo de peticiones de Flask.
+
+    Tras un fallo la siguiente ejecución se retrasa con backoff exponencial (`interval * 2^n`,
+    hasta `max_backoff`); todos los retrasos llevan un jitter aleatorio de ±`jitter` para que
+    varios procesos no coincidan. Un lock no bloqueante impide que dos ejecuciones se solapen:
+    si una extracción lenta sigue en curso, la siguiente se omite.
+
+    Args:
+        job (callable): Función sin argumentos que ejecuta una extracción completa.
+        interval (float, opcional): Segundos entre ejecuciones. Por defecto `INGESTION_INTERVAL`.
+        max_backoff (float, opcional): Retraso máximo tras fallos. Por defecto `INGESTION_MAX_BACKOFF`.
+        jitter (float, opcional): Fracción de variación aleatoria del retraso. Por defecto `INGESTION_JITTER`.
+    """
+
+    def __init__(self, job, interval=INGESTION_INTERVAL, max_backoff=INGESTION_MAX_BACKOFF, jitter=INGESTION_JITTER):
+        self.job = job
+        self.interval = interval
+        self.max_backoff = max_backoff
+        self.jitter = jitter
+        self._run_lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+        self._status = {
+            'runs': 0,
+            'failures': 0,
+            'skipped': 0,
+            'consecutive_failures': 0,
+            'last_started': None,
+            'last_finished': None,
+            'last_success': None,
+            'last_latency': None,
+            'last_error': None,
+        }
+
+    def next_delay(self):
+        """
+        Calcula la espera hasta la siguiente ejecución.
+
+        Returns:
+            float: Segundos de espera con backoff y jitter aplicados.
+        """
+        failures = self._status['consecutive_failures']
+        delay = self.interval if not failures else min(self.max_backoff, self.interval * 2 ** failures)
+        return max(0.0, delay * random.uniform(1 - self.jitter, 1 + self.jitter))
+
+    def run_once(self):
+        """
+        Ejecuta el trabajo una vez si no hay otra ejecución en curso.
+
+        Returns:
+            bool | None: True si terminó bien, False si falló y None si se omitió por solapamiento.
+        """
+        if not self._run_lock.acquire(blocking=False):
+            self._status['skipped'] += 1
+            logging.warning("Extracción omitida: la anterior sigue en curso")
+            return None
+        try:
+            start = time.perf_counter()
+            self._status['last_started'] = datetime.now()
+            try:
+                self.job()
+            except Exception as e:
+                self._status['failures'] += 1
+                self._status['consecutive_failures'] += 1
+                self._status['last_error'] = str(e)
+                logging.error("Error en la extracción programada: %s", e)
+                return False
+            else:
+                self._status['consecutive_failures'] = 0
+                self._status['last_error'] = None
+                self._status['last_success'] = datetime.now()
+                return True
+            finally:
+                self._status['runs'] += 1
+                self._status['last_finished'] = datetime.now()
+                self._status['last_latency'] = time.perf_counter() - start
+        finally:
+            self._run_lock.release()
+
+    def _loop(self):
+        while not self._stop.is_set():
+            self.run_once()
+            self._stop.wait(self.next_delay())
+
+    def start(self):
+        """Arranca el hilo del planificador si no está en marcha."""
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._loop, name='ingestion-scheduler', daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout=None):
+        """
+        Detiene el planificador tras la ejecución en curso.
+
+        Args:
+            timeout (float, opcional): Segundos máximos de espera al hilo.
+        """
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+    def run_forever(self):
+        """Ejecuta el planificador en el hilo actual hasta `stop()` o Ctrl+C."""
+        try:
+            self._loop()
+        except KeyboardInterrupt:
+            pass
+
+    def status(self):
+        """
+        Devuelve el estado de la ingesta.
+
+        Returns:
+            dict: Contadores de ejecuciones, marcas de tiempo de la última ejecución, 'last_latency'
+                en segundos y 'staleness', segundos desde la última extracción correcta (None si aún
+                no ha habido ninguna).
+        """
+        status = dict(self._status)
+        status['running'] = self._run_lock.locked()
+        status['staleness'] = (datetime.now() - status['last_success']).total_seconds() \
+            if status['last_success'] else None
+        return status
+
+
+class LeaderElection:
+    """
+    Elige entre varios procesos al único que ejecuta la ingesta, con un `flock` exclusivo.
+
+    Cada proceso intenta tomar el bloqueo sin esperar; el que lo consigue escribe su PID en el
+    fichero y llama a `on_elected`, y los demás lo reintentan cada `retry` segundos. El sistema
+    operativo libera el bloqueo cuando el líder termina (incluso si muere sin limpiar), así que
+    otro proceso lo sustituye en el siguiente reintento. Solo funciona en sistemas POSIX.
+
+    Args:
+        path (str, opcional): Fichero de bloqueo. Por defecto `INGESTION_LOCK_PATH`.
+        on_elected (callable, opcional): Función sin argumentos llamada al ganar la elección.
+        retry (float, opcional): Segundos entre intentos. Por defecto `INGESTION_LEADER_RETRY`.
+    """
+
+    def __init__(self, path=INGESTION_LOCK_PATH, on_elected=None, retry=INGESTION_LEADER_RETRY):
+        self.path = path
+        self.on_elected = on_elected
+        self.retry = retry
+        self._fd = None
+        self._stop = threading.Event()
+        self._thread = None
+
+    @property
+    def is_leader(self):
+        """bool: True si este proceso tiene el bloqueo."""
+        return self._fd is not None
+
+    def try_acquire(self):
+        """
+        Intenta tomar el bloqueo sin esperar.
+
+        Returns:
+            bool: True si este proceso es (o pasa a ser) el líder.
+        """
+        import fcntl
+
+        if self._fd is not None:
+            return True
+        fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o600)
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            os.close(fd)
+            return False
+        os.ftruncate(fd, 0)
+        os.write(fd, str(os.getpid()).encode())
+        self._fd = fd
+        logging.info("Proceso %s elegido para la ingesta", os.getpid())
+        if self.on_elected is not None:
+            self.on_elected()
+        return True
+
+    def _loop(self):
+        while not self._stop.is_set() and not self.try_acquire():
+            self._stop.wait(self.retry)
+
+    def start(self):
+        """Intenta la elección en un hilo daemon hasta ganarla o hasta `stop()`."""
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._loop, name='leader-election', daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """Deja de competir y libera el bloqueo si se tenía."""
+        self._stop.set()
+        if self._fd is not None:
+            os.close(self._fd)  # cerrar el descriptor libera el flock
+            self._fd = None
+
+    def leader_pid(self):
+        """
+        Returns:
+            int | None: PID escrito por el líder actual, o None si no se conoce.
+        """
+        try:
+            with open(self.path) as f:
+                return int(f.read().strip() or 0) or None
+        except (OSError, ValueError):
+            return None
+
+
+if __name__ == '__main__':
+    """
+    Punto de entrada del proceso de ingesta independiente.
+
+    Ejecuta extracción → transformación → carga cada `INGESTION_INTERVAL` segundos sin servir la API:
+        INGESTION_MODE=process python app.py   # API
+        python scheduler.py                    # ingesta
+    """
+    from app import fetch_and_store_data
+
+    logging.basicConfig(level=os.environ.get('LOG_LEVEL', 'INFO'))
+    IngestionScheduler(fetch_and_store_data).run_forever()
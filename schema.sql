@@ -5,10 +5,37 @@ CREATE TABLE IF NOT EXISTS crypto_prices (
     last_updated DATETIME
 );
 
+-- La clave primaria incluye `timestamp` porque MySQL exige que la columna de particionado
+-- forme parte de toda clave única. `p_future` recoge las filas sin partición mensual/diaria;
+-- partitions.py la divide por adelantado y elimina las particiones antiguas.
 CREATE TABLE IF NOT EXISTS historical_prices (
-    id INT AUTO_INCREMENT PRIMARY KEY,
+    id BIGINT AUTO_INCREMENT,
     name VARCHAR(255),
     code VARCHAR(10),
     price DECIMAL(20,8),
-    timestamp DATETIME
+    timestamp DATETIME NOT NULL,
+    PRIMARY KEY (id, timestamp),
+    KEY idx_historical_name_timestamp (name, timestamp)
+)
+PARTITION BY RANGE COLUMNS(timestamp) (
+    PARTITION p_future VALUES LESS THAN (MAXVALUE)
+);
+
+-- Agregados OHLC por resolución (segundos), mantenidos por rollups.py al insertar precios
+CREATE TABLE IF NOT EXISTS price_rollups (
+    name VARCHAR(255) NOT NULL,
+    resolution INT NOT NULL,
+    bucket_start DATETIME NOT NULL,
+    open DECIMAL(20,8),
+    high DECIMAL(20,8),
+    low DECIMAL(20,8),
+    close DECIMAL(20,8),
+    count INT NOT NULL,
+    PRIMARY KEY (name, resolution, bucket_start)
+);
+
+-- Versión del esquema aplicado: init_db() no vuelve a ejecutar este script si ya está al día
+CREATE TABLE IF NOT EXISTS schema_version (
+    id INT PRIMARY KEY,
+    version INT NOT NULL
 );
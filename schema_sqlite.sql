@@ -0,0 +1,36 @@
+CREATE TABLE IF NOT EXISTS crypto_prices (
+    name TEXT PRIMARY KEY,
+    code TEXT,
+    actual_price REAL,
+    last_updated DATETIME
+);
+
+CREATE TABLE IF NOT EXISTS historical_prices (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    name TEXT,
+    code TEXT,
+    price REAL,
+    timestamp DATETIME NOT NULL
+);
+
+-- Índice de cobertura: las lecturas por moneda y rango no necesitan acceder a la tabla
+CREATE INDEX IF NOT EXISTS idx_historical_name_timestamp ON historical_prices (name, timestamp, price);
+
+-- Agregados OHLC por resolución (segundos), mantenidos por rollups.py al insertar precios
+CREATE TABLE IF NOT EXISTS price_rollups (
+    name TEXT NOT NULL,
+    resolution INTEGER NOT NULL,
+    bucket_start DATETIME NOT NULL,
+    open REAL,
+    high REAL,
+    low REAL,
+    close REAL,
+    count INTEGER NOT NULL,
+    PRIMARY KEY (name, resolution, bucket_start)
+) WITHOUT ROWID;
+
+-- Versión del esquema aplicado: init_db() no vuelve a ejecutar este script si ya está al día
+CREATE TABLE IF NOT EXISTS schema_version (
+    id INTEGER PRIMARY KEY,
+    version INTEGER NOT NULL
+);
@@ -0,0 +1,214 @@
+import argparse
+import fcntl
+import logging
+import os
+import signal
+import socket
+import tempfile
+import time
+from contextlib import contextmanager
+
+SERVER_BIND = os.environ.get('SERVER_BIND', '127.0.0.1:5000')
+SERVER_WORKERS = int(os.environ.get('SERVER_WORKERS', os.cpu_count() or 2))
+SERVER_THREADS = int(os.environ.get('SERVER_THREADS', 8))  # hilos por proceso (gunicorn gthread)
+# Directorio del estado compartido y de los bloqueos; en /dev/shm vive en memoria
+SERVER_RUNTIME_DIR = os.environ.get('SERVER_RUNTIME_DIR', os.path.join(
+    '/dev/shm' if os.path.isdir('/dev/shm') else tempfile.gettempdir(), 'scraping_cripto'))
+
+os.makedirs(SERVER_RUNTIME_DIR, mode=0o700, exist_ok=True)
+# Se fijan antes de importar `app`, que lee su configuración al importarse
+os.environ.setdefault('INGESTION_MODE', 'leader')
+os.environ.setdefault('SHARED_SNAPSHOT_PATH', os.path.join(SERVER_RUNTIME_DIR, 'snapshot.json'))
+os.environ.setdefault('INGESTION_LOCK_PATH', os.path.join(SERVER_RUNTIME_DIR, 'ingestion.lock'))
+
+from app import app, leader_election, start_cache_follower, warm_price_cache  # noqa: E402
+from database import configure_pool, init_db  # noqa: E402
+from instrumentation import profiler  # noqa: E402
+from stream import STREAM_MAX_CLIENTS, broadcaster  # noqa: E402
+
+_worker_pid = None
+
+
+@contextmanager
+def file_lock(path):
+    """
+    Context manager que toma un `flock` exclusivo, esperando si lo tiene otro proceso.
+
+    Args:
+        path (str): Fichero de bloqueo.
+    """
+    with open(path, 'a') as f:
+        fcntl.flock(f, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(f, fcntl.LOCK_UN)
+
+
+def prepare():
+    """
+    Prepara la base de datos antes de arrancar los procesos que sirven la API.
+
+    `init_db` no ejecuta el DDL si el esquema ya está en `SCHEMA_VERSION`, y el bloqueo evita que
+    varios procesos lo apliquen a la vez sobre una base de datos nueva. Después se cierran las
+    conexiones usadas para que los procesos hijos abran las suyas en lugar de heredarlas.
+    """
+    with file_lock(os.path.join(SERVER_RUNTIME_DIR, 'init.lock')):
+        init_db()
+    configure_pool()
+
+
+def worker_init():
+    """
+    Arranca el estado propio de un proceso de la API (una sola vez por PID).
+
+    Carga la caché de precios (desde el estado compartido si ya existe) y se presenta a la
+    elección de la ingesta: el proceso que gana ejecuta `IngestionScheduler` y publica el
+    estado en cada ciclo; el resto lo lee en segundo plano con `start_cache_follower`, de modo
+    que sus clientes del stream reciben cada ciclo aunque el proceso no reciba peticiones.
+    """
+    global _worker_pid
+    if _worker_pid == os.getpid():
+        return
+    _worker_pid = os.getpid()
+    if profiler is not None:
+        profiler.start()  # los hilos no sobreviven a fork()
+    try:
+        warm_price_cache()
+    except Exception as e:
+        # La caché se carga en la primera petición si la base de datos aún no responde
+        logging.error("Error al cargar la caché de precios: %s", e)
+    start_cache_follower()
+    if leader_election is not None:
+        leader_election.start()
+
+
+def worker_exit():
+    """Libera el bloqueo de la ingesta al terminar el proceso."""
+    if leader_election is not None:
+        leader_election.stop()
+
+
+def application(environ, start_response):
+    """
+    Punto de entrada WSGI para cualquier servidor (`gunicorn server:application`, uWSGI...).
+
+    Inicializa el proceso en su primera petición si el servidor no llamó a `worker_init`.
+    """
+    if _worker_pid != os.getpid():
+        worker_init()
+    return app(environ, start_response)
+
+
+def serve_gunicorn(bind, workers, threads):
+    """
+    Sirve la API con gunicorn: `workers` procesos con `threads` hilos cada uno.
+
+    La aplicación se importa en el proceso maestro (`preload_app`) y cada proceso hijo llama a
+    `worker_init` nada más arrancar, de modo que la elección de la ingesta no espera al tráfico.
+
+    Cada cliente del stream ocupa un hilo mientras está conectado; salvo que `STREAM_MAX_CLIENTS`
+    diga otra cosa, el stream puede usar como mucho la mitad de los hilos de cada proceso y el
+    resto de clientes recibe un 503 y consulta `/api/crypto` periódicamente.
+    """
+    from gunicorn.app.base import BaseApplication
+
+    if not STREAM_MAX_CLIENTS:
+        broadcaster.max_clients = max(1, threads // 2)
+
+    options = {
+        'bind': bind,
+        'workers': workers,
+        'worker_class': 'gthread',
+        'threads': threads,
+        'preload_app': True,
+        'post_worker_init': lambda worker: worker_init(),
+        'worker_exit': lambda server, worker: worker_exit(),
+    }
+
+    class GunicornServer(BaseApplication):
+        def load_config(self):
+            for key, value in options.items():
+                self.cfg.set(key, value)
+
+        def load(self):
+            return application
+
+    GunicornServer().run()
+
+
+def serve_prefork(bind, workers):
+    """
+    Alternativa sin gunicorn: `workers` procesos con el servidor de Werkzeug sobre un socket compartido.
+
+    El proceso maestro abre el socket, crea los hijos con `fork()` y reemplaza a los que terminan;
+    el núcleo reparte las conexiones entre los hijos que esperan en `accept()`. Solo POSIX.
+    """
+    from werkzeug.serving import make_server
+
+    host, port = bind.rsplit(':', 1)
+    sock = socket.create_server((host, int(port)), backlog=2048)
+    children = set()
+    stopping = False
+
+    def spawn():
+        pid = os.fork()
+        if pid == 0:
+            signal.signal(signal.SIGTERM, signal.SIG_DFL)
+            signal.signal(signal.SIGINT, signal.SIG_DFL)
+            worker_init()
+            make_server(host, int(port), application, threaded=True, fd=sock.fileno()).serve_forever()
+            os._exit(0)
+        children.add(pid)
+
+    def stop(signum, frame):
+        nonlocal stopping
+        stopping = True
+        for pid in children:
+            os.kill(pid, signal.SIGTERM)
+
+    signal.signal(signal.SIGTERM, stop)
+    signal.signal(signal.SIGINT, stop)
+    for _ in range(workers):
+        spawn()
+    logging.info("Sirviendo en http://%s con %s procesos", bind, workers)
+    while children:
+        try:
+            pid, _ = os.wait()
+        except ChildProcessError:
+            break
+        except InterruptedError:
+            continue
+        children.discard(pid)
+        if not stopping:
+            logging.warning("El proceso %s terminó; se reemplaza", pid)
+            time.sleep(1)
+            spawn()
+    sock.close()
+
+
+if __name__ == '__main__':
+    """
+    Punto de entrada del modo de producción.
+
+    Ejemplo:
+        python server.py --workers 4 --bind 0.0.0.0:8000
+        gunicorn -w 4 -k gthread server:application   # equivalente con la CLI de gunicorn
+    """
+    parser = argparse.ArgumentParser(description="Sirve la API con varios procesos y una sola ingesta")
+    parser.add_argument('--bind', default=SERVER_BIND, help="host:puerto")
+    parser.add_argument('--workers', type=int, default=SERVER_WORKERS)
+    parser.add_argument('--threads', type=int, default=SERVER_THREADS, help="hilos por proceso (gunicorn)")
+    parser.add_argument('--no-gunicorn', action='store_true', help="usar el servidor de Werkzeug aunque haya gunicorn")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=os.environ.get('LOG_LEVEL', 'INFO'))
+    prepare()
+    try:
+        if args.no_gunicorn:
+            raise ImportError
+        import gunicorn  # noqa: F401
+    except ImportError:
+        serve_prefork(args.bind, args.workers)
+    else:
+        serve_gunicorn(args.bind, args.workers, args.threads)
@@ -0,0 +1,104 @@
+import json
+import os
+import tempfile
+import threading
+import time
+from datetime import datetime
+
+# Con SHARED_SNAPSHOT_PATH el proceso que ingesta publica el estado de la caché de precios en ese
+# fichero y el resto de procesos lo cargan en lugar de consultar la base de datos
+SHARED_SNAPSHOT_PATH = os.environ.get('SHARED_SNAPSHOT_PATH', '')
+SHARED_SNAPSHOT_POLL = float(os.environ.get('SHARED_SNAPSHOT_POLL', 1))  # segundos
+
+
+class SharedSnapshot:
+    """
+    Estado de la caché de precios compartido entre procesos a través de un fichero.
+
+    El proceso que ingesta serializa el estado una vez por ciclo y lo escribe en un fichero
+    temporal que después renombra sobre `path`, de modo que los lectores nunca ven un fichero a
+    medias. Cada lector comprueba con un `stat` (como mucho cada `poll` segundos) si el fichero
+    ha cambiado y solo entonces lo lee. Con `path` en `/dev/shm` el fichero vive en memoria.
+
+    Args:
+        path (str, opcional): Fichero del estado. Por defecto `SHARED_SNAPSHOT_PATH`.
+        poll (float, opcional): Segundos mínimos entre comprobaciones. Por defecto `SHARED_SNAPSHOT_POLL`.
+    """
+
+    def __init__(self, path=SHARED_SNAPSHOT_PATH, poll=SHARED_SNAPSHOT_POLL):
+        self.path = path
+        self.poll = poll
+        self.generation = 0
+        self._seen = None  # (inodo, mtime) del último fichero leído
+        self._checked_at = float('-inf')
+        self._lock = threading.Lock()
+
+    def publish(self, crypto_data):
+        """
+        Escribe el estado de forma atómica.
+
+        Args:
+            crypto_data (list[dict]): Datos en el formato de `PriceCache.snapshot`.
+
+        Returns:
+            int: Generación publicada.
+        """
+        with self._lock:
+            self.generation += 1
+            payload = {
+                'generation': self.generation,
+                'pid': os.getpid(),
+                'published_at': datetime.now().isoformat(),
+                'coins': [{
+                    'name': data['name'],
+                    'actual_price': data['actual_price'],
+                    'history': [[entry['timestamp'].isoformat(), entry['price']] for entry in data['history']],
+                } for data in crypto_data],
+            }
+            directory = os.path.dirname(os.path.abspath(self.path))
+            fd, tmp_path = tempfile.mkstemp(dir=directory, prefix='.snapshot-')
+            try:
+                with os.fdopen(fd, 'w') as f:
+                    json.dump(payload, f, separators=(',', ':'))
+                os.replace(tmp_path, self.path)
+            except BaseException:
+                os.unlink(tmp_path)
+                raise
+            return self.generation
+
+    def load_if_changed(self):
+        """
+        Lee el estado si el fichero ha cambiado desde la última lectura.
+
+        Returns:
+            list[dict] | None: Datos en el formato de `get_crypto_data_with_history`, o None si no
+                hay fichero, no ha cambiado o aún no toca comprobarlo.
+        """
+        with self._lock:
+            now = time.monotonic()
+            if now - self._checked_at < self.poll:
+                return None
+            self._checked_at = now
+            try:
+                stat = os.stat(self.path)
+            except FileNotFoundError:
+                return None
+            version = (stat.st_ino, stat.st_mtime_ns)
+            if version == self._seen:
+                return None
+            try:
+                with open(self.path) as f:
+                    payload = json.load(f)
+            except FileNotFoundError:
+                return None
+            self._seen = version
+            self.generation = payload['generation']
+        return [{
+            'name': data['name'],
+            'actual_price': data['actual_price'],
+            'history': [{'price': price, 'timestamp': datetime.fromisoformat(timestamp)}
+                        for timestamp, price in data['history']],
+        } for data in payload['coins']]
+
+
+shared_snapshot = SharedSnapshot() if SHARED_SNAPSHOT_PATH else None
@@ -54,14 +54,19 @@ def calculate_metrics(historical_prices):
                 - 'highest_1h' (float o None): Precio más alto de la última hora.
                 - 'lower_1h' (float o None): Precio más bajo de la última hora.
                 - 'avg_price' (float o None): Precio promedio de la última hora.
+
+    Note:
+        La API usa `rolling.RollingMetrics`, que mantiene estas métricas de forma incremental.
+        Esta función se conserva como implementación de referencia.
     """
     if not historical_prices:
         return {'highest_1h': None, 'lower_1h': None, 'avg_price': None}
 
     # Filtrar precios de la última hora
+    now = datetime.now()
     prices_last_hour = [
         hp['price'] for hp in historical_prices
-        if (datetime.now() - hp['timestamp']).total_seconds() <= 3600
+        if (now - hp['timestamp']).total_seconds() <= 3600
     ]
 
     if not prices_last_hour:
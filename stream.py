@@ -0,0 +1,162 @@
+import json
+import os
+import queue
+import threading
+
+STREAM_QUEUE_SIZE = int(os.environ.get('STREAM_QUEUE_SIZE', 100))
+STREAM_HEARTBEAT = float(os.environ.get('STREAM_HEARTBEAT', 15))  # segundos
+# Clientes del stream por proceso como máximo (0: sin límite). Cada cliente ocupa un hilo del servidor
+STREAM_MAX_CLIENTS = int(os.environ.get('STREAM_MAX_CLIENTS', 0))
+
+
+class StreamFullError(Exception):
+    """Se alcanzó el máximo de clientes del stream en este proceso."""
+
+
+def format_event(event, data, event_id=None):
+    """
+    Serializa un evento en el formato de Server-Sent Events.
+
+    Args:
+        event (str): Nombre del evento.
+        data: Contenido serializable a JSON.
+        event_id (int, opcional): Identificador del evento.
+
+    Returns:
+        bytes: Mensaje SSE listo para escribirse en la respuesta.
+    """
+    lines = [f"event: {event}"]
+    if event_id is not None:
+        lines.append(f"id: {event_id}")
+    lines.append("data: " + json.dumps(data, separators=(',', ':'), default=str))
+    return ("\n".join(lines) + "\n\n").encode('utf-8')
+
+
+class Broadcaster:
+    """
+    Difusión de cambios de precios a los clientes conectados por Server-Sent Events.
+
+    Tras cada ciclo de ingesta se calcula una sola vez qué monedas han cambiado y el mensaje
+    se serializa una sola vez; después solo se encola el mismo `bytes` en la cola de cada
+    cliente. Así el coste en el servidor apenas depende del número de clientes. Un cliente
+    cuya cola se llena (demasiado lento) se desconecta; `EventSource` se reconecta y recibe
+    de nuevo el estado completo.
+
+    Con un servidor de hilos cada cliente conectado ocupa un hilo mientras dure la conexión, así
+    que `max_clients` limita los clientes para que queden hilos libres para el resto de rutas.
+
+    Args:
+        queue_size (int, opcional): Mensajes pendientes por cliente. Por defecto `STREAM_QUEUE_SIZE`.
+        max_clients (int, opcional): Clientes como máximo (0: sin límite). Por defecto `STREAM_MAX_CLIENTS`.
+    """
+
+    def __init__(self, queue_size=STREAM_QUEUE_SIZE, max_clients=STREAM_MAX_CLIENTS):
+        self.queue_size = queue_size
+        self.max_clients = max_clients
+        self._subscribers = set()
+        self._lock = threading.Lock()
+        self._state = {}
+        self._snapshot = format_event('snapshot', {'timestamp': None, 'prices': []})
+        self._event_id = 0
+
+    @property
+    def subscribers(self):
+        """int: Número de clientes conectados."""
+        return len(self._subscribers)
+
+    def subscribe(self):
+        """
+        Registra un cliente nuevo; su primer mensaje es el estado completo actual.
+
+        Returns:
+            queue.Queue: Cola de mensajes del cliente.
+
+        Raises:
+            StreamFullError: Si ya hay `max_clients` clientes conectados.
+        """
+        client = queue.Queue(self.queue_size)
+        with self._lock:
+            if self.max_clients and len(self._subscribers) >= self.max_clients:
+                raise StreamFullError(f"Máximo de {self.max_clients} clientes del stream alcanzado")
+            client.put_nowait(self._snapshot)
+            self._subscribers.add(client)
+        return client
+
+    def unsubscribe(self, client):
+        """
+        Da de baja un cliente.
+
+        Args:
+            client (queue.Queue): Cola devuelta por `subscribe`.
+        """
+        with self._lock:
+            self._subscribers.discard(client)
+
+    def _broadcast(self, message):
+        with self._lock:
+            subscribers = list(self._subscribers)
+        for client in subscribers:
+            try:
+                client.put_nowait(message)
+            except queue.Full:
+                # Se descarta el mensaje más antiguo para hacer sitio a la señal de cierre
+                self.unsubscribe(client)
+                try:
+                    client.get_nowait()
+                except queue.Empty:
+                    pass
+                client.put_nowait(None)
+
+    def publish_changes(self, snapshot, timestamp=None):
+        """
+        Difunde las monedas cuyo precio, señal o métricas han cambiado desde la última llamada.
+
+        Los eventos tienen la forma `{'timestamp': ..., 'prices': [...]}`: 'snapshot' con el
+        estado completo (solo al conectarse) y 'update' con las monedas cambiadas.
+
+        Args:
+            snapshot (list[dict]): Estado completo con una entrada por moneda (con 'name').
+            timestamp (str, opcional): Momento de la extracción, para las gráficas del cliente.
+
+        Returns:
+            int: Número de monedas cambiadas.
+        """
+        with self._lock:
+            changed = [entry for entry in snapshot if self._state.get(entry['name']) != entry]
+            self._state = {entry['name']: entry for entry in snapshot}
+            self._event_id += 1
+            event_id = self._event_id
+            self._snapshot = format_event('snapshot', {'timestamp': timestamp, 'prices': snapshot}, event_id)
+        if changed:
+            self._broadcast(format_event('update', {'timestamp': timestamp, 'prices': changed}, event_id))
+        return len(changed)
+
+    def events(self, client, heartbeat=STREAM_HEARTBEAT):
+        """
+        Generador de la respuesta HTTP de un cliente.
+
+        Envía un comentario de keep-alive cada `heartbeat` segundos sin mensajes y da de baja
+        al cliente cuando se cierra la conexión.
+
+        Args:
+            client (queue.Queue): Cola devuelta por `subscribe`.
+            heartbeat (float, opcional): Segundos entre keep-alives. Por defecto `STREAM_HEARTBEAT`.
+
+        Yields:
+            bytes: Mensajes SSE.
+        """
+        try:
+            while True:
+                try:
+                    message = client.get(timeout=heartbeat)
+                except queue.Empty:
+                    yield b": keep-alive\n\n"
+                    continue
+                if message is None:
+                    return
+                yield message
+        finally:
+            self.unsubscribe(client)
+
+
+broadcaster = Broadcaster()
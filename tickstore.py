@@ -0,0 +1,386 @@
+import argparse
+import json
+import os
+import resource
+import threading
+import time
+from collections import namedtuple
+from datetime import datetime, timedelta
+from urllib.parse import quote, unquote
+
+import numpy as np
+
+from ingest import INGEST_DEDUP, INGEST_HEARTBEAT, reconstruct_steps
+from rollups import EPOCH
+
+# Sin TICKSTORE_DIR el almacén local de precios está desactivado
+TICKSTORE_DIR = os.environ.get('TICKSTORE_DIR', '')
+# Con TICKSTORE_PRICE_SCALE > 0 los precios se guardan como int64 escalados (p. ej. 1e8) en lugar de float64
+TICKSTORE_PRICE_SCALE = int(float(os.environ.get('TICKSTORE_PRICE_SCALE', 0)))
+
+TICK_SUFFIX = '.ticks'
+META_FILE = 'meta.json'
+_MICROSECOND = timedelta(microseconds=1)
+
+Ticks = namedtuple('Ticks', ['timestamps', 'prices'])
+
+
+def to_micros(timestamp):
+    """
+    Args:
+        timestamp (datetime): Momento sin zona horaria.
+
+    Returns:
+        int: Microsegundos desde 1970-01-01.
+    """
+    return (timestamp - EPOCH) // _MICROSECOND
+
+
+def from_micros(micros):
+    """
+    Args:
+        micros (int): Microsegundos desde 1970-01-01.
+
+    Returns:
+        datetime: Momento sin zona horaria.
+    """
+    return EPOCH + timedelta(microseconds=int(micros))
+
+
+class TickStore:
+    """
+    Almacén local de precios por columnas con lecturas por `mmap`.
+
+    Cada moneda tiene un fichero de solo-añadir con registros de ancho fijo: un timestamp
+    int64 (microsegundos desde 1970) y el precio en float64 o, con `price_scale`, en int64
+    escalado. Los ficheros se leen con `np.memmap`, así que una lectura no copia los datos
+    ni crea objetos por fila: los rangos se localizan con búsqueda binaria sobre los
+    timestamps y se devuelven como vistas de NumPy.
+
+    Los precios de cada moneda deben añadirse en orden cronológico.
+
+    Args:
+        root (str, opcional): Directorio de los ficheros. Por defecto `TICKSTORE_DIR`.
+        price_scale (int, opcional): Factor de escala de los precios enteros; 0 para float64.
+            Por defecto `TICKSTORE_PRICE_SCALE`. Un directorio existente conserva el suyo.
+    """
+
+    def __init__(self, root=TICKSTORE_DIR, price_scale=TICKSTORE_PRICE_SCALE):
+        self.root = root
+        os.makedirs(root, exist_ok=True)
+        meta_path = os.path.join(root, META_FILE)
+        if os.path.exists(meta_path):
+            with open(meta_path) as f:
+                price_scale = json.load(f)['price_scale']
+        else:
+            with open(meta_path, 'w') as f:
+                json.dump({'price_scale': price_scale}, f)
+        self.price_scale = price_scale
+        self.dtype = np.dtype([('ts', '<i8'), ('price', '<i8' if price_scale else '<f8')])
+        self._lock = threading.Lock()
+
+    def path(self, name):
+        """
+        Args:
+            name (str): Nombre de la criptomoneda.
+
+        Returns:
+            str: Ruta de su fichero de precios.
+        """
+        return os.path.join(self.root, quote(name, safe='') + TICK_SUFFIX)
+
+    def coins(self):
+        """
+        Returns:
+            list[str]: Monedas con precios en el almacén.
+        """
+        return sorted(unquote(f[:-len(TICK_SUFFIX)]) for f in os.listdir(self.root) if f.endswith(TICK_SUFFIX))
+
+    def append(self, name, timestamps, prices):
+        """
+        Añade precios al final del fichero de una moneda.
+
+        Si una escritura anterior quedó a medias (el tamaño del fichero no es múltiplo del
+        registro), el fichero se recorta antes al último registro completo; de lo contrario
+        todos los registros añadidos quedarían desplazados.
+
+        Args:
+            name (str): Nombre de la criptomoneda.
+            timestamps (array-like): Microsegundos desde 1970 (int64), en orden cronológico.
+            prices (array-like): Precios.
+
+        Returns:
+            int: Número de precios añadidos.
+        """
+        records = np.empty(len(timestamps), dtype=self.dtype)
+        records['ts'] = timestamps
+        prices = np.asarray(prices, dtype=np.float64)
+        records['price'] = np.rint(prices * self.price_scale) if self.price_scale else prices
+        with self._lock, open(self.path(name), 'ab') as f:
+            size = f.seek(0, os.SEEK_END)
+            torn = size % self.dtype.itemsize
+            if torn:
+                f.truncate(size - torn)
+            f.write(records.tobytes())
+        return len(records)
+
+    def append_rows(self, rows, interval=None, heartbeat=INGEST_HEARTBEAT):
+        """
+        Añade las filas de una extracción.
+
+        Con `interval`, las filas son las que dejó pasar `ingest.ChangeFilter` y se guarda la
+        serie reconstruida con `reconstruct_steps`: el último precio de cada moneda (ya en el
+        almacén o del mismo lote) se repite cada `interval` segundos hasta la fila siguiente,
+        sin pasar de `heartbeat` segundos.
+
+        Args:
+            rows (list[dict]): Filas con 'name', 'actual_price' y 'timestamp'.
+            interval (float, opcional): Segundos entre extracciones. Por defecto no se reconstruye.
+            heartbeat (float, opcional): Heartbeat del filtro. Por defecto `INGEST_HEARTBEAT`.
+
+        Returns:
+            int: Número de precios añadidos.
+        """
+        by_coin = {}
+        for row in rows:
+            if row.get('actual_price') is None:
+                continue
+            by_coin.setdefault(row['name'], []).append({'price': float(row['actual_price']),
+                                                        'timestamp': row['timestamp']})
+        added = 0
+        for name, ticks in by_coin.items():
+            if interval is not None:
+                last = self._last_tick(name)
+                history = ticks[::-1] + ([last] if last is not None else [])
+                ticks = reconstruct_steps(history, interval, heartbeat, until=ticks[-1]['timestamp'])[::-1]
+                if last is not None:
+                    ticks = [tick for tick in ticks if tick['timestamp'] > last['timestamp']]
+            added += self.append(name, [to_micros(tick['timestamp']) for tick in ticks],
+                                 [tick['price'] for tick in ticks])
+        return added
+
+    def _last_tick(self, name):
+        records = self._records(name)
+        if not len(records):
+            return None
+        ts, price = records[-1]
+        return {'price': price / self.price_scale if self.price_scale else float(price),
+                'timestamp': from_micros(ts)}
+
+    def _records(self, name):
+        path = self.path(name)
+        if not os.path.exists(path) or os.path.getsize(path) < self.dtype.itemsize:
+            return np.empty(0, dtype=self.dtype)
+        # Se ignora un registro a medio escribir al final del fichero
+        count = os.path.getsize(path) // self.dtype.itemsize
+        return np.memmap(path, dtype=self.dtype, mode='r', shape=(count,))
+
+    def read(self, name, start=None, end=None):
+        """
+        Lee los precios de una moneda en un rango sin copiar el fichero.
+
+        Args:
+            name (str): Nombre de la criptomoneda.
+            start (datetime, opcional): Inicio del rango (incluido).
+            end (datetime, opcional): Fin del rango (excluido).
+
+        Returns:
+            Ticks: Arrays `timestamps` (int64, microsegundos) y `prices` (float64), en orden
+                cronológico. Con precios float64 ambos son vistas del fichero mapeado.
+        """
+        records = self._records(name)
+        timestamps = records['ts']
+        lo = np.searchsorted(timestamps, to_micros(start)) if start is not None else 0
+        hi = np.searchsorted(timestamps, to_micros(end)) if end is not None else len(records)
+        records = records[lo:hi]
+        prices = records['price'] / self.price_scale if self.price_scale else records['price']
+        return Ticks(records['ts'], prices)
+
+    def first_timestamp(self, name):
+        """
+        Returns:
+            datetime | None: Momento del precio más antiguo de la moneda.
+        """
+        records = self._records(name)
+        return from_micros(records['ts'][0]) if len(records) else None
+
+    def last_timestamp(self, name):
+        """
+        Returns:
+            datetime | None: Momento del precio más reciente de la moneda.
+        """
+        records = self._records(name)
+        return from_micros(records['ts'][-1]) if len(records) else None
+
+    def get_historical_prices(self, name, limit=100):
+        """
+        Equivalente de `database.get_historical_prices` sobre el almacén local.
+
+        Args:
+            name (str): Nombre de la criptomoneda.
+            limit (int, opcional): Número máximo de registros a recuperar. Por defecto es 100.
+
+        Returns:
+            list[dict]: Diccionarios con 'price' (float) y 'timestamp', del más reciente al más antiguo.
+        """
+        return self._newest_first(self.read(name), limit)
+
+    def get_historical_range(self, name, start, end, limit=1000):
+        """
+        Equivalente de `database.get_historical_range` sobre el almacén local.
+
+        Returns:
+            list[dict]: Diccionarios con 'price' (float) y 'timestamp', del más reciente al más antiguo.
+        """
+        return self._newest_first(self.read(name, start, end), limit)
+
+    @staticmethod
+    def _newest_first(ticks, limit):
+        timestamps = ticks.timestamps[-limit:][::-1]
+        prices = ticks.prices[-limit:][::-1]
+        return [{'price': float(price), 'timestamp': from_micros(ts)} for ts, price in zip(timestamps, prices)]
+
+
+tick_store = TickStore() if TICKSTORE_DIR else None
+
+
+def export_historical_prices(store, start=None, end=None, chunk=timedelta(days=1), interval=None,
+                             heartbeat=INGEST_HEARTBEAT):
+    """
+    Copia `historical_prices` al almacén local por tramos de tiempo.
+
+    Es incremental: de cada moneda solo se añaden los precios posteriores al último que ya
+    tiene el almacén. Con `interval` se exporta la serie reconstruida de un histórico escrito
+    con `INGEST_DEDUP` (ver `TickStore.append_rows`).
+
+    Args:
+        store (TickStore): Almacén de destino.
+        start (datetime, opcional): Inicio del rango. Por defecto el precio más antiguo.
+        end (datetime, opcional): Fin del rango. Por defecto justo después del más reciente.
+        chunk (timedelta, opcional): Tamaño de cada tramo. Por defecto un día.
+        interval (float, opcional): Segundos entre extracciones. Por defecto no se reconstruye.
+        heartbeat (float, opcional): Heartbeat del filtro. Por defecto `INGEST_HEARTBEAT`.
+
+    Returns:
+        int: Número de precios exportados.
+    """
+    from database import get_history_bounds, query_db
+
+    if start is None or end is None:
+        bounds = get_history_bounds()
+        if bounds is None:
+            return 0
+        start = start or bounds[0]
+        end = end or bounds[1] + timedelta(seconds=1)
+
+    last = {name: store.last_timestamp(name) for name in store.coins()}
+    exported = 0
+    current = start
+    while current < end:
+        chunk_end = min(current + chunk, end)
+        rows = query_db('''
+            SELECT name, price, timestamp
+            FROM historical_prices
+            WHERE timestamp >= %s
+                AND timestamp < %s
+                AND price IS NOT NULL
+            ORDER BY name, timestamp
+        ''', (current, chunk_end)) or []
+        fresh = []
+        for row in rows:
+            previous = last.get(row['name'])
+            if previous is not None and row['timestamp'] <= previous:
+                continue
+            fresh.append({'name': row['name'], 'actual_price': row['price'], 'timestamp': row['timestamp']})
+            last[row['name']] = row['timestamp']
+        exported += store.append_rows(fresh, interval, heartbeat)
+        current = chunk_end
+    return exported
+
+
+def run_benchmark(root, ticks, coins=1, reads=100):
+    """
+    Mide memoria y latencia del almacén con precios sintéticos.
+
+    Args:
+        root (str): Directorio de trabajo (se crea si no existe).
+        ticks (int): Número total de precios.
+        coins (int, opcional): Monedas entre las que se reparten. Por defecto 1.
+        reads (int, opcional): Lecturas de rango a medir. Por defecto 100.
+
+    Returns:
+        dict: Tiempos de escritura, apertura, lectura de rango y recorrido completo, bytes en
+            disco y memoria residual máxima del proceso.
+    """
+    store = TickStore(root)
+    per_coin = ticks // coins
+    block = 10_000_000
+    rng = np.random.default_rng(0)
+    origin = to_micros(datetime(2024, 1, 1))
+
+    start = time.perf_counter()
+    for coin in range(coins):
+        for offset in range(0, per_coin, block):
+            n = min(block, per_coin - offset)
+            ts = origin + (np.arange(offset, offset + n, dtype=np.int64) * 1_000_000)
+            prices = 100 + np.cumsum(rng.standard_normal(n)) * 0.01
+            store.append(f"Coin{coin}", ts, prices)
+    write_seconds = time.perf_counter() - start
+
+    start = time.perf_counter()
+    data = store.read('Coin0')
+    open_seconds = time.perf_counter() - start
+
+    span = per_coin * 1_000_000
+    start = time.perf_counter()
+    for i in range(reads):
+        begin = from_micros(origin + (i * 7919 * 1_000_000) % max(span - 3_600_000_000, 1))
+        store.read('Coin0', begin, begin + timedelta(hours=1))
+    range_seconds = (time.perf_counter() - start) / reads
+
+    start = time.perf_counter()
+    mean = float(data.prices.mean())
+    scan_seconds = time.perf_counter() - start
+
+    return {
+        'ticks': per_coin * coins,
+        'write_seconds': round(write_seconds, 3),
+        'open_seconds': round(open_seconds, 6),
+        'range_read_seconds': round(range_seconds, 6),
+        'full_scan_seconds': round(scan_seconds, 3),
+        'mean_price': round(mean, 4),
+        'disk_bytes': sum(os.path.getsize(store.path(name)) for name in store.coins()),
+        'max_rss_mb': round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1),
+    }
+
+
+if __name__ == '__main__':
+    """
+    Punto de entrada del almacén local de precios.
+
+        python tickstore.py export --dir data/ticks
+        python tickstore.py bench --dir /tmp/ticks --ticks 100000000
+    """
+    parser = argparse.ArgumentParser(description="Almacén local de precios por columnas")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+    export_parser = subparsers.add_parser('export', help="Exporta historical_prices al almacén")
+    export_parser.add_argument('--dir', default=TICKSTORE_DIR or 'ticks')
+    export_parser.add_argument('--from', dest='start', type=datetime.fromisoformat)
+    export_parser.add_argument('--to', dest='end', type=datetime.fromisoformat)
+    export_parser.add_argument('--interval', type=float, default=None,
+                               help="Reconstruye la serie de un histórico escrito con INGEST_DEDUP. "
+                                    "Por defecto INGESTION_INTERVAL si INGEST_DEDUP=1")
+    bench_parser = subparsers.add_parser('bench', help="Mide memoria y latencia con precios sintéticos")
+    bench_parser.add_argument('--dir', required=True)
+    bench_parser.add_argument('--ticks', type=int, default=10_000_000)
+    bench_parser.add_argument('--coins', type=int, default=1)
+    args = parser.parse_args()
+
+    if args.command == 'export':
+        from scheduler import INGESTION_INTERVAL
+
+        interval = args.interval or (INGESTION_INTERVAL if INGEST_DEDUP else None)
+        exported = export_historical_prices(TickStore(args.dir), args.start, args.end, interval=interval)
+        print(f"Precios exportados: {exported}")
+    else:
+        print(json.dumps(run_benchmark(args.dir, args.ticks, args.coins), indent=2))
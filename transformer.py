@@ -1,59 +1,130 @@
+import logging
 from datetime import datetime
 
+from price_parser import PriceParseError, parse_column, parse_number
+
+# Posición de cada campo en las filas crudas que producen los scrapers (ver `extractor.py`).
+# Las posiciones 0, 3 y 5 quedan vacías por compatibilidad con el formato original.
+ROW_FIELDS = {
+    'rank': 1,
+    'name': 2,
+    'code': 4,
+    'price': 6,
+    'market_cap': 7,
+    'volume': 8,
+    'total_volume': 9,
+    'change_24h': 10,
+    'change_7d': 11,
+}
+ROW_WIDTH = max(ROW_FIELDS.values()) + 1
+
+
+# Columnas numéricas de las filas crudas y clave con la que se guardan en la fila transformada
+NUMERIC_FIELDS = {
+    'price': 'actual_price',
+    'market_cap': 'market_cap',
+    'volume': 'volume',
+    'change_24h': 'change_24h',
+    'change_7d': 'change_7d',
+}
+
 
 def transform_price(price_str):
     """
-    Transforma una cadena de texto de precio en formato 'XXX.XXX,X' a un valor decimal (float).
+    Transforma una cadena de texto de precio (por ejemplo 'XXX.XXX,X') a un valor decimal (float).
 
-    Este método elimina el separador de miles (puntos) y convierte
-    el separador decimal (coma) a un punto para facilitar la transformación a `float`.
+    Delega en `price_parser.parse_number`, que admite los formatos español e inglés,
+    sufijos de magnitud ('K', 'M', 'B', 'T') y porcentajes.
 
     Args:
-        price_str (str): Cadena de texto que representa el precio en formato 'XXX.XXX,X'.
+        price_str (str): Cadena de texto que representa el precio.
 
     Returns:
         float: Precio convertido en formato decimal.
         None: Si ocurre un error en la conversión (por ejemplo, formato inválido).
     """
     try:
-        # Reemplazar separadores para adecuar el formato
-        sin_separador_miles = price_str.replace('.', '')
-        precio_float_str = sin_separador_miles.replace(',', '.')
-        precio_float = float(precio_float_str)  # Convertir a float
-        return precio_float
-    except ValueError:
+        return parse_number(price_str)
+    except PriceParseError:
         return None  # Retornar None si falla la conversión
 
 
-def transform_data(extract_data):
+def transform_row(data, timestamp):
+    """
+    Transforma una fila cruda en un diccionario con nombre, código, precios y marca de tiempo.
+
+    Además del precio se convierten la capitalización, el volumen y las variaciones (%) si la
+    fila los incluye. Los campos no vacíos que no se pueden convertir se listan en
+    'parse_errors' en lugar de descartarse en silencio.
+
+    Args:
+        data (list): Fila cruda con el formato de `ROW_FIELDS`.
+        timestamp (datetime): Marca de tiempo de la extracción.
+
+    Returns:
+        dict: Diccionario con 'name', 'code', 'actual_price', 'market_cap', 'volume',
+            'change_24h', 'change_7d', 'timestamp' y 'parse_errors'.
+    """
+    row = {
+        'name': data[ROW_FIELDS['name']],  # Usa el índice correspondiente para el nombre
+        'code': data[ROW_FIELDS['code']],  # Usa el índice correspondiente para el código
+        'timestamp': timestamp,
+        'parse_errors': [],
+    }
+    for field, key in NUMERIC_FIELDS.items():
+        position = ROW_FIELDS[field]
+        raw = data[position] if position < len(data) else ''
+        try:
+            row[key] = parse_number(raw)
+        except PriceParseError:
+            row[key] = None
+            if raw:
+                row['parse_errors'].append(field)
+    return row
+
+
+def transform_data(extract_data, timestamp=None):
     """
     Transforma una lista de datos crudos a un formato estructurado y manejable.
 
     Cada elemento de la lista transformada incluye:
     - Nombre de la criptomoneda.
     - Código de la criptomoneda.
-    - Precio actual transformado (como float).
-    - Marca temporal (`timestamp`) con la fecha y hora actual en que se realiza la transformación.
+    - Precio actual, capitalización, volumen y variaciones transformados (como float).
+    - Marca temporal (`timestamp`) común a toda la extracción.
+
+    Las columnas numéricas se convierten en bloque con `price_parser.parse_column`; los
+    valores no convertibles se registran en el log y en 'parse_errors' de cada fila.
 
     Args:
         extract_data (list or None): Lista de datos crudos extraídos del sitio web, donde cada
                                      elemento es otra lista que contiene la información en formato
                                      desestructurado.
+        timestamp (datetime, opcional): Marca temporal de la extracción. Por defecto la hora actual.
 
     Returns:
         list or None: Lista de diccionarios con la estructura transformada, o `None` si
                       `extract_data` es `None`.
     """
-    transform_data = []
     if extract_data is None:
         return
 
-    for data in extract_data:
-        transform_data.append({
-            'name': data[2],  # Usa el índice correspondiente para el nombre
-            'code': data[4],  # Usa el índice correspondiente para el código
-            'actual_price': transform_price(data[6]),  # Convierte el precio con `transform_price`
-            'timestamp': datetime.now()  # Registra la hora actual
-        })
+    timestamp = timestamp or datetime.now()
+    rows = [{
+        'name': data[ROW_FIELDS['name']],
+        'code': data[ROW_FIELDS['code']],
+        'timestamp': timestamp,
+        'parse_errors': [],
+    } for data in extract_data]
 
-    return transform_data
+    for field, key in NUMERIC_FIELDS.items():
+        position = ROW_FIELDS[field]
+        raw_values = [data[position] if position < len(data) else '' for data in extract_data]
+        column = parse_column(raw_values)
+        for row, value in zip(rows, column.values.tolist()):
+            row[key] = None if value != value else value
+        for index, raw in column.errors:
+            if raw:
+                rows[index]['parse_errors'].append(field)
+                logging.warning("No se pudo convertir %s=%r de %s", field, raw, rows[index]['name'])
+    return rows